@@ -0,0 +1,122 @@
+import time
+
+# Silnik alertów sterowany regułami z conf.json ("ALERTS"), np.
+#   {"metric": "cpu", "above": 90, "clear": 80, "for": 30, "cooldown": 300, "severity": 2}
+#
+#   metric    cpu, mem, temp, disk (najpełniejszy dysk), disk:<mnt_point>, rx, tx (KB/s)
+#   above     próg górny (albo "below" - próg dolny)
+#   clear     próg wygaszenia (histereza), domyślnie równy progowi
+#   for       ile sekund warunek musi trwać, zanim alert się pojawi
+#   cooldown  minimalny odstęp (s) między kolejnymi alertami tej reguły
+#   severity  1 informacja, 2 ostrzeżenie, 3 krytyczny
+#
+# Każda próbka aktualizuje tylko reguły swojej metryki, stan reguły to kilka pól.
+# Reguła odpala raz przy przejściu w stan aktywny i milczy, dopóki wartość
+# nie spadnie poniżej progu wygaszenia - stałe obciążenie nie zasypuje ekranu.
+
+INFO = 1
+WARNING = 2
+CRITICAL = 3
+
+LABELS = {'cpu': ('CPU', '%'), 'mem': ('RAM', '%'), 'temp': ('TEMP', 'C'),
+          'disk': ('DISK', '%'), 'rx': ('RX', 'KB/s'), 'tx': ('TX', 'KB/s')}
+
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fmt(v):
+    return str(int(v)) if v == int(v) else str(v)
+
+
+class Rule:
+    def __init__(self, spec):
+        self.metric = spec["metric"]
+        self.below = "below" in spec
+        self.limit = float(spec["below"] if self.below else spec["above"])
+        self.clear = float(spec.get("clear", self.limit))
+        self.hold = int(float(spec.get("for", 0)) * 1000)
+        self.cooldown = int(float(spec.get("cooldown", 300)) * 1000)
+        self.severity = max(INFO, min(CRITICAL, int(spec.get("severity", WARNING))))
+        self.active = False
+        self.since = None
+        self.fired = None
+        if self.metric.startswith("disk:"):
+            label, unit = self.metric[5:], '%'
+        else:
+            label, unit = LABELS.get(self.metric, (self.metric.upper(), ''))
+        self.text = "%s %s %s%s" % (label, "<" if self.below else ">", _fmt(self.limit), unit)
+
+    def tripped(self, v):
+        return v < self.limit if self.below else v > self.limit
+
+    def cleared(self, v):
+        return v >= self.clear if self.below else v <= self.clear
+
+    def update(self, v, now):
+        # Zwraca True, gdy reguła właśnie odpaliła
+        if self.active:
+            if self.cleared(v):
+                self.active = False
+                self.since = None
+            return False
+        if not self.tripped(v):
+            self.since = None
+            return False
+        if self.since is None:
+            self.since = now
+        if time.ticks_diff(now, self.since) < self.hold:
+            return False
+        # W trakcie cooldownu reguła czeka - jeśli warunek trwa dalej, odpali po jego upływie
+        if self.fired is not None and time.ticks_diff(now, self.fired) < self.cooldown:
+            return False
+        self.active = True
+        self.fired = now
+        return True
+
+
+class Engine:
+    def __init__(self, specs):
+        self.rules = []
+        self.by_metric = {}
+        self.fired = None
+        for spec in specs:
+            try:
+                rule = Rule(spec)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                print("Zła reguła alertu:", spec)
+                continue
+            self.rules.append(rule)
+            if rule.metric not in self.by_metric:
+                self.by_metric[rule.metric] = []
+            self.by_metric[rule.metric].append(rule)
+
+    def wants(self, metric):
+        return metric in self.by_metric
+
+    def update(self, metric, value, now):
+        # Brak danych (N/A) nie zmienia stanu reguł
+        rules = self.by_metric.get(metric)
+        if rules is None or value is None:
+            return
+        for rule in rules:
+            if rule.update(value, now) and (self.fired is None or rule.severity > self.fired.severity):
+                self.fired = rule
+
+    def pop(self):
+        # Najważniejsza reguła odpalona od ostatniego wywołania
+        rule = self.fired
+        self.fired = None
+        return rule
+
+    def hot(self, metrics):
+        # Czy któraś z metryk jest właśnie ponad progiem (także przed upływem "for")
+        for metric in metrics:
+            for rule in self.by_metric.get(metric, ()):
+                if rule.since is not None:
+                    return True
+        return False
@@ -0,0 +1,55 @@
+import os
+
+# Cofnięcie nieudanej aktualizacji OTA (ugit.py), zanim wystartuje main.py.
+# ota.pending zostawia aktualizacja, ota.booted - pierwszy start nowej wersji.
+# Jeżeli przy kolejnym starcie ota.booted nadal jest (nowa wersja nie wywołała
+# ugit.confirm()) albo któregoś pliku brakuje (przerwana podmiana), wracają
+# kopie .bak. Ten plik nie importuje nic poza os - OTA go nie podmienia.
+
+PENDING = "ota.pending"
+BOOTED = "ota.booted"
+ETAG_FILE = "ota.etag"
+
+
+def exists(name):
+    try:
+        os.stat(name)
+        return True
+    except OSError:
+        return False
+
+
+def rollback(names):
+    for name in names:
+        bak = name + ".bak"
+        if exists(bak):
+            if exists(name):
+                os.remove(name)
+            os.rename(bak, name)
+            print("OTA: przywrócono", name)
+    os.remove(PENDING)
+    # Bez ETagu kolejne sprawdzenie pobierze manifest, zamiast dostać 304
+    for name in (BOOTED, ETAG_FILE):
+        if exists(name):
+            os.remove(name)
+
+
+def check():
+    if not exists(PENDING):
+        return
+    with open(PENDING) as f:
+        names = f.read().split()
+    missing = False
+    for name in names:
+        if not exists(name):
+            missing = True
+    if missing or exists(BOOTED):
+        rollback(names)
+    else:
+        open(BOOTED, "w").close()
+
+
+try:
+    check()
+except OSError as e:
+    print("OTA boot:", e)
@@ -0,0 +1,120 @@
+import time
+from array import array
+from machine import Pin
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Obsługa przycisków na przerwaniach.
+# Handler Pin.irq odfiltrowuje drgania styków i wrzuca zdarzenia
+# (naciśnięcie, długie naciśnięcie, puszczenie) do stałego bufora
+# cyklicznego. Pętla główna tylko je odbiera - bez odpytywania GPIO
+# i bez gubienia naciśnięć w trakcie dłuższych operacji.
+
+K1, K2, K3, K4 = 0, 1, 2, 3
+
+PRESS = 0
+LONG = 1
+RELEASE = 2
+REPEAT = 3
+
+BOUNCE_MS = 30
+LONG_MS = 800
+REPEAT_DELAY_MS = 500
+REPEAT_MS = 200
+
+QUEUE_SIZE = 16
+
+# Zdarzenie kodowane jako (przycisk << 2) | rodzaj
+_events = bytearray(QUEUE_SIZE)
+_times = array('i', [0] * QUEUE_SIZE)
+_head = 0
+_tail = 0
+dropped = 0
+
+_pins = []
+_down = bytearray(4)
+_down_time = array('i', [0, 0, 0, 0])
+_edge_time = array('i', [0, 0, 0, 0])
+_repeat_time = array('i', [0, 0, 0, 0])
+
+# Budzi zadanie wejścia w uasyncio, jeśli port to obsługuje
+flag = asyncio.ThreadSafeFlag() if hasattr(asyncio, "ThreadSafeFlag") else None
+
+event_time = 0
+
+
+def _push(ev, now):
+    global _head, dropped
+    nxt = (_head + 1) % QUEUE_SIZE
+    if nxt == _tail:
+        dropped += 1
+        return
+    _events[_head] = ev
+    _times[_head] = now
+    _head = nxt
+    if flag is not None:
+        flag.set()
+
+
+def _edge(i, pin):
+    now = time.ticks_ms()
+    if time.ticks_diff(now, _edge_time[i]) < BOUNCE_MS:
+        return
+    _edge_time[i] = now
+    if pin.value() == 0:
+        if not _down[i]:
+            _down[i] = 1
+            _down_time[i] = now
+            _repeat_time[i] = now
+            _push(i << 2 | PRESS, now)
+    elif _down[i]:
+        _release(i, now)
+
+
+def _release(i, now):
+    _down[i] = 0
+    if time.ticks_diff(now, _down_time[i]) >= LONG_MS:
+        _push(i << 2 | LONG, now)
+    _push(i << 2 | RELEASE, now)
+
+
+def setup(pin_ids):
+    for i, pid in enumerate(pin_ids):
+        pin = Pin(pid, Pin.IN, Pin.PULL_UP)
+        pin.irq(handler=lambda p, i=i: _edge(i, p), trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)
+        _pins.append(pin)
+
+
+def poll(now):
+    # Powtarzanie przy przytrzymaniu i korekta zgubionego zbocza puszczenia.
+    # GPIO czytamy tylko dla przycisków, które uważamy za wciśnięte.
+    for i in range(len(_pins)):
+        if not _down[i]:
+            continue
+        if _pins[i].value():
+            _release(i, now)
+        elif time.ticks_diff(now, _down_time[i]) >= REPEAT_DELAY_MS and \
+                time.ticks_diff(now, _repeat_time[i]) >= REPEAT_MS:
+            _repeat_time[i] = now
+            _push(i << 2 | REPEAT, now)
+
+
+def pop():
+    # Zwraca kod zdarzenia albo -1, czas zdarzenia trafia do event_time
+    global _tail, event_time
+    if _tail == _head:
+        return -1
+    ev = _events[_tail]
+    event_time = _times[_tail]
+    _tail = (_tail + 1) % QUEUE_SIZE
+    return ev
+
+
+def pending():
+    return _tail != _head
+
+
+def any_down():
+    return _down[0] or _down[1] or _down[2] or _down[3]
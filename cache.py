@@ -0,0 +1,82 @@
+import time
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+import snapshot
+import conf
+
+# Ostatni dobry stan każdego serwera na flashu (lastN.bin, N = numer serwera).
+# Po restarcie ekran od razu pokazuje te dane z dopiskiem "stan z ...",
+# zanim przyjdą świeże. Zapis najwyżej raz na SAVE_PERIOD i tylko po zmianie
+# danych - najpierw do pliku .tmp, potem rename, więc przerwany zapis nie
+# psuje poprzedniego pliku.
+#
+#   nagłówek  2s  magic b"LK"
+#             B   wersja układu
+#             I   czas dobrych danych (sekundy epoki, 0 = zegar nieustawiony)
+#   dane      zrzut w układzie snapshot.py
+
+MAGIC = b"LK"
+VERSION = 1
+HEAD_FMT = "<2sBI"
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+SIZE = HEAD_SIZE + snapshot.SIZE
+SAVE_PERIOD = 10 * 60 * 1000
+
+# numer serwera -> (Server.version, ticks_ms) ostatniego zapisu
+_saved = {}
+
+
+def path(index):
+    return "last%d.bin" % index
+
+
+def load(srv, index):
+    # True, gdy serwer dostał dane z flasha
+    try:
+        with open(path(index), "rb") as f:
+            raw = f.read()
+    except OSError:
+        return False
+    if len(raw) != SIZE:
+        return False
+    magic, version, good_at = struct.unpack_from(HEAD_FMT, raw, 0)
+    if magic != MAGIC or version != VERSION:
+        return False
+    try:
+        snap = snapshot.Snapshot().decode(memoryview(raw)[HEAD_SIZE:])
+    except ValueError:
+        return False
+    srv.restore(snap, good_at)
+    _saved[index] = (srv.version, time.ticks_ms())
+    return True
+
+
+def due(srv, index, now):
+    if srv.stale or not srv.stats:
+        return False
+    last = _saved.get(index)
+    if last is None:
+        return True
+    return srv.version != last[0] and time.ticks_diff(now, last[1]) >= SAVE_PERIOD
+
+
+def save(srv, index, now):
+    if not due(srv, index, now):
+        return False
+    _saved[index] = (srv.version, now)
+    stats = srv.stats
+    iface = srv.net_data[0] if srv.net_data else None
+    try:
+        data = snapshot.encode(0, stats.get('cpu'), stats.get('mem'), stats.get('temp'),
+                               srv.hostname if srv.hostname_ok else "", iface, srv.disks)
+        tmp = path(index) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack(HEAD_FMT, MAGIC, VERSION, srv.good_at))
+            f.write(data)
+        conf.replace(tmp, path(index))
+    except (OSError, ValueError, UnicodeError) as e:
+        print("Błąd zapisu stanu:", e)
+        return False
+    return True
@@ -1,9 +1,46 @@
+import os
+import time
 import ujson
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+
+# Konfiguracja z conf.json (edytowana ręcznie, urządzenie jej nie nadpisuje)
+# i ustawienia z menu w settings.json (zapisywane przez urządzenie).
+# Zmiany z menu czekają w RAM; flush() zapisuje je raz, FLUSH_DELAY ms po
+# ostatniej zmianie albo od razu przy wyjściu z menu. Zapis idzie do pliku
+# .tmp, a potem rename, więc zanik zasilania zostawia stary albo nowy plik.
+# Pierwsza linia settings.json to CRC32 reszty pliku - uszkodzony plik jest
+# pomijany (zostają wartości z conf.json), zamiast cicho wracać do DEFAULTS.
+# Nic nie jest czytane przy imporcie - dopiero pierwsze get().
 
 DEFAULTS = {
     "SSID": "Wifi Name",
     "PASSWORD": "Wifi Password",
     "SERVER_URL": "http://(your server ip):61208",
+    "PROXY_URL": "",  # np. http://(your server ip):61209/snapshot - opcjonalny server/glances_proxy.py
+    "PUSH_PORT": 0,  # port UDP dla glances_proxy.py --push, 0 = wyłączone
+    "NET_IFACE": "enp3s0",  # interfejs sieciowy pokazywany na stronie sieci
+    "TEMP_SENSOR": "CPUTIN",  # etykieta czujnika temperatury w Glances
+    "DISKS": [],  # punkty montowania do pokazania, [] = wykryj automatycznie
+    # Kilka serwerów: [{"name": "NAS", "url": "http://...:61208", "iface": "eth0",
+    # "sensor": "CPUTIN", "disks": [], "proxy": "", "timeout": 5}, ...]
+    # [] = jeden serwer opisany kluczami SERVER_URL, NET_IFACE, TEMP_SENSOR, DISKS, PROXY_URL
+    "SERVERS": [],
+    "ROTATE": 0,  # co ile sekund przełączać serwer, gdy nikt nie naciska przycisków, 0 = wyłączone
+    "LIGHTSLEEP": 1,  # machine.lightsleep przy zgaszonym ekranie w oknie snu, 0 = tylko wygaszenie
+    "SLEEP_WLAN": "off",  # radio w oknie snu: "off" - wyłączone, "save" - tryb oszczędny
+    "ROLLUPS": 1,  # 1 = historia 1 min / 15 min / 1 h na flashu (rollup.py), 0 = tylko ostatnie próbki w RAM
+    "DUAL_CORE": 0,  # 1 = pobieranie i parsowanie na drugim rdzeniu (worker.py, _thread)
+    "OTA_URL": "",  # katalog z manifest.json i plikami aktualizacji (host/manifest.py), "" = GitHub projektu
+    # Reguły alertów - opis pól w alerts.py
+    "ALERTS": [
+        {"metric": "cpu", "above": 90, "clear": 80, "for": 30, "cooldown": 300, "severity": 2},
+        {"metric": "mem", "above": 90, "clear": 85, "for": 30, "cooldown": 300, "severity": 2},
+        {"metric": "temp", "above": 75, "clear": 70, "for": 10, "cooldown": 300, "severity": 3},
+        {"metric": "disk", "above": 90, "clear": 88, "cooldown": 3600, "severity": 2}
+    ],
     "lang": "ENG",
     "unit": "GB",
     "refresh": 5,
@@ -14,36 +51,102 @@ DEFAULTS = {
     "timezone": 0  # UTC+0
 }
 
+# Klucze zmieniane z menu ustawień - tylko one trafiają do settings.json
+MENU_KEYS = ("lang", "unit", "refresh", "eco_mode", "sleep_enabled", "sleep_start", "sleep_end", "timezone")
+CONF_FILE = "conf.json"
+SETTINGS_FILE = "settings.json"
+FLUSH_DELAY = 5 * 1000
+
+_settings = None
+_pending = None
+_changed_at = 0
+
+
+
+def replace(tmp, name):
+    # littlefs nadpisuje przy rename, FAT nie
+    try:
+        os.rename(tmp, name)
+    except OSError:
+        os.remove(name)
+        os.rename(tmp, name)
+
+def checksum(data):
+    return "%08x" % (binascii.crc32(data) & 0xFFFFFFFF)
 
+def load_menu():
+    # Ustawienia z menu albo None, gdy pliku nie ma lub jest uszkodzony
+    try:
+        with open(SETTINGS_FILE, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    crc, _, body = raw.partition(b"\n")
+    # Porównanie bajtów - uszkodzona linia CRC nie musi być poprawnym UTF-8
+    if crc != checksum(body).encode():
+        print("settings.json uszkodzony, pomijam")
+        return None
+    try:
+        menu = ujson.loads(body)
+    except ValueError:  # także UnicodeError
+        return None
+    return menu if isinstance(menu, dict) else None
 
 def load():
+    data = DEFAULTS.copy()
     try:
-        with open("conf.json", "r") as f:
-            data = ujson.load(f)
-        for k in DEFAULTS:
-            if k not in data:
-                data[k] = DEFAULTS[k]
-        return data
-    except Exception:
-        return DEFAULTS.copy()
+        with open(CONF_FILE, "r") as f:
+            data.update(ujson.load(f))
+    except OSError:
+        pass
+    except ValueError as e:
+        print("Błąd conf.json:", e)
+    menu = load_menu()
+    if menu:
+        for k in MENU_KEYS:
+            if k in menu:
+                data[k] = menu[k]
+    return data
+
+def get():
+    global _settings
+    if _settings is None:
+        _settings = load()
+    return _settings
 
 def save(settings):
-    try:
-        with open("conf.json", "w") as f:
-            ujson.dump(settings, f)
-    except Exception as e:
-        print("Błąd zapisu ustawień:", e)
+    # Tylko zapamiętuje zmianę - zapis robi flush()
+    global _pending, _changed_at
+    _pending = {k: settings[k] for k in MENU_KEYS}
+    _changed_at = time.ticks_ms()
+    get().update(_pending)
 
-settings = load()
+def write(menu):
+    body = ujson.dumps(menu).encode()
+    tmp = SETTINGS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(checksum(body).encode() + b"\n" + body)
+    replace(tmp, SETTINGS_FILE)
 
-# Stałe adresy API, generowane na podstawie SERVER_URL
-SERVER_URL = settings["SERVER_URL"]
-SSID = settings["SSID"]
-PASSWORD = settings["PASSWORD"]
-CPU_URL = SERVER_URL + '/api/4/cpu'
-MEM_URL = SERVER_URL + '/api/4/mem'
-SENSORS_URL = SERVER_URL + '/api/4/sensors'
-DISK_URL = SERVER_URL + '/api/4/fs'
-NETWORK_URL = SERVER_URL + '/api/4/network'
-SYSTEM_URL = SERVER_URL + '/api/4/system'
+def flush(now, force=False):
+    # True, gdy coś zostało zapisane
+    global _pending, _changed_at
+    if _pending is None:
+        return False
+    if not force and time.ticks_diff(now, _changed_at) < FLUSH_DELAY:
+        return False
+    try:
+        write(_pending)
+    except OSError as e:
+        # Zmiany zostają w _pending - kolejna próba po FLUSH_DELAY
+        print("Błąd zapisu ustawień:", e)
+        _changed_at = now
+        return False
+    _pending = None
+    return True
 
+def server_list(settings):
+    if settings["SERVERS"]:
+        return settings["SERVERS"]
+    return [{"url": settings["SERVER_URL"], "iface": settings["NET_IFACE"], "sensor": settings["TEMP_SENSOR"],
+             "disks": settings["DISKS"], "proxy": settings["PROXY_URL"]}]
@@ -0,0 +1,96 @@
+import time
+import gc
+from array import array
+
+# Dane ukrytej strony diagnostycznej (Ustawienia -> Diagnostyka).
+# Czasy renderu, gc.collect, oled.show i zapytań są zapisywane zawsze -
+# to dwa odczyty zegara i przypisanie. Okno czasów iteracji pętli (avg/p95)
+# i szukanie największego wolnego bloku działają tylko przy otwartej stronie.
+# Czasy startu liczone są od resetu płytki (ticks_ms startuje od zera).
+
+SAMPLES = 32
+BLOCK_PERIOD = 2000
+BLOCK_STEP = 256
+
+enabled = False
+draw_us = 0
+gc_us = 0
+largest_block = 0
+# ms od resetu do pierwszej klatki i do pierwszych danych z serwera (-1 = jeszcze nie)
+boot_frame = -1
+boot_live = -1
+
+_loop = array('I', [0] * SAMPLES)
+_loop_count = 0
+_loop_last = None
+_block_time = None
+
+
+def open():
+    global enabled, _loop_count, _loop_last, _block_time
+    enabled = True
+    _loop_count = 0
+    _loop_last = None
+    _block_time = None
+
+
+def close():
+    global enabled
+    enabled = False
+
+
+def mark_frame(now):
+    global boot_frame
+    if boot_frame < 0:
+        boot_frame = now
+
+
+def mark_live(now):
+    # True tylko za pierwszym razem
+    global boot_live
+    if boot_live >= 0:
+        return False
+    boot_live = now
+    return True
+
+
+def loop(t_us):
+    # Początek iteracji pętli renderu; zapisujemy odstęp od poprzedniej
+    global _loop_count, _loop_last
+    if not enabled:
+        return
+    if _loop_last is not None:
+        _loop[_loop_count % SAMPLES] = time.ticks_diff(t_us, _loop_last)
+        _loop_count += 1
+    _loop_last = t_us
+
+
+def loop_stats():
+    # (średnia, p95) w us z ostatnich SAMPLES iteracji
+    n = min(_loop_count, SAMPLES)
+    if not n:
+        return 0, 0
+    samples = sorted(_loop[:n])
+    return sum(samples) // n, samples[(n * 95 - 1) // 100]
+
+
+def find_largest_block():
+    # Wyszukiwanie binarne największej możliwej alokacji
+    lo = 0
+    hi = gc.mem_free()
+    while hi - lo > BLOCK_STEP:
+        mid = (lo + hi) // 2
+        try:
+            block = bytearray(mid)
+            del block
+            lo = mid
+        except MemoryError:
+            hi = mid
+    return lo
+
+
+def update(now):
+    global largest_block, _block_time
+    if _block_time is None or time.ticks_diff(now, _block_time) >= BLOCK_PERIOD:
+        _block_time = now
+        largest_block = find_largest_block()
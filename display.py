@@ -0,0 +1,112 @@
+import sys
+import time
+import micropython
+import ssd1306
+
+# Wyświetlacz, który wysyła przez I2C tylko zmienione fragmenty ramki.
+# Kopia ostatnio wysłanej ramki (shadow) jest porównywana z buforem
+# strona po stronie (8 wierszy = 128 bajtów); dla każdej zmienionej strony
+# wysyłamy tylko zakres kolumn od pierwszej do ostatniej różnicy.
+
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+if sys.implementation.name == "micropython":
+    @micropython.viper
+    def _first_diff(a, b, start: int, end: int) -> int:
+        pa = ptr8(a)
+        pb = ptr8(b)
+        i = start
+        while i < end:
+            if pa[i] != pb[i]:
+                return i
+            i += 1
+        return -1
+
+    @micropython.viper
+    def _last_diff(a, b, start: int, end: int) -> int:
+        pa = ptr8(a)
+        pb = ptr8(b)
+        i = end - 1
+        while i >= start:
+            if pa[i] != pb[i]:
+                return i
+            i -= 1
+        return -1
+
+    @micropython.viper
+    def _copy(dst, src, start: int, end: int):
+        pd = ptr8(dst)
+        ps = ptr8(src)
+        i = start
+        while i < end:
+            pd[i] = ps[i]
+            i += 1
+else:
+    def _first_diff(a, b, start, end):
+        for i in range(start, end):
+            if a[i] != b[i]:
+                return i
+        return -1
+
+    def _last_diff(a, b, start, end):
+        for i in range(end - 1, start - 1, -1):
+            if a[i] != b[i]:
+                return i
+        return -1
+
+    def _copy(dst, src, start, end):
+        dst[start:end] = src[start:end]
+
+
+class DirtyOLED(ssd1306.SSD1306_I2C):
+    shadow = None
+
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+        self.frames = 0
+        self.frames_skipped = 0
+        self.frame_bytes = 0
+        self.bytes_total = 0
+        # Czas ostatniego wysłania ramki (us) - dla strony diagnostyki
+        self.flush_us = 0
+        # Przed super().__init__ - konstruktor sterownika woła init_display() i show()
+        self.full_frame_bytes = 6 * 2 + 1 + width * height // 8
+        super().__init__(width, height, i2c, addr, external_vcc)
+
+    def show(self):
+        self.frames += 1
+        t0 = time.ticks_us()
+        if self.shadow is None:
+            super().show()
+            self.shadow = bytearray(self.buffer)
+            self.buffer_mv = memoryview(self.buffer)
+            self.frame_bytes = self.full_frame_bytes
+            self.bytes_total += self.frame_bytes
+            self.flush_us = time.ticks_diff(time.ticks_us(), t0)
+            return
+        buf = self.buffer
+        shadow = self.shadow
+        width = self.width
+        col = (128 - width) // 2 if width != 128 else 0
+        sent = 0
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            first = _first_diff(buf, shadow, start, end)
+            if first < 0:
+                continue
+            last = _last_diff(buf, shadow, first, end)
+            self.write_cmd(SET_COL_ADDR)
+            self.write_cmd(col + first - start)
+            self.write_cmd(col + last - start)
+            self.write_cmd(SET_PAGE_ADDR)
+            self.write_cmd(page)
+            self.write_cmd(page)
+            self.write_data(self.buffer_mv[first:last + 1])
+            _copy(shadow, buf, first, last + 1)
+            sent += 6 * 2 + 1 + last + 1 - first
+        if not sent:
+            self.frames_skipped += 1
+        self.frame_bytes = sent
+        self.bytes_total += sent
+        self.flush_us = time.ticks_diff(time.ticks_us(), t0)
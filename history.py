@@ -0,0 +1,138 @@
+from array import array
+
+# Historia metryk w buforach cyklicznych o stałym rozmiarze.
+# Cała pamięć jest rezerwowana przy starcie (MEMORY bajtów na serwer), dodanie
+# próbki niczego nie alokuje. Jedna próbka = jedno odświeżenie danych.
+
+SAMPLES = 128
+MAX_DISKS = 4
+
+_RANGE = {'B': (0, 255), 'h': (-32768, 32767)}
+
+
+class Series:
+    def __init__(self, label, typecode, scale=None):
+        # scale: stała górna granica wykresu (np. 100 dla %), None = skalowanie do maksimum
+        self.label = label
+        self.scale = scale
+        self.data = array(typecode, [0] * SAMPLES)
+        self.min_v, self.max_v = _RANGE[typecode]
+        self.head = 0
+        self.count = 0
+        self.lo = 0
+        self.hi = 0
+        self.avg = 0
+
+    def add(self, value):
+        if value > self.max_v:
+            value = self.max_v
+        elif value < self.min_v:
+            value = self.min_v
+        self.data[self.head] = value
+        self.head = (self.head + 1) % SAMPLES
+        if self.count < SAMPLES:
+            self.count += 1
+        self._update()
+
+    def _update(self):
+        # Pełne przeliczenie: 128 porównań raz na odświeżenie, bez alokacji
+        data = self.data
+        n = self.count
+        i = (self.head - n) % SAMPLES
+        lo = hi = data[i]
+        total = 0
+        for _ in range(n):
+            v = data[i]
+            if v < lo:
+                lo = v
+            if v > hi:
+                hi = v
+            total += v
+            i += 1
+            if i == SAMPLES:
+                i = 0
+        self.lo = lo
+        self.hi = hi
+        self.avg = total // n
+
+    def at(self, k):
+        # k-ta najstarsza próbka (0 <= k < count)
+        return self.data[(self.head - self.count + k) % SAMPLES]
+
+    def last(self):
+        return self.data[(self.head - 1) % SAMPLES] if self.count else 0
+
+    def reset(self):
+        self.head = 0
+        self.count = 0
+        self.lo = self.hi = self.avg = 0
+
+
+def _as_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class History:
+    # Komplet serii jednego serwera
+    def __init__(self):
+        self.cpu = Series("CPU %", 'B', 100)
+        self.mem = Series("RAM %", 'B', 100)
+        self.temp = Series("TEMP C", 'h')
+        self.net_rx = Series("RX KB/s", 'h')
+        self.net_tx = Series("TX KB/s", 'h')
+        self.disks = [Series("DISK%d %%" % (i + 1), 'B', 100) for i in range(MAX_DISKS)]
+        self.metrics = [self.cpu, self.mem, self.temp, self.net_rx, self.net_tx] + self.disks
+        self._prev_recv = -1
+        self._prev_sent = -1
+        self._prev_net_time = 0
+        # Odbiorca każdej próbki: add(numer metryki, wartość) - rollup.Store
+        self.sink = None
+
+    def _add(self, idx, value):
+        self.metrics[idx].add(value)
+        if self.sink is not None:
+            self.sink.add(idx, value)
+
+    def record_stats(self, data):
+        v = _as_int(data.get('cpu'))
+        if v is not None:
+            self._add(0, v)
+        v = _as_int(data.get('mem'))
+        if v is not None:
+            self._add(1, v)
+        v = _as_int(data.get('temp'))
+        if v is not None:
+            self._add(2, v)
+
+    def record_net(self, iface, now_ms, ticks_diff):
+        # Sumy *_gauge rosną monotonicznie - prędkość liczymy z różnicy
+        # (bytes_recv/bytes_sent w Glances v4 to tylko ostatnie odświeżenie).
+        # Zwraca True, gdy dodano nową próbkę prędkości
+        recv = _as_int(iface.get('bytes_recv_gauge'))
+        sent = _as_int(iface.get('bytes_sent_gauge'))
+        if recv is None or sent is None:
+            return False
+        added = False
+        if self._prev_recv >= 0:
+            dt = ticks_diff(now_ms, self._prev_net_time)
+            if dt > 0 and recv >= self._prev_recv and sent >= self._prev_sent:
+                self._add(3, (recv - self._prev_recv) * 1000 // dt // 1024)
+                self._add(4, (sent - self._prev_sent) * 1000 // dt // 1024)
+                added = True
+        self._prev_recv = recv
+        self._prev_sent = sent
+        self._prev_net_time = now_ms
+        return added
+
+    def record_disks(self, disk_list):
+        for i in range(min(len(disk_list), MAX_DISKS)):
+            v = _as_int(disk_list[i].get('percent'))
+            if v is not None:
+                self._add(5 + i, v)
+
+
+# cpu, mem, disks: 'B'; temp, rx, tx: 'h'
+MEMORY = SAMPLES * (2 + MAX_DISKS + 2 * 3)
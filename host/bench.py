@@ -0,0 +1,785 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of the firmware on the host harness (sim.py).
+
+Every scenario runs in a fresh interpreter, since main.py reads conf.json
+at import time:
+
+    render   I2C bytes of building the display (init_i2c_bytes; the stub
+             driver's constructor runs init_display() and show() like
+             micropython-lib); per-frame render time and I2C bytes for
+             each page with new data
+             every frame; allocations of a frame with unchanged data
+             (*_alloc_bytes, should be 0) and with new data
+             (*_update_alloc_bytes); one idle pass of the input loop
+    fetch*   body bytes and requests per refresh of each data source against
+             a normal / oversized (--extra 200) / pre-item-API Glances;
+             parse_failures counts strings cut at ujstream.MAX_STR in the
+             middle of an escape or a UTF-8 character that do not parse
+             (must be 0)
+    press*   button press -> oled.show() latency, also with a slow and
+             flaky Glances (the UI must not wait on the network)
+    boot*    ms from start to the first frame and to the first live data
+             (diag.boot_frame / diag.boot_live), also with a slow Glances;
+             boot_down points at a closed port, so live_data_ms must stay
+             -1 (no N/A stats in place of the start screen)
+    multi    two SERVERS entries on the same Glances host:port fetching
+             concurrently: network errors (must be 0) and servers still
+             without live data after a few seconds (offline, must be 0)
+    dual     DUAL_CORE mode (worker.py in a real thread, like core 1): a writer
+             thread hammers a worker.Exchange while the reader checks every
+             snapshot it holds for torn or overwritten data (torn, must be
+             0), then button latency and first live data of the firmware
+             against a slow, flaky Glances with fetching in the thread
+    rollup   two simulated days of samples every ROLLUP_STEP s through
+             History into rollup.Store (clock patched): flash writes per
+             hour, time and allocations of reading one chart (seek/readinto),
+             checks of the stored min/avg/max, and the rollup page render
+    ota      ugit.update_main() against a local HTTP server with ETags:
+             download time and peak allocations of a large main.py (streamed,
+             so the peak stays near ugit.CHUNK), requests and body bytes of a
+             delta update (only the changed file) and of a check when already
+             up to date (one 304), plus checks that a bad hash leaves main.py
+             alone and that boot.py rolls back an unconfirmed update;
+             manifest_stale counts entries of the committed manifest.json
+             that no longer match the tree (must be 0, see host/manifest.py)
+    migrate  the new main.py on a board updated by the old main.py-only
+             ugit (old conf.py/ugit.py, no other modules): it must fetch
+             every file of manifest.json and reset; stale_files counts files
+             left missing or different (must be 0); failures also covers a
+             bad hash leaving the board untouched and WiFi settings from the
+             old conf.py surviving in conf.json
+
+    python3 host/bench.py              # run, print report, compare to baseline
+    python3 host/bench.py --save       # store the current numbers as baseline
+    python3 host/bench.py render fetch # only some scenarios
+
+Exits with 1 when a metric is worse than host/baseline.json allows. Times
+(*_us, *_ms) are compared with a loose tolerance, since they depend on the
+machine; bytes, requests and allocations are deterministic and tight.
+Allocations are measured with tracemalloc on CPython (peak bytes above the
+starting point during one frame / one refresh) and with gc.mem_alloc()
+elsewhere. Render allocations are measured with the oled drawing calls
+stubbed out, so only the firmware's own objects count; CPython still boxes
+ints above 256 (the sparkline arithmetic, ticks values), which MicroPython
+keeps as small ints, so a few dozen bytes here are 0 on the Pico. Fetch peaks include
+CPython's asyncio stream objects, so compare them only with each other; the
+rollup read peak is mostly the 4 KiB buffer CPython gives every open() file.
+"""
+
+import argparse
+import asyncio
+import gc
+import hashlib
+import http.server
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import sim
+
+BASELINE = os.path.join(sim.HERE, "baseline.json")
+TIME_TOLERANCE = 1.0
+TOLERANCE = 0.1
+# Bezwzględny zapas dla małych liczb (np. 0 -> 16 bajtów to nie regresja)
+SLACK = {"bytes": 64, "requests": 0, "us": 200, "ms": 5}
+
+FRAMES = 40
+RECV_SIZE = 4096
+PAGES = (("stats", 0), ("disks", 1), ("net", 2), ("history", 3), ("settings", None))
+OTA_SIZE = 96 * 1024
+STRESS_SECONDS = 1.0
+ROLLUP_STEP = 5
+ROLLUP_HOURS = 48
+ROLLUP_START = 1767225600  # 2026-01-01 00:00 UTC
+DRAW_CALLS = ("fill", "fill_rect", "rect", "hline", "vline", "line", "pixel", "text", "blit", "show")
+
+SCENARIOS = {
+    "render": ("render", {}, {}),
+    "fetch": ("fetch", {}, {}),
+    "fetch_big": ("fetch", {}, {"extra": 200}),
+    "fetch_legacy": ("fetch", {}, {"item_api": False}),
+    "fetch_big_legacy": ("fetch", {}, {"extra": 200, "item_api": False}),
+    "press": ("press", {}, {}),
+    "press_flaky": ("press", {}, {"latency": 0.3, "error_rate": 0.3}),
+    "boot": ("boot", {}, {}),
+    "boot_slow": ("boot", {}, {"latency": 0.3}),
+    "boot_down": ("boot", {"SERVER_URL": "http://127.0.0.1:9"}, {}),
+    "multi": ("multi", {"SERVERS": [{"name": "A"}, {"name": "B", "iface": "lo"}]}, {"latency": 0.05}),
+    "dual": ("dual", {"DUAL_CORE": 1}, {"latency": 0.3, "error_rate": 0.3}),
+    "rollup": ("rollup", {}, {}),
+    "ota": ("ota", {}, {}),
+    "migrate": ("migrate", {}, {}),
+}
+
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from asyncio import selector_events
+except ImportError:
+    selector_events = None
+
+
+class Allocs:
+    """Bytes allocated by one call."""
+
+    def __enter__(self):
+        if tracemalloc is not None:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+    def start(self):
+        if tracemalloc is not None:
+            tracemalloc.reset_peak()
+            return tracemalloc.get_traced_memory()[0]
+        gc.collect()
+        gc.disable()
+        return gc.mem_alloc()
+
+    def stop(self, start):
+        if tracemalloc is not None:
+            return tracemalloc.get_traced_memory()[1] - start
+        used = gc.mem_alloc() - start
+        gc.enable()
+        return used
+
+    def measure(self, fn, *args):
+        start = self.start()
+        fn(*args)
+        return self.stop(start)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+async def warm_up(main):
+    # Jedno pełne pobranie wszystkich źródeł, jak po starcie na Pico
+    await main.connect_wifi()
+    srv = main.server
+    for _ in range(50):
+        await srv.step(1000)
+        if srv.hostname_ok and srv.stats and srv.disk_data is not None and srv.net_data is not None:
+            break
+    # Stałe interwały - w trakcie pomiaru nic nie staje się należne samo
+    srv.tune(3600 * 1000, True, True, True)
+    return srv
+
+
+def bench_render(main, state):
+    srv = asyncio.run(warm_up(main))
+    for i in range(main.history.SAMPLES):
+        srv.history.record_stats({"cpu": 20 + i % 50, "mem": 40 + i % 7, "temp": 45 + i % 11})
+    stats = dict(srv.stats)
+    results = {}
+    # Konstruktor jak w main.py, na osobnym liczniku I2C
+    i2c = sys.modules["machine"].I2C(0)
+    oled = main.display.DirtyOLED(128, 64, i2c)
+    results["init_i2c_bytes"] = i2c.bytes if oled.frames == 1 else -1
+
+    def frame(i):
+        stats["cpu"] = 10 + i * 7 % 80
+        srv.stats = stats
+        srv.version += 1
+        main.render(time.ticks_ms())
+
+    def still(now):
+        main.render(now)
+
+    def measure_allocs(i):
+        # Rysowanie na hoście to czysty Python - na czas pomiaru nic nie rysujemy
+        oled = main.oled
+        for call in DRAW_CALLS:
+            setattr(oled, call, lambda *args: None)
+        try:
+            with Allocs() as allocs:
+                now = time.ticks_ms()
+                still(now)
+                idle = max(allocs.measure(still, now) for _ in range(5))
+                update = max(allocs.measure(frame, j) for j in range(i, i + 5))
+        finally:
+            for call in DRAW_CALLS:
+                delattr(oled, call)
+        return idle, update
+
+    for name, page in PAGES:
+        main.in_settings = page is None
+        if page is not None:
+            main.current_page = page
+        # Pierwsza ramka strony idzie w całości
+        main.oled.shadow = None
+        frame(0)
+        times = []
+        sent = 0
+        for i in range(1, FRAMES + 1):
+            t = time.perf_counter()
+            frame(i)
+            times.append(time.perf_counter() - t)
+            sent += main.oled.frame_bytes
+        idle, update = measure_allocs(FRAMES + 1)
+        results["%s_us" % name] = int(median(times) * 1e6)
+        results["%s_i2c_bytes" % name] = sent // FRAMES
+        results["%s_alloc_bytes" % name] = idle
+        results["%s_update_alloc_bytes" % name] = update
+    main.in_settings = False
+
+    def input_pass():
+        main.buttons.poll(time.ticks_ms())
+        while main.buttons.pop() >= 0:
+            pass
+
+    with Allocs() as allocs:
+        results["input_idle_alloc_bytes"] = max(allocs.measure(input_pass) for _ in range(5))
+    return results
+
+
+# Ciągi dłuższe niż MAX_STR, ucinane w środku sekwencji \\ / \\uXXXX / znaku UTF-8
+CUT_STRINGS = ("a" + "\\" * 24, "ab" + "\\" * 24, "a" + "\u017c" * 40, "ab" + "\u017c" * 40,
+               "a" + "\u20ac" * 40, "\U0001f600" * 20, "x" * 44 + "\u00e9" * 4)
+
+
+def check_cut_strings(ujstream):
+    """Parse each of CUT_STRINGS (raw UTF-8 and \\u-escaped) in CHUNK pieces;
+    a hang, an exception or a result that is not a prefix of the input is a failure.
+    Characters outside the BMP only go raw: the parser does not join
+    \\u surrogate pairs."""
+    failures = 0
+    for value in CUT_STRINGS:
+        for ascii_only in (False, True) if max(value) <= "\uffff" else (False,):
+            body = json.dumps({"hostname": value, "x": 1}, ensure_ascii=ascii_only).encode()
+            out = []
+
+            def parse():
+                ex = ujstream.Extractor(("hostname", "x"))
+                for i in range(0, len(body), ujstream.CHUNK):
+                    ex.feed(body[i:i + ujstream.CHUNK])
+                out.append(ex.close())
+
+            t = threading.Thread(target=parse, daemon=True)
+            t.start()
+            t.join(2.0)
+            if not out or out[0].get("x") != 1 or not value.startswith(out[0].get("hostname", "-")):
+                failures += 1
+    return failures
+
+
+def bench_fetch(main, state):
+    # CPython czyta z gniazda do bufora 256 KiB, który zdominowałby pomiar
+    # alokacji; Pico i tak odbiera po kilka KB
+    if selector_events is not None:
+        selector_events._SelectorSocketTransport.max_size = RECV_SIZE
+    # Jedna pętla zdarzeń na cały scenariusz - gniazda keep-alive są z nią związane
+    return asyncio.run(fetch_all(main, state))
+
+
+async def fetch_all(main, state):
+    srv = await warm_up(main)
+    results = {}
+
+    async def refresh(src):
+        src.poke(time.ticks_ms())
+        await srv.refresh_due(time.ticks_ms())
+
+    total = 0
+    for src in (srv.stats_source, srv.net_source, srv.disk_source):
+        hits = sum(state.hits.values())
+        sent = state.bytes_sent
+        t = time.perf_counter()
+        await refresh(src)
+        total += time.perf_counter() - t
+        results["%s_bytes" % src.name] = state.bytes_sent - sent
+        results["%s_requests" % src.name] = sum(state.hits.values()) - hits
+    results["refresh_all_ms"] = int(total * 1000)
+    results["errors"] = srv.errors
+    results["parse_failures"] = check_cut_strings(sys.modules["ujstream"])
+    with Allocs() as allocs:
+        peaks = []
+        for _ in range(3):
+            start = allocs.start()
+            await refresh(srv.stats_source)
+            peaks.append(allocs.stop(start))
+    results["stats_alloc_bytes"] = min(peaks)
+    return results
+
+
+def bench_press(main, state):
+    # Strony 0 -> 1 -> 2 -> 3 -> 0 i z powrotem, po 400 ms każda
+    timeline = [(1500 + i * 400, sim.BUTTONS["K1"], sim.PRESS_MS) for i in range(4)]
+    timeline += [(3100 + i * 400, sim.BUTTONS["K2"], sim.PRESS_MS) for i in range(4)]
+    probe = asyncio.run(sim.run(main, timeline, 5.0))
+    latencies = [t * 1000 for t in probe.latencies]
+    return {
+        "median_ms": int(median(latencies)) if latencies else -1,
+        "max_ms": int(max(latencies)) if latencies else -1,
+        "lost": len(timeline) - len(latencies),
+    }
+
+
+def bench_boot(main, state):
+    # Zegar ticks_ms startuje przy imporcie sim.py - jak po resecie Pico
+    asyncio.run(sim.run(main, (), 3.0))
+    return {
+        "first_frame_ms": main.diag.boot_frame,
+        "live_data_ms": main.diag.boot_live,
+    }
+
+
+def bench_multi(main, state):
+    asyncio.run(sim.run(main, (), 4.0))
+    return {
+        "errors": sum(srv.errors for srv in main.server_list),
+        "offline": sum(1 for srv in main.server_list if not srv.online()),
+    }
+
+
+def stress_exchange(worker, snapshot):
+    """Writer thread publishes as fast as it can; the reader takes snapshots
+    and re-checks each one over a few "frames". Every field of a snapshot
+    carries its number, so a mixed or later-overwritten one is torn."""
+    exchange = worker.Exchange()
+    done = []
+
+    def write():
+        seq = 0
+        while not done:
+            seq += 1
+            value = seq % 3000
+            disks = [{"mnt_point": "/d%d" % i, "used": seq, "size": seq, "percent": value} for i in range(snapshot.MAX_DISKS)]
+            iface = {"interface_name": "eth0", "bytes_sent_gauge": seq, "bytes_recv_gauge": seq, "speed": seq}
+            exchange.back.decode(snapshot.encode(seq, value, value, value, "h%d" % seq, iface, disks))
+            exchange.publish()
+
+    def consistent(snap):
+        seq = snap.seq
+        value = seq % 3000
+        if snap.stats["cpu"] != value or snap.stats["mem"] != value or snap.stats["temp"] != value:
+            return False
+        if snap.hostname != "h%d" % seq or snap.iface["bytes_recv_gauge"] != seq:
+            return False
+        return all(d["percent"] == value and d["used"] == seq for d in snap.disks)
+
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=write)
+    thread.start()
+    torn = taken = 0
+    last = -1
+    held = None
+    end = time.perf_counter() + STRESS_SECONDS
+    while time.perf_counter() < end:
+        snap = exchange.take()
+        if snap is not None:
+            taken += 1
+            if snap.seq <= last:
+                torn += 1
+            last = snap.seq
+            held = snap
+        if held is not None:
+            seq = held.seq
+            for _ in range(3):
+                if held.seq != seq or not consistent(held):
+                    torn += 1
+                    break
+    done.append(True)
+    thread.join()
+    sys.setswitchinterval(switch)
+    return torn, taken, exchange.published
+
+
+def bench_dual(main, state):
+    import snapshot
+    import worker
+
+    torn, taken, published = stress_exchange(worker, snapshot)
+    if not taken or not published:
+        torn += 1
+    timeline = [(1500 + i * 400, sim.BUTTONS["K1"], sim.PRESS_MS) for i in range(4)]
+    probe = asyncio.run(sim.run(main, timeline, 4.0))
+    main.fetcher.stop()
+    latencies = [t * 1000 for t in probe.latencies]
+    return {
+        "torn": torn,
+        "median_ms": int(median(latencies)) if latencies else -1,
+        "max_ms": int(max(latencies)) if latencies else -1,
+        "lost": len(timeline) - len(latencies),
+        "live_data_ms": main.diag.boot_live,
+    }
+
+
+def bench_rollup(main, state):
+    rollup = main.rollup
+    srv = main.server
+    store = srv.history.sink
+    clock = [ROLLUP_START]
+    rollup.servers.clock = lambda: clock[0]
+    failures = 0
+    # CPU = minuta doby % 100, pamięć stała, dysk 0 rośnie co godzinę
+    tick = 0
+    for step in range(ROLLUP_HOURS * 3600 // ROLLUP_STEP):
+        t = ROLLUP_START + step * ROLLUP_STEP
+        clock[0] = t
+        minute = (t - ROLLUP_START) // 60
+        srv.history.record_stats({"cpu": minute % 100, "mem": 50, "temp": 40 + step % 3})
+        srv.history.record_disks([{"percent": (t - ROLLUP_START) // 3600}])
+        tick += ROLLUP_STEP * 1000
+        store.flush(tick)
+    clock[0] += ROLLUP_STEP
+    srv.history.record_stats({"cpu": 0, "mem": 50, "temp": 40})
+    writes_per_hour = store.writes / ROLLUP_HOURS
+    store.flush(tick, True)
+
+    # 1 min: ostatni zamknięty przedział to minuta 2879 -> CPU 79, temp 40..42
+    store.read(0, 0)
+    if rollup.avg[-1] != 79 or rollup.lo[-1] != 79 or rollup.hi[-1] != 79:
+        failures += 1
+    store.read(0, 2)
+    if rollup.lo[-1] != 40 or rollup.hi[-1] != 42:
+        failures += 1
+    # 1 h: CPU w godzinie przechodzi 60 minut kolejnych wartości
+    found = store.read(2, 0)
+    if found != ROLLUP_HOURS or rollup.avg[0] != rollup.MISSING:
+        failures += 1
+    hour = ROLLUP_HOURS - 1
+    values = [(hour * 60 + m) % 100 for m in range(60)]
+    if rollup.lo[-1] != min(values) or rollup.hi[-1] != max(values) or rollup.avg[-1] != sum(values) // 60:
+        failures += 1
+    store.read(2, 5)
+    if rollup.avg[-1] != hour or rollup.avg[-2] != hour - 1:
+        failures += 1
+    # Po restarcie (nowy Store) te same dane z plików
+    fresh = rollup.Store(store.index)
+    if fresh.read(2, 5) != ROLLUP_HOURS or rollup.avg[-2] != hour - 1:
+        failures += 1
+
+    times = []
+    with Allocs() as allocs:
+        for _ in range(5):
+            start = allocs.start()
+            t = time.perf_counter()
+            store.read(1, 0)
+            times.append(time.perf_counter() - t)
+            peak = allocs.stop(start)
+    main.current_page = 3
+    main.history_range = 3
+    main.render(time.ticks_ms())
+    if not any(main.oled.pixel(127, y) for y in range(23, 64)):
+        failures += 1
+    return {
+        "writes_per_hour": round(writes_per_hour, 1),
+        "read_us": int(median(times) * 1e6),
+        "read_alloc_bytes": peak,
+        "failures": failures,
+    }
+
+
+class OtaHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with an ETag and If-None-Match -> 304, like a CDN."""
+
+    protocol_version = "HTTP/1.1"
+    etag = None
+
+    def send_head(self):
+        self.etag = None
+        try:
+            with open(self.translate_path(self.path), "rb") as f:
+                self.etag = '"%s"' % hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            return super().send_head()
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory):
+    handler = lambda *args: OtaHandler(*args, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def serve_files(directory):
+    """OtaHandler in its own process, so tracemalloc here only sees the
+    client. Returns (process, base URL)."""
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", directory],
+                            stdout=subprocess.PIPE, text=True)
+    port = int(proc.stdout.readline())
+    return proc, "http://127.0.0.1:%d/" % port
+
+
+def read(name):
+    with open(name, "rb") as f:
+        return f.read()
+
+
+class Traffic:
+    """Counts ugit's requests and the body bytes they received."""
+
+    def __init__(self, ugit):
+        self.requests = 0
+        self.bytes = 0
+        get = ugit.uhttp.get
+        traffic = self
+
+        class Counted:
+            def __init__(self, r):
+                self.r = r
+
+            def __getattr__(self, name):
+                return getattr(self.r, name)
+
+            def close(self):
+                traffic.bytes += self.r.received
+                self.r.close()
+
+        def counted(url, headers=None):
+            traffic.requests += 1
+            return Counted(get(url, headers))
+
+        ugit.uhttp = type("uhttp", (), {"get": staticmethod(counted)})
+
+    def reset(self):
+        self.requests = self.bytes = 0
+
+
+def bench_ota(main, state):
+    ugit = main.ugit
+    files = tempfile.mkdtemp(prefix="server-helper-ota-")
+    new = b"".join(b"# wiersz %05d nowej wersji\n" % i for i in range(OTA_SIZE // 26))
+    same = b"# bez zmian\n" * 400
+    for name, data in (("main.py", new), ("conf.py", same)):
+        with open(os.path.join(files, name), "wb") as f:
+            f.write(data)
+
+    def publish(main_hash):
+        listed = {"main.py": {"size": len(new), "sha256": main_hash},
+                  "conf.py": {"size": len(same), "sha256": hashlib.sha256(same).hexdigest()},
+                  "boot.py": {"size": 1, "sha256": "0" * 64}}
+        with open(os.path.join(files, "manifest.json"), "w") as f:
+            json.dump({"version": "9.9.9", "files": listed}, f)
+
+    server, base = serve_files(files)
+    # Katalog roboczy sim.boot() udaje system plików Pico; conf.py jest już aktualny
+    old = b"# stara wersja\n"
+    for name, data in (("main.py", old), ("conf.py", same)):
+        with open(name, "wb") as f:
+            f.write(data)
+    traffic = Traffic(ugit)
+    failures = 0
+    shown = []
+
+    publish("0" * 64)
+    if ugit.update_main(base, None, "1.0") is not False or read("main.py") != old or ugit.exists("main.py.new"):
+        failures += 1
+    publish(hashlib.sha256(new).hexdigest())
+    traffic.reset()
+    with Allocs() as allocs:
+        start = allocs.start()
+        t = time.perf_counter()
+        ok = ugit.update_main(base, shown.append, "1.0")
+        took = time.perf_counter() - t
+        peak = allocs.stop(start)
+    update_requests, update_bytes = traffic.requests, traffic.bytes
+    if ok is not True or read("main.py") != new or read("main.py.bak") != old or shown[-1:] != [100]:
+        failures += 1
+    if ugit.exists("conf.py.bak") or ugit.exists("boot.py.new"):
+        failures += 1
+    # Już aktualne: jedno zapytanie z If-None-Match, odpowiedź 304 bez treści
+    traffic.reset()
+    if ugit.update_main(base, None, "9.9.9") is not None:
+        failures += 1
+    check_requests, check_bytes = traffic.requests, traffic.bytes
+    # Dwa starty bez ugit.confirm(): pierwszy zakłada ota.booted, drugi cofa
+    boot_py = os.path.join(sim.ROOT, "boot.py")
+    runpy.run_path(boot_py)
+    if read("main.py") != new:
+        failures += 1
+    runpy.run_path(boot_py)
+    if read("main.py") != old or ugit.exists(ugit.PENDING) or ugit.exists(ugit.ETAG_FILE):
+        failures += 1
+    server.terminate()
+    server.wait()
+    import manifest
+    return {
+        "manifest_stale": len(manifest.stale(os.path.join(sim.ROOT, "manifest.json"))),
+        "download_ms": int(took * 1000),
+        "alloc_bytes": peak,
+        "update_requests": update_requests,
+        "update_bytes": update_bytes,
+        "check_requests": check_requests,
+        "check_bytes": check_bytes,
+        "failures": failures,
+    }
+
+
+# conf.py i ugit.py sprzed manifestu (do 1.2.8): ustawienia w conf.settings,
+# ugit podmieniał tylko main.py
+OLD_CONF = """settings = %r
+SERVER_URL = settings["SERVER_URL"]
+SSID = settings["SSID"]
+PASSWORD = settings["PASSWORD"]
+"""
+OLD_UGIT = "import urequests\n\ndef update_main():\n    pass\n"
+
+
+def bench_migrate(main, state):
+    with open(os.path.join(sim.ROOT, "manifest.json")) as f:
+        listed = json.load(f)["files"]
+    files = tempfile.mkdtemp(prefix="server-helper-files-")
+    for name in listed:
+        with open(os.path.join(files, name), "wb") as f:
+            f.write(read(os.path.join(sim.ROOT, name)))
+    server, base = serve_files(files)
+    # Płytka po starym "Update": nowy main.py, stare conf.py i ugit.py,
+    # ustawienia z WiFi tylko w conf.py
+    device = tempfile.mkdtemp(prefix="server-helper-device-")
+    settings = {"SSID": "field", "PASSWORD": "secret", "SERVER_URL": "http://192.0.2.1:61208",
+                "lang": "ENG", "refresh": 5, "OTA_URL": base}
+    new_main = read(os.path.join(sim.ROOT, "main.py"))
+    for name, data in (("conf.py", (OLD_CONF % settings).encode()), ("ugit.py", OLD_UGIT.encode()), ("main.py", new_main)):
+        with open(os.path.join(device, name), "wb") as f:
+            f.write(data)
+    failures = 0
+    firmware = set(listed) | {"boot.py"}
+    sys.path[:] = [device] + [p for p in sys.path if p != sim.ROOT]
+    os.chdir(device)
+    sleep = time.sleep
+    time.sleep = lambda s: None
+
+    def resets():
+        # Czy main.py kończy się restartem (po migracji albo po błędzie)
+        for name in firmware:
+            sys.modules.pop(name[:-3], None)
+        try:
+            runpy.run_path(os.path.join(device, "main.py"), run_name="__main__")
+        except SystemExit as e:
+            return str(e) == "machine.reset()"
+        return False
+
+    # Zły hash: nic nie jest podmieniane, po .new nie ma śladu
+    with open(os.path.join(files, "manifest.json"), "w") as f:
+        bad = dict(listed, **{"uhttp.py": {"size": 1, "sha256": "0" * 64}})
+        json.dump({"version": "9.9.9", "files": bad}, f)
+    if not resets() or read("conf.py") != (OLD_CONF % settings).encode() or any(n.endswith(".new") for n in os.listdir(".")):
+        failures += 1
+    with open(os.path.join(files, "manifest.json"), "w") as f:
+        json.dump({"version": "9.9.9", "files": listed}, f)
+    t = time.perf_counter()
+    if not resets():
+        failures += 1
+    took = time.perf_counter() - t
+    stale = sum(not os.path.exists(name) or hashlib.sha256(read(name)).hexdigest() != listed[name]["sha256"]
+                for name in listed)
+    # Następny start: moduły z płytki są kompletne, WiFi z conf.json
+    for name in firmware:
+        sys.modules.pop(name[:-3], None)
+    import conf
+    import ugit
+    if not hasattr(ugit, "apply") or conf.get()["SSID"] != "field":
+        failures += 1
+    time.sleep = sleep
+    server.terminate()
+    server.wait()
+    return {"stale_files": stale, "failures": failures, "migrate_ms": int(took * 1000)}
+
+
+def run_child(name):
+    kind, config, glances = SCENARIOS[name]
+    main, state = sim.boot(config, seed=1, **glances)
+    results = globals()["bench_" + kind](main, state)
+    return {"%s.%s" % (name, k): v for k, v in results.items()}
+
+
+def run_scenario(name):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name],
+                         capture_output=True, text=True, timeout=300)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError("scenario %s failed:\n%s%s" % (name, out.stdout, out.stderr))
+
+
+def allowed(name, base, tolerance):
+    unit = name.rsplit("_", 1)[-1]
+    tol = TIME_TOLERANCE if unit in ("us", "ms") else tolerance
+    return base * (1 + tol) + SLACK.get(unit, 0)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name in sorted(results):
+        value = results[name]
+        base = baseline.get(name)
+        mark = ""
+        if base is None:
+            mark = "new"
+        elif value > allowed(name, base, tolerance):
+            mark = "REGRESSION"
+            regressions.append(name)
+        elif value < base:
+            mark = "better"
+        print("%-40s %10s %10s  %s" % (name, value, "-" if base is None else base, mark))
+    return regressions
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the firmware on the host and check for regressions.")
+    p.add_argument("scenarios", nargs="*", help="default: all (%s)" % ", ".join(SCENARIOS))
+    p.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    p.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed growth of non-time metrics")
+    p.add_argument("--baseline", default=BASELINE)
+    p.add_argument("--child", help=argparse.SUPPRESS)
+    p.add_argument("--serve", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.serve:
+        serve(args.serve)
+        return 0
+    if args.child:
+        print(json.dumps(run_child(args.child)))
+        return 0
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        results.update(run_scenario(name))
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print("%-40s %10s %10s" % ("metric", "now", "baseline"))
+    regressions = compare(results, baseline, args.tolerance)
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print("baseline saved:", args.baseline)
+        return 0
+    if regressions:
+        print("%d regression(s): %s" % (len(regressions), ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Precompile the firmware to .mpy so the Pico does not compile it at boot.
+
+MicroPython compiles every imported .py to bytecode on each boot; main.py
+with its LANGS and settings tables is the biggest. This script runs
+mpy-cross over the device modules into build/. The board only runs main.py
+as source, so main.py is compiled as app.mpy and build/main.py becomes a
+two-line loader:
+
+    pip install mpy-cross==<the firmware's MicroPython version>
+    python3 host/build.py                  # Pico 2W (RP2350)
+    python3 host/build.py --march armv6m   # Pico W (RP2040)
+
+It then prints the mpremote commands that copy build/ to the board and
+remove the old .py copies (a .py next to a .mpy of the same name wins).
+display.py uses @micropython.viper, so --march must match the board.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUILD = os.path.join(ROOT, "build")
+
+APP = "app"
+MODULES = ("conf", "ugit", "ssd1306", "uhttp", "ujstream", "display", "sprites", "buttons", "history",
+           "snapshot", "push", "scheduler", "alerts", "servers", "power", "diag", "cache", "worker", "rollup")
+LOADER = "import %s\n%s.main()\n" % (APP, APP)
+
+
+def mpy_cross():
+    """Command prefix for mpy-cross: the binary on PATH or the pip package."""
+    exe = shutil.which("mpy-cross")
+    if exe:
+        return [exe]
+    try:
+        import mpy_cross  # noqa: F401
+    except ImportError:
+        return None
+    return [sys.executable, "-m", "mpy_cross"]
+
+
+def find(name, dirs):
+    for d in dirs:
+        path = os.path.join(d, name + ".py")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def compile_module(cmd, src, out, march):
+    subprocess.run(cmd + ["-march=" + march, "-o", out, src], check=True)
+    return os.path.getsize(out)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Compile the firmware to .mpy files in build/.")
+    p.add_argument("--march", default="armv7emsp", help="armv7emsp for RP2350 (default), armv6m for RP2040")
+    p.add_argument("--lib", action="append", default=[],
+                   help="extra directory with modules that are not in the repo (e.g. ssd1306.py)")
+    p.add_argument("--out", default=BUILD)
+    args = p.parse_args(argv)
+    cmd = mpy_cross()
+    if cmd is None:
+        print("mpy-cross not found: pip install mpy-cross (same version as the firmware)")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    dirs = [ROOT] + args.lib
+    built = []
+    size = compile_module(cmd, os.path.join(ROOT, "main.py"), os.path.join(args.out, APP + ".mpy"), args.march)
+    print("%-12s %6d B" % (APP + ".mpy", size))
+    for name in MODULES:
+        src = find(name, dirs)
+        if src is None:
+            print("%-12s skipped (%s.py not found, pass --lib; the board keeps its copy)" % (name, name))
+            continue
+        size = compile_module(cmd, src, os.path.join(args.out, name + ".mpy"), args.march)
+        print("%-12s %6d B" % (name + ".mpy", size))
+        built.append(name)
+    with open(os.path.join(args.out, "main.py"), "w") as f:
+        f.write(LOADER)
+    out = os.path.relpath(args.out)
+    print("\nmpremote cp %s/*.mpy %s/main.py :" % (out, out))
+    print("mpremote rm %s" % " ".join(":%s.py" % name for name in built))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
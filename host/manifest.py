@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Write manifest.json for the OTA update (ugit.py).
+
+The Pico downloads only this file to check for an update and then fetches
+only the files whose size or SHA-256 differ from its own copies:
+
+    {"version": "1.2.9", "files": {"main.py": {"size": 41234, "sha256": "..."}, ...}}
+
+The version is MAIN_VERSION from main.py. Run it before publishing a
+release and commit or upload manifest.json next to the files it lists:
+
+    python3 host/manifest.py                      # manifest.json in the repo root
+    python3 host/manifest.py --out /srv/ota --copy  # also copy the files there
+    python3 -m http.server -d /srv/ota 8000       # then "OTA_URL": "http://<pc>:8000/"
+    python3 host/manifest.py --check              # is the committed manifest.json current?
+
+Devices with an empty OTA_URL read manifest.json from this repository on
+GitHub, so the committed one must always match the committed files: a
+stale entry makes every update fail its hash check. host/bench.py reports
+the number of stale entries as ota.manifest_stale.
+
+boot.py is never listed (the device refuses to replace it). ssd1306.py is
+listed only when found (pass --lib DIR).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+import build
+
+ROOT = build.ROOT
+FILES = ("main",) + build.MODULES
+VERSION_RE = re.compile(r'^MAIN_VERSION\s*=\s*"([^"]+)"', re.M)
+
+
+def main_version(path):
+    with open(path) as f:
+        m = VERSION_RE.search(f.read())
+    if m is None:
+        raise SystemExit("MAIN_VERSION not found in %s" % path)
+    return m.group(1)
+
+
+def entry(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def stale(path, dirs=None):
+    """Names in manifest.json at path that no longer match the files (and
+    "version" when MAIN_VERSION changed); every name when it is missing."""
+    dirs = dirs or [ROOT]
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return ["manifest.json"]
+    out = []
+    if manifest.get("version") != main_version(os.path.join(ROOT, "main.py")):
+        out.append("version")
+    files = manifest.get("files", {})
+    for name in FILES:
+        src = build.find(name, dirs)
+        if src is not None and files.get(name + ".py") != entry(src):
+            out.append(name + ".py")
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Write manifest.json for the OTA update.")
+    p.add_argument("--lib", action="append", default=[],
+                   help="extra directory with modules that are not in the repo (e.g. ssd1306.py)")
+    p.add_argument("--out", default=ROOT, help="directory for manifest.json (default: repo root)")
+    p.add_argument("--copy", action="store_true", help="also copy the listed files to --out")
+    p.add_argument("--check", action="store_true", help="only check that manifest.json in --out is current")
+    args = p.parse_args(argv)
+    dirs = [ROOT] + args.lib
+    if args.check:
+        names = stale(os.path.join(args.out, "manifest.json"), dirs)
+        if names:
+            print("manifest.json is stale: %s (run python3 host/manifest.py)" % ", ".join(names))
+            return 1
+        print("manifest.json is current")
+        return 0
+    files = {}
+    for name in FILES:
+        src = build.find(name, dirs)
+        if src is None:
+            print("%-14s skipped (%s.py not found, pass --lib)" % (name + ".py", name))
+            continue
+        files[name + ".py"] = entry(src)
+        print("%-14s %6d B  %s" % (name + ".py", files[name + ".py"]["size"], files[name + ".py"]["sha256"][:12]))
+        if args.copy and os.path.abspath(os.path.dirname(src)) != os.path.abspath(args.out):
+            os.makedirs(args.out, exist_ok=True)
+            shutil.copyfile(src, os.path.join(args.out, name + ".py"))
+    manifest = {"version": main_version(os.path.join(ROOT, "main.py")), "files": files}
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, "manifest.json")
+    # Compact: the Pico reads the whole manifest into RAM
+    with open(path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"), sort_keys=True)
+    print("version %s, %d files -> %s (%d B)" % (manifest["version"], len(files), path, os.path.getsize(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
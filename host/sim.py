@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Run the Server Helper firmware unmodified on a PC.
+
+install() puts host/stubs (machine, network, ntptime, ssd1306, framebuf,
+micropython) in front of sys.path, adds the MicroPython-only parts of
+``time`` (ticks_ms, ticks_diff, ...), ``gc`` (mem_free, mem_alloc,
+threshold) and ``asyncio`` (sleep_ms) and aliases ujson/uasyncio. boot() then starts a fake Glances
+(server/fake_glances.py) in a background thread, writes conf.json into a
+scratch directory and imports main.py from the repo root:
+
+    import sim
+    sim.install()
+    main, glances = sim.boot({"refresh": 1}, extra=200)
+    presses = asyncio.run(sim.run(main, sim.parse_timeline("500:K1 1500:K3:900"), 5))
+
+From the command line it runs a button timeline and prints the final state
+and frame:
+
+    python3 host/sim.py --timeline "500:K1 1500:K3:900" --seconds 5 --extra 200
+
+Each timeline entry is <ms from start>:<button>[:<hold ms>]; a hold of 800 ms
+or more is a long press.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+BUTTONS = {"K1": 0, "K2": 1, "K3": 2, "K4": 3}
+PRESS_MS = 80
+
+TICKS_PERIOD = 1 << 30
+# Sterta zgłaszana przez gc.mem_free()/gc.mem_alloc() (mniej więcej jak na Pico 2W)
+HEAP = 200 * 1024
+_t0 = time.monotonic()
+
+
+def _ticks(scale):
+    return lambda: int((time.monotonic() - _t0) * scale) & (TICKS_PERIOD - 1)
+
+
+def _ticks_diff(a, b):
+    d = (a - b) & (TICKS_PERIOD - 1)
+    return d - TICKS_PERIOD if d & (TICKS_PERIOD >> 1) else d
+
+
+def install():
+    """Make the firmware importable under CPython. Safe to call twice."""
+    if not hasattr(time, "ticks_ms"):
+        time.ticks_ms = _ticks(1000)
+        time.ticks_us = _ticks(1000000)
+        time.ticks_diff = _ticks_diff
+        time.ticks_add = lambda a, b: (a + b) & (TICKS_PERIOD - 1)
+        time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+        time.sleep_us = lambda us: time.sleep(us / 1000000)
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = lambda: HEAP
+        gc.mem_alloc = lambda: 0
+    if not hasattr(gc, "threshold"):
+        gc.threshold = lambda *amount: -1
+    if not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    sys.modules.setdefault("ujson", json)
+    sys.modules.setdefault("uasyncio", asyncio)
+    for path in (os.path.join(ROOT, "server"), ROOT, os.path.join(HERE, "stubs")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def boot(config=None, workdir=None, **glances):
+    """Start a fake Glances, write conf.json and import main.py.
+
+    config is merged over a minimal conf.json pointing at the fake server;
+    glances keyword arguments (latency, error_rate, extra, seed, item_api)
+    go to fake_glances.State. Returns (main module, fake_glances.State).
+    main.py reads conf.json at import time, so boot() works once per process.
+    """
+    install()
+    import fake_glances
+
+    server, state = fake_glances.start(**glances)
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+    conf = {"SSID": "host", "PASSWORD": "host", "SERVER_URL": url, "refresh": 1}
+    conf.update(config or {})
+    for entry in conf.get("SERVERS", ()):
+        entry.setdefault("url", url)
+    workdir = workdir or tempfile.mkdtemp(prefix="server-helper-")
+    with open(os.path.join(workdir, "conf.json"), "w") as f:
+        json.dump(conf, f)
+    os.chdir(workdir)
+    import main
+
+    return main, state
+
+
+def parse_timeline(text):
+    """"500:K1 1500:K3:900" -> [(500, 0, 80), (1500, 2, 900)]"""
+    timeline = []
+    for entry in text.split():
+        parts = entry.split(":")
+        hold = int(parts[2]) if len(parts) > 2 else PRESS_MS
+        timeline.append((int(parts[0]), BUTTONS[parts[1].upper()], hold))
+    return sorted(timeline)
+
+
+class PressProbe:
+    """Times each button press from the GPIO edge to the first oled.show()
+    after the firmware handled the press."""
+
+    def __init__(self, main):
+        self.main = main
+        self.pressed_at = None
+        self.handled = False
+        self.latencies = []
+        handle_event = main.handle_event
+        show = main.oled.show
+
+        def traced_event(ev, now):
+            handle_event(ev, now)
+            if self.pressed_at is not None and ev & 3 == main.buttons.PRESS:
+                self.handled = True
+
+        def traced_show():
+            show()
+            if self.handled:
+                self.latencies.append(time.perf_counter() - self.pressed_at)
+                self.pressed_at = None
+                self.handled = False
+
+        main.handle_event = traced_event
+        main.oled.show = traced_show
+
+    def press(self, button):
+        self.pressed_at = time.perf_counter()
+        self.handled = False
+        self.main.buttons._pins[button].value(0)
+
+    def release(self, button):
+        self.main.buttons._pins[button].value(1)
+
+
+async def run(main, timeline=(), seconds=3.0, probe=None):
+    """Run main.main_async() with the button timeline; returns the probe."""
+    probe = probe or PressProbe(main)
+    task = asyncio.ensure_future(main.main_async())
+    start = time.monotonic()
+    events = []
+    for at, button, hold in timeline:
+        events.append((at, 0, button))
+        events.append((at + hold, 1, button))
+    for at, up, button in sorted(events):
+        delay = start + at / 1000 - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if up:
+            probe.release(button)
+        else:
+            probe.press(button)
+    rest = start + seconds - time.monotonic()
+    if rest > 0:
+        await asyncio.sleep(rest)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return probe
+
+
+def frame_text(oled):
+    """The current frame as 64 lines of '#' and '.'."""
+    return "\n".join("".join("#" if oled.pixel(x, y) else "." for x in range(oled.width))
+                     for y in range(oled.height))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run main.py against a fake Glances with a scripted button timeline.")
+    p.add_argument("--timeline", default="", help='e.g. "500:K1 1500:K3:900" (ms:button[:hold ms])')
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--config", default="{}", help="JSON merged into conf.json")
+    p.add_argument("--latency", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--extra", type=int, default=0)
+    p.add_argument("--no-item-api", action="store_true")
+    p.add_argument("--no-frame", action="store_true", help="do not print the final frame")
+    args = p.parse_args(argv)
+    firmware, state = boot(json.loads(args.config), latency=args.latency, error_rate=args.error_rate,
+                           extra=args.extra, seed=1, item_api=not args.no_item_api)
+    probe = asyncio.run(run(firmware, parse_timeline(args.timeline), args.seconds))
+    srv = firmware.server
+    print("page", firmware.current_page, "server", srv.label(), "stats", srv.stats)
+    print("disks", [d["mnt_point"] for d in srv.disks], "offline", srv.sched.offline, "errors", srv.errors)
+    print("requests", sum(state.hits.values()), "bytes", state.bytes_sent,
+          "frames", firmware.oled.frames, "i2c bytes", firmware.oled.bytes_total)
+    print("boot: first frame", firmware.diag.boot_frame, "ms, live data", firmware.diag.boot_live, "ms")
+    if probe.latencies:
+        print("press -> show ms", ["%.1f" % (t * 1000) for t in probe.latencies])
+    if not args.no_frame:
+        print(frame_text(firmware.oled))
+
+
+if __name__ == "__main__":
+    main()
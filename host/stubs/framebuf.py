@@ -0,0 +1,109 @@
+"""Host stand-in for the MicroPython ``framebuf`` module.
+
+Pixel-exact for the monochrome formats the firmware uses. ``text`` draws a
+deterministic pattern per character instead of the real 8x8 font, which is
+enough to tell frames apart and to count dirty pages.
+"""
+
+import math
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, fmt=MONO_VLSB, stride=None):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        self.stride = stride or width
+
+    def _index(self, x, y):
+        if self.fmt == MONO_VLSB:
+            return (y >> 3) * self.stride + x, 1 << (y & 7)
+        row = (self.stride + 7) >> 3
+        bit = 7 - (x & 7) if self.fmt == MONO_HLSB else x & 7
+        return y * row + (x >> 3), 1 << bit
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None if c is not None else 0
+        i, mask = self._index(x, y)
+        if c is None:
+            return 1 if self.buf[i] & mask else 0
+        if c:
+            self.buf[i] |= mask
+        else:
+            self.buf[i] &= ~mask & 0xFF
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        buf = self.buf
+        for i in range(len(buf)):
+            buf[i] = v
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self.pixel(xx, yy, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def ellipse(self, x, y, xr, yr, c, f=False, m=15):
+        for a in range(0, 360, 10):
+            r = math.radians(a)
+            self.pixel(int(x + xr * math.cos(r)), int(y + yr * math.sin(r)), c)
+
+    def text(self, s, x, y, c=1):
+        for k, ch in enumerate(s):
+            if ch == " ":
+                continue
+            o = ord(ch)
+            for col in range(8):
+                bits = (o * 2654435761 >> col) & 0x7E
+                for row in range(8):
+                    if bits & (1 << row):
+                        self.pixel(x + k * 8 + col, y + row, c)
+
+    def blit(self, fb, x, y, key=-1, palette=None):
+        for yy in range(fb.height):
+            for xx in range(fb.width):
+                c = fb.pixel(xx, yy)
+                if c != key:
+                    self.pixel(x + xx, y + yy, c)
+
+    def scroll(self, dx, dy):
+        pass
@@ -0,0 +1,96 @@
+"""Host stand-in for the MicroPython ``machine`` module.
+
+Pins keep their level in memory and call their IRQ handler on the matching
+edge, so a test can "press" a button with ``pin.value(0)``. I2C only counts
+the bytes the display would send. ``lightsleep`` blocks like on the Pico and
+returns early when any pin IRQ fires (from another thread).
+"""
+
+import threading
+import time
+
+_wake = threading.Event()
+pins = {}
+sleeps = []
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=None, pull=None, value=None):
+        self.id = id
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._value = value
+        self._irq = None
+        pins[id] = self
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        old = self._value
+        self._value = v
+        if self._irq is not None and old != v:
+            handler, trigger = self._irq
+            if (v == 0 and trigger & Pin.IRQ_FALLING) or (v == 1 and trigger & Pin.IRQ_RISING):
+                handler(self)
+                _wake.set()
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, **kw):
+        self._irq = (handler, trigger) if handler else None
+
+
+class I2C:
+    def __init__(self, *args, **kw):
+        self.bytes = 0
+        self.writes = 0
+
+    def writeto(self, addr, buf, stop=True):
+        self.bytes += len(buf)
+        self.writes += 1
+        return 1
+
+    def writevto(self, addr, bufs, stop=True):
+        for buf in bufs:
+            self.bytes += len(buf)
+        self.writes += 1
+
+
+class SoftI2C(I2C):
+    pass
+
+
+class RTC:
+    def datetime(self, *args):
+        t = time.localtime()
+        return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+
+
+def lightsleep(ms=None):
+    _wake.clear()
+    sleeps.append(ms)
+    _wake.wait(None if ms is None else ms / 1000)
+
+
+def deepsleep(ms=None):
+    raise SystemExit("machine.deepsleep(%r)" % ms)
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def freq(*args):
+    return 150000000
+
+
+def unique_id():
+    return b"\x00host\x00"
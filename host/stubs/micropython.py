@@ -0,0 +1,21 @@
+"""Host stand-in for the ``micropython`` module; the decorators are no-ops."""
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def mem_info(*args):
+    pass
+
+
+def alloc_emergency_exception_buf(size):
+    pass
@@ -0,0 +1,47 @@
+"""Host stand-in for the MicroPython ``network`` module (always-available WLAN)."""
+
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    PM_PERFORMANCE = 0xA11140
+    PM_POWERSAVE = 0x111022
+    PM_NONE = 0x10
+
+    # Set to False to simulate an access point that is out of range
+    reachable = True
+
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        self._connected = False
+        self.pm = WLAN.PM_POWERSAVE
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+        if not value:
+            self._connected = False
+
+    def connect(self, ssid, password=None):
+        self._connected = self._active and WLAN.reachable
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected and WLAN.reachable
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -55
+        return 3 if self.isconnected() else 0
+
+    def config(self, *args, **kw):
+        if "pm" in kw:
+            self.pm = kw["pm"]
+        return None
+
+    def ifconfig(self):
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
@@ -0,0 +1,5 @@
+"""Host stand-in for ``ntptime``: the host clock is already correct."""
+
+
+def settime():
+    pass
@@ -1,15 +1,155 @@
 import network
 import time
-import urequests
 import gc
 import ntptime
 from machine import Pin, I2C, reset
-import ssd1306
-import math
 import conf
-import ugit
 
-MAIN_VERSION = "1.2.8"
+# --- Przejście ze starego ugit (do 1.2.8) -----------------------------------
+# Stary ugit.py podmieniał tylko main.py i restartował płytkę. Ten main.py
+# potrzebuje reszty modułów oraz nowych conf.py i ugit.py, więc gdy ich nie
+# ma, pobieramy wszystkie pliki z manifest.json (SHA-256 jak w ugit.py)
+# i restartujemy. Tylko moduły wbudowane - nie wiadomo, co jeszcze jest
+# na płytce.
+MIGRATE_URL = "https://raw.githubusercontent.com/Blankeuuu/Server-Helper/refs/heads/main/"  # jak ugit.BASE_URL
+MIGRATE_RETRY = 30
+
+def migrate_get(url, name=None, buf=None):
+    # GET przez HTTP/1.0 (bez chunked, koniec treści = zamknięcie gniazda).
+    # Z name treść idzie do pliku i wynikiem jest jej SHA-256, inaczej bytes
+    import socket
+    import hashlib
+    import binascii
+    proto, _, rest = url.partition("://")
+    hostport, _, path = rest.partition("/")
+    host, _, port = hostport.partition(":")
+    port = int(port) if port else (443 if proto == "https" else 80)
+    s = socket.socket()
+    s.settimeout(10)
+    try:
+        s.connect(socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][-1])
+        if proto == "https":
+            import ssl
+            s = ssl.wrap_socket(s, server_hostname=host)
+        f = s.makefile("rwb", 0) if hasattr(s, "makefile") else s
+        f.write(b"GET /%s HTTP/1.0\r\nHost: %s\r\n\r\n" % (path.encode(), host.encode()))
+        status = f.readline().split(None, 2)
+        if len(status) < 2 or status[1] != b"200":
+            raise OSError("HTTP %s" % (status[1].decode() if len(status) > 1 else "?"))
+        while f.readline() not in (b"\r\n", b""):
+            pass
+        if name is None:
+            out = bytearray()
+            while True:
+                data = f.read(512)
+                if not data:
+                    return bytes(out)
+                out.extend(data)
+        h = hashlib.sha256()
+        mv = memoryview(buf)
+        with open(name, "wb") as out:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(mv[:n])
+                out.write(mv[:n])
+        return binascii.hexlify(h.digest()).decode()
+    finally:
+        s.close()
+
+def migrate_hash(name, buf):
+    import hashlib
+    import binascii
+    h = hashlib.sha256()
+    mv = memoryview(buf)
+    with open(name, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+    return binascii.hexlify(h.digest()).decode()
+
+def migrate():
+    import os
+    import ujson
+    if hasattr(conf, "get"):
+        cfg = conf.get()
+    else:
+        # Stary conf.py trzymał ustawienia (także z edycji pliku) w conf.settings;
+        # nowy czyta je z conf.json
+        cfg = conf.settings
+        with open("conf.json", "w") as f:
+            ujson.dump(cfg, f)
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if not wlan.isconnected():
+        wlan.connect(cfg["SSID"], cfg["PASSWORD"])
+        for _ in range(20):
+            if wlan.isconnected():
+                break
+            time.sleep(1)
+    base = cfg.get("OTA_URL") or MIGRATE_URL
+    files = ujson.loads(migrate_get(base + "manifest.json"))["files"]
+    buf = bytearray(1024)
+    names = []
+    try:
+        for name in files:
+            entry = files[name]
+            try:
+                if migrate_hash(name, buf) == entry["sha256"].lower():
+                    continue
+            except OSError:
+                pass
+            print("Migracja: pobieram", name)
+            names.append(name)
+            if migrate_get(base + name, name + ".new", buf) != entry["sha256"].lower():
+                raise ValueError("Hash mismatch: " + name)
+    except BaseException:
+        for name in names:
+            try:
+                os.remove(name + ".new")
+            except OSError:
+                pass
+        raise
+    for name in names:
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+        os.rename(name + ".new", name)
+    print("Migracja: zaktualizowano", len(names), "plików")
+
+try:
+    import uasyncio as asyncio
+    import uhttp
+    import display
+    import sprites
+    import buttons
+    import history
+    import push
+    import power
+    import diag
+    import cache
+    import rollup
+    import alerts
+    import servers
+    import ugit
+    MODULES_OK = hasattr(conf, "get") and hasattr(ugit, "apply")
+except (ImportError, AttributeError) as e:
+    print("Brak modułów:", e)
+    MODULES_OK = False
+if not MODULES_OK:
+    try:
+        migrate()
+    except Exception as e:
+        # Bez sieci albo przy błędzie pobierania - kolejna próba po restarcie
+        print("Błąd migracji:", e)
+        time.sleep(MIGRATE_RETRY)
+    reset()
+
+MAIN_VERSION = "2.0.0"
 
 LANGS = {
     "ENG": {
@@ -26,23 +166,26 @@ LANGS = {
         "YES": "Y=K1",
         "NO": "N=K2",
         "VERSION": "Ver",
-        "BACK": "K4=Back",
-        "PLUS": "K1+",
-        "MINUS": "K2-",
-        "NEXT": "K3->",
         "DISK_NONE": "No disks",
         "OCCUP": "Usage",
         "USED": "Used",
         "SIZE": "Size",
         "ALERT": "ALERT",
-        "MENU": "Menu",
-        "NETWORK_NO": "enp3s0 no data",
+        "NETWORK_NO": "%s no data",
+        "HISTORY_NONE": "No history yet",
+        "OFFLINE": "offline",
         "BRIGHTNESS": "Brightness",
         "UPDATING": "Updating...",
         "PROGRESS": "Progress",
         "TIMEZONE": "Timezone",
         "ECO_MODE": "Eco Mode",
         "RESET_DEFAULTS": "Reset Defaults",
+        "DIAG": "Diagnostics",
+        "CONNECTING": "Connecting...",
+        "UPDATE_FAILED": "Update failed",
+        "UP_TO_DATE": "Up to date",
+        "STALE": "old data",
+        "STALE_SINCE": "since %s",
         "RESET_CONFIRM": "Reset all settings?",
         "RESET_DONE": "Defaults loaded!"
     },
@@ -60,23 +203,26 @@ LANGS = {
         "YES": "T=K1",
         "NO": "N=K2",
         "VERSION": "Wersja",
-        "BACK": "K4=Wstecz",
-        "PLUS": "K1+",
-        "MINUS": "K2-",
-        "NEXT": "K3->",
         "DISK_NONE": "Brak dyskow",
         "OCCUP": "Zajecie",
         "USED": "Uzyte",
         "SIZE": "Rozmiar",
         "ALERT": "ALERT",
-        "MENU": "Menu",
-        "NETWORK_NO": "enp3s0 brak danych",
+        "NETWORK_NO": "%s brak danych",
+        "HISTORY_NONE": "Brak historii",
+        "OFFLINE": "offline",
         "BRIGHTNESS": "Jasnosc",
         "UPDATING": "Aktualizacja...",
         "PROGRESS": "Postęp",
         "TIMEZONE": "Strefa czasowa",
         "ECO_MODE": "Tryb Eco",
         "RESET_DEFAULTS": "Przywróć domyślne",
+        "DIAG": "Diagnostyka",
+        "CONNECTING": "Łączenie...",
+        "UPDATE_FAILED": "Aktualizacja nieudana",
+        "UP_TO_DATE": "Brak nowszej wersji",
+        "STALE": "stare dane",
+        "STALE_SINCE": "stan z %s",
         "RESET_CONFIRM": "Przywrócić ustawienia?",
         "RESET_DONE": "Domyślne ustawienia!"
     }
@@ -94,16 +240,23 @@ settings = [
     {"label": "SLEEP_START", "key": "sleep_start", "min": 0, "max": 23, "step": 1},
     {"label": "SLEEP_END", "key": "sleep_end", "min": 0, "max": 23, "step": 1},
     {"label": "TIMEZONE", "key": "timezone", "min": -12, "max": 14, "step": 1},
+    {"label": "DIAG", "diag": True},
     {"label": "RESET_DEFAULTS", "reset": True}
 ]
 
-settings_state = conf.settings.copy()
+config = conf.get()
+settings_state = config.copy()
 
 settings_index = 0
 in_settings = False
 in_update_confirm = False
 in_update_progress = False
 in_reset_confirm = False
+in_diag = False
+diag_screen = 0
+diag_scroll = 0
+DIAG_ROWS = 6
+DIAG_STATS_ROWS = 7
 screen_off = False
 last_activity_time = time.ticks_ms()
 SLEEP_DURATION = 15 * 1000
@@ -111,241 +264,254 @@ ECO_TIMEOUT = 120 * 1000  # 2 min
 settings_scroll_offset = 0
 sleep_wake_ignore = False
 
-SSID = conf.SSID
-PASSWORD = conf.PASSWORD
-REFRESH_INTERVAL = settings_state["refresh"]
-CPU_URL = conf.CPU_URL
-MEM_URL = conf.MEM_URL
-SENSORS_URL = conf.SENSORS_URL
-DISK_URL = conf.DISK_URL
-NETWORK_URL = conf.NETWORK_URL
-SYSTEM_URL = conf.SYSTEM_URL
+SSID = config["SSID"]
+PASSWORD = config["PASSWORD"]
+PUSH_PORT = config["PUSH_PORT"]
 
 i2c = I2C(0, scl=Pin(1), sda=Pin(0))
-oled = ssd1306.SSD1306_I2C(128, 64, i2c)
+oled = display.DirtyOLED(128, 64, i2c)
 
-button_k1 = Pin(2, Pin.IN, Pin.PULL_UP)
-button_k2 = Pin(3, Pin.IN, Pin.PULL_UP)
-button_k3 = Pin(4, Pin.IN, Pin.PULL_UP)
-button_k4 = Pin(5, Pin.IN, Pin.PULL_UP)
+buttons.setup((2, 3, 4, 5))
+K1, K2, K3, K4 = buttons.K1, buttons.K2, buttons.K3, buttons.K4
 
 brightness = 128
 eco_brightness = 30
 slider_visible = False
 slider_show_time = 0
 current_page = 0
+history_index = 0
+# 0 = ostatnie próbki z RAM, 1.. = rozdzielczość z rollup.RESOLUTIONS
+history_range = 0
 
-filtered_disks = []
 selected_disk_index = 0
-server_name = "Server"
+OVERVIEW_PAGE = 4
+ROTATE_PERIOD = settings_state.get("ROTATE", 0) * 1000
+last_rotate_time = 0
 
 alert_active = False
 alert_message = ""
 alert_start_time = 0
+alert_severity = 0
+alert_lines = []
+ALERT_CHARS = 21
+ALERT_ROWS = 3
+# Czas wyświetlania alertu (ms) według ważności: informacja, ostrzeżenie, krytyczny
+ALERT_TIME = (0, 3000, 10000, 60000)
 
 wifi_reconnect_time = 0
-wifi_last_status = False
+WIFI_RETRY = 10 * 1000
 wifi = None
-
-def T(key):
-    lang = settings_state.get("lang", "ENG")
-    return LANGS[lang][key]
+wifi_paused = False
+ntp_synced = False
+ntp_retry_time = 0
+# NTP (blokujące) dopiero po pierwszych danych, a gdy serwer milczy - po NTP_DELAY od startu
+NTP_DELAY = 15 * 1000
+NTP_RETRY = 60 * 1000
+OTA_CONFIRM = 60 * 1000
+LIGHTSLEEP = settings_state["LIGHTSLEEP"]
+SLEEP_WLAN_OFF = settings_state["SLEEP_WLAN"] == "off"
+
+reset_done_time = None
+INPUT_PERIOD = 0.02
+RENDER_MS = 30
+# Pełne gc.collect() dopiero, gdy pobieranie zaalokuje tyle bajtów
+GC_STEP = 16 * 1024
+gc_mark = 0
+
+# Każdy serwer ma własne dane, historię, alerty i harmonogram (servers.py);
+# ekran pokazuje jeden z nich - server
+server_list = [servers.Server(cfg, config["ALERTS"], settings_state["refresh"] * 1000)
+               for cfg in conf.server_list(config)[:servers.MAX_SERVERS]]
+server_index = 0
+server = server_list[0]
+# Ostatni znany stan z flasha - pierwsza klatka ma już co pokazać
+for _i in range(len(server_list)):
+    cache.load(server_list[_i], _i)
+# Zbiorcze dane 1 min / 15 min / 1 h na flashu (rollup.py), zasilane próbkami z historii
+if config["ROLLUPS"]:
+    for _i in range(len(server_list)):
+        server_list[_i].history.sink = rollup.Store(_i)
+# DUAL_CORE: pobieranie i parsowanie na rdzeniu 1 (worker.py), ten rdzeń tylko rysuje i obsługuje przyciski
+fetcher = None
+if config["DUAL_CORE"]:
+    import worker
+    fetcher = worker.Worker(server_list)
+DUAL_POLL = 0.05
 
 def ascii_polish(text):
     pol = "ąćęłńóśźżĄĆĘŁŃÓŚŹŻ"
     asc = "acelnoszzACELNOSZZ"
     return ''.join(asc[pol.index(c)] if c in pol else c for c in text)
 
+# Etykiety już bez polskich znaków, policzone raz dla każdego języka
+LABELS = {lang: {key: ascii_polish(text) for key, text in texts.items()} for lang, texts in LANGS.items()}
+labels = LABELS["ENG"]
+slider_chars = ()
+SSID_TEXT = ascii_polish(SSID)
+
+# Zmiana stanu interfejsu (przycisk, serwer, język) - strony przeliczają wtedy napisy
+ui_version = 0
+
+def touch_ui():
+    global ui_version
+    ui_version += 1
+
+def set_language():
+    global labels, slider_chars
+    labels = LABELS.get(settings_state.get("lang", "ENG"), LABELS["ENG"])
+    slider_chars = tuple(labels["BRIGHTNESS"])
+    touch_ui()
+
+set_language()
+
+def T(key):
+    return labels[key]
+
 def save_settings():
+    # Zapis na flash dopiero po chwili bez zmian albo przy wyjściu z menu (conf.flush)
     conf.save(settings_state)
+    set_language()
 
 def reset_settings():
-    global settings_state
-    settings_state = conf.DEFAULTS.copy()
+    # Tylko ustawienia z menu - WiFi i serwery z conf.json zostają
+    for key in conf.MENU_KEYS:
+        settings_state[key] = conf.DEFAULTS[key]
     save_settings()
 
-def trigger_alert(msg):
-    global alert_active, alert_message, alert_start_time
+# Napisy bieżącej strony. Render tylko je rysuje; przelicza je dopiero, gdy
+# zmienią się dane serwera (Server.version), strona albo stan interfejsu,
+# więc klatka z niezmienionymi danymi nic nie alokuje
+view = {}
+view_page = -1
+view_version = -1
+view_ui = -1
+SETTINGS_VIEW = 10
+SPLASH_VIEW = 11
+ROLLUP_VIEW = 12
+
+def view_stale(page, version):
+    global view_page, view_version, view_ui
+    if page == view_page and version == view_version and ui_version == view_ui:
+        return False
+    view_page = page
+    view_version = version
+    view_ui = ui_version
+    return True
+
+def trigger_alert(msg, severity=alerts.WARNING):
+    # Mniej ważny alert nie przykrywa wyświetlanego ważniejszego
+    global alert_active, alert_message, alert_start_time, alert_severity, alert_lines
+    if alert_active and severity < alert_severity:
+        return
     alert_active = True
     alert_message = msg
+    alert_lines = split_alert(msg)
+    alert_severity = severity
     alert_start_time = time.ticks_ms()
 
-def show_alert(msg, now):
+def split_alert(msg):
+    # Linie alertu z pozycją x - dzielone raz, przy wywołaniu alertu
+    lines = []
+    m = ascii_polish(msg)
+    while len(m) > 0:
+        line = m[:ALERT_CHARS]
+        lines.append((line, (128 - len(line)*6)//2 if len(line) < ALERT_CHARS else 1))
+        m = m[ALERT_CHARS:]
+    return lines
+
+def show_alert(now):
     oled.fill(0)
     oled.rect(0, 0, 128, 64, 1)
     alert_text = T("ALERT")
     x_alert = (128 - len(alert_text)*8)//2
-    for dy in [0,1]:
-        oled.text(alert_text, x_alert, 6+dy, 1)
-    max_chars = 21
-    max_lines_on_screen = 3
-    lines = []
-    m = ascii_polish(msg)
-    while len(m) > 0:
-        lines.append(m[:max_chars])
-        m = m[max_chars:]
-    if len(lines) <= max_lines_on_screen:
-        visible_lines = lines
-    else:
+    oled.text(alert_text, x_alert, 6, 1)
+    oled.text(alert_text, x_alert, 7, 1)
+    lines = alert_lines
+    first_line = 0
+    rows = len(lines)
+    if rows > ALERT_ROWS:
         scroll_period = 2000
-        first_line = (now // scroll_period) % (len(lines) - max_lines_on_screen + 1)
-        visible_lines = lines[first_line:first_line+max_lines_on_screen]
-    for idx, l in enumerate(visible_lines):
-        y = 28 + idx*12
-        x = (128 - len(l)*6)//2 if len(l) < max_chars else 1
-        oled.text(l, x, y, 1)
+        first_line = (now // scroll_period) % (rows - ALERT_ROWS + 1)
+        rows = ALERT_ROWS
+    for idx in range(rows):
+        line = lines[first_line + idx]
+        oled.text(line[0], line[1], 28 + idx*12, 1)
     oled.show()
 
-def check_alert_clear():
-    global alert_active
-    if (not button_k1.value() or not button_k2.value() or
-        not button_k3.value() or not button_k4.value()):
-        alert_active = False
-
 def set_brightness(value):
     global brightness
     brightness = max(0, min(255, value))
     oled.contrast(brightness)
 
-def connect_wifi(auto_reconnect=True):
-    global wifi, wifi_last_status, wifi_reconnect_time
+async def connect_wifi():
+    # Czekanie na połączenie oddaje sterowanie pozostałym zadaniom
+    global wifi, wifi_reconnect_time
     if wifi is None:
         wifi = network.WLAN(network.STA_IF)
     wifi.active(True)
     if not wifi.isconnected():
+        # Stare gniazda keep-alive nie przeżyją ponownego połączenia.
+        # W DUAL_CORE pula uhttp.get należy do rdzenia 1 - zamyka ją sam,
+        # gdy bez WiFi żadne zadanie nie jest włączone
+        if fetcher is None:
+            uhttp.close_all()
+        else:
+            uhttp.aclose_all()
         wifi.connect(SSID, PASSWORD)
         timeout = 10
         while timeout > 0:
             if wifi.isconnected():
                 break
-            time.sleep(1)
+            await asyncio.sleep(1)
             timeout -= 1
-    wifi_last_status = wifi.isconnected()
     wifi_reconnect_time = time.ticks_ms()
     return wifi
 
-def ensure_wifi():
-    global wifi_reconnect_time
-    now = time.ticks_ms()
-    if wifi is None or not wifi.isconnected():
-        if time.ticks_diff(now, wifi_reconnect_time) > 10000:
-            connect_wifi()
-    return wifi and wifi.isconnected()
+def wifi_connected():
+    return wifi is not None and wifi.isconnected()
 
-def fetch_server_name():
-    global server_name
-    try:
-        response = urequests.get(SYSTEM_URL)
-        data = response.json()
-        response.close()
-        gc.collect()
-        if "hostname" in data:
-            server_name = ascii_polish(str(data["hostname"]))
-        else:
-            server_name = "Serwer"
-    except Exception as e:
-        print("Nie mogę pobrać nazwy serwera:", e)
-        server_name = "Server"
+push_listener = None
+PUSH_POLL = 0.1
 
-def fetch_data():
-    data = {}
-    try:
-        response = urequests.get(CPU_URL)
-        cpu_data = response.json()
-        response.close()
-        data['cpu'] = cpu_data.get('total', 'N/A')
-        gc.collect()
-    except Exception as e:
-        print(f"CPU error: {e}")
-        data['cpu'] = 'N/A'
-    try:
-        response = urequests.get(MEM_URL)
-        mem_data = response.json()
-        response.close()
-        data['mem'] = mem_data.get('percent', 'N/A')
-        gc.collect()
-    except Exception as e:
-        print(f"MEM error: {e}")
-        data['mem'] = 'N/A'
-    try:
-        response = urequests.get(SENSORS_URL)
-        sensors = response.json()
-        response.close()
-        gc.collect()
-        temp_value = 'N/A'
-        for sensor in sensors:
-            if sensor.get('label') == 'CPUTIN':
-                temp_value = sensor.get('value', 'N/A')
-                break
-        data['temp'] = temp_value
-    except Exception as e:
-        print(f"TEMP error: {e}")
-        data['temp'] = 'N/A'
-    return data
+def push_active():
+    return push_listener is not None and push_listener.alive(time.ticks_ms())
 
-def fetch_disk_data():
+async def push_task():
+    # Pierwszy serwer sam wysyła zrzuty; dopóki przychodzą heartbeaty, jego fetch_task nie odpytuje
+    global push_listener
+    target = server_list[0]
     try:
-        response = urequests.get(DISK_URL)
-        data = response.json()
-        response.close()
-        gc.collect()
-        return data
-    except Exception as e:
-        print('Disk data error:', e)
-        return None
+        push_listener = push.Listener(PUSH_PORT)
+    except OSError as e:
+        print("Push error:", e)
+        return
+    snap = target.snapshot()
+    while True:
+        if push_listener.poll(snap, time.ticks_ms()):
+            target.apply_snapshot()
+        await asyncio.sleep(PUSH_POLL)
 
-def fetch_net_data():
-    try:
-        response = urequests.get(NETWORK_URL)
-        data = response.json()
-        response.close()
-        gc.collect()
-        return data
-    except Exception as e:
-        print('Net data error:', e)
-        return None
+def mark_live(now):
+    # Pierwsza klatka z danymi z serwera; nowa wersja po OTA działa, więc boot.py jej nie cofnie
+    if diag.mark_live(now):
+        print("Start: pierwsza klatka %d ms, dane %d ms" % (diag.boot_frame, now))
+        ugit.confirm()
 
 def get_server_ip():
-    # Wyciągnięcie IP z SERVER_URL (np. http://192.168.50.4:61208)
-    url = conf.SERVER_URL
-    if "://" in url:
-        url = url.split("://",1)[1]
-    if "/" in url:
-        url = url.split("/",1)[0]
-    ip = url.split(":")[0]
-    return ip
+    return server.host()
 
 def draw_brightness_slider():
     oled.fill_rect(0, 54, 128, 10, 0)
-    slider_length = int((brightness / 255) * 128)
+    slider_length = brightness * 128 // 255
     oled.fill_rect(0, 54, slider_length, 8, 1)
     oled.rect(0, 54, 128, 8, 1)
-    slider_label = T("BRIGHTNESS")
-    x_label = (128 - len(slider_label)*6)//2
-    for i, char in enumerate(slider_label):
+    chars = slider_chars
+    x_label = (128 - len(chars)*6)//2
+    for i in range(len(chars)):
         char_x = x_label + i*6
         char_mid = char_x + 3
         color = 0 if char_mid < slider_length else 1
-        oled.text(char, char_x, 55, color)
-
-def update_filtered_disks(data):
-    global filtered_disks
-    filtered_disks = []
-    if data:
-        if isinstance(data, dict) and 'fs' in data:
-            fs_list = data['fs']
-        elif isinstance(data, list):
-            fs_list = data
-        else:
-            fs_list = []
-        for disk in fs_list:
-            mnt = disk.get('mnt_point', '')
-            dev = disk.get('device', '')
-            if dev.startswith('/dev/loop') or '/snap/' in mnt or '/core' in mnt or '/ngrok' in mnt or '/micro' in mnt:
-                continue
-            if not mnt:
-                continue
-            filtered_disks.append(disk)
+        oled.text(chars[i], char_x, 55, color)
 
 def simplify_disk_name(mnt):
     if mnt == '/':
@@ -380,13 +546,14 @@ def format_bytes_custom(val, unit):
 
 def display_disk_details():
     oled.fill(0)
-    global filtered_disks, selected_disk_index, settings_state
-    total_disks = len(filtered_disks)
-    unit = settings_state.get("unit", "GB")
-    if not filtered_disks:
-        oled.text(T("DISK_NONE"), 0, 0)
-    else:
-        disk = filtered_disks[selected_disk_index]
+    global selected_disk_index
+    disks = server.disks
+    total_disks = len(disks)
+    if selected_disk_index >= total_disks:
+        selected_disk_index = 0
+    if view_stale(1, server.version) and disks:
+        unit = settings_state.get("unit", "GB")
+        disk = disks[selected_disk_index]
         mnt = disk.get('mnt_point', disk.get('device', 'N/A'))
         label = simplify_disk_name(mnt)
         if len(label) > 4:
@@ -398,143 +565,320 @@ def display_disk_details():
         used_disp = format_bytes_custom(used, unit)
         size_disp = format_bytes_custom(size, unit)
 
+        view['percent'] = "{:>3}%".format(int(percent))
+        view['bar'] = int(percent/100*128)
+        idx_str = f" ({selected_disk_index+1}/{total_disks})"
+        view['line1'] = f"{label}{idx_str}"
+        view['used'] = f"{T('USED')}: {ascii_polish(used_disp)}"
+        view['size'] = f"{T('SIZE')}: {ascii_polish(size_disp)}"
+    if not disks:
+        oled.text(T("DISK_NONE"), 0, 0)
+    else:
         oled.text(T("OCCUP"), 0, 20, 1)
-        oled.text("{:>3}%".format(int(percent)), 70, 20, 1)
-        oled.fill_rect(0, 30, int(percent/100*128), 8, 1)
+        oled.text(view['percent'], 70, 20, 1)
+        oled.fill_rect(0, 30, view['bar'], 8, 1)
         oled.rect(0, 30, 128, 8, 1)
-        idx_str = f" ({selected_disk_index+1}/{total_disks})"
-        line1 = f"{label}{idx_str}"
-        oled.text(line1, 0, 4, 1)
-        oled.text(f"{T('USED')}: {ascii_polish(used_disp)}", 0, 44, 1)
-        oled.text(f"{T('SIZE')}: {ascii_polish(size_disp)}", 0, 54, 1)
+        oled.text(view['line1'], 0, 4, 1)
+        oled.text(view['used'], 0, 44, 1)
+        oled.text(view['size'], 0, 54, 1)
     oled.show()
 
 def draw_wifi_icon(x, y, connected=True):
-    for dx in range(-8, 9):
-        dy = int((1 - (abs(dx)/8))**0.5 * 6) if abs(dx) <= 8 else 0
-        if dy > 0:
-            oled.pixel(x+8+dx, y+1+6-dy, 1)
-    for dx in range(-6, 7):
-        dy = int((1 - (abs(dx)/6))**0.5 * 4) if abs(dx) <= 6 else 0
-        if dy > 0:
-            oled.pixel(x+8+dx, y+5+4-dy, 1)
-    for dx in range(-4, 5):
-        dy = int((1 - (abs(dx)/4))**0.5 * 2) if abs(dx) <= 4 else 0
-        if dy > 0:
-            oled.pixel(x+8+dx, y+9+2-dy, 1)
-    oled.fill_rect(x+8-2, y+13, 5, 3, 1)
+    oled.blit(sprites.WIFI if connected else sprites.WIFI_OFF, x, y, 0)
+
+def stat_value(data, key):
+    try:
+        return float(data[key])
+    except:
+        return 0
 
 def display_stats(data):
     oled.fill(0)
-    global server_name
-    # Wyśrodkowana nazwa serwera na górze (czas usunięty)
-    name_disp = ascii_polish(server_name)
-    x_name = (128 - len(name_disp)*8)//2
-    oled.text(name_disp, x_name, 0, 1)
+    if view_stale(0, server.version):
+        # Wyśrodkowana nazwa serwera na górze (czas usunięty)
+        name_disp = ascii_polish(server.label())[:16]
+        view['name'] = name_disp
+        view['name_x'] = (128 - len(name_disp)*8)//2
+        cpu = stat_value(data, 'cpu')
+        mem = stat_value(data, 'mem')
+        temp = stat_value(data, 'temp')
+        view['cpu'] = "{:>3}%".format(int(cpu))
+        view['cpu_bar'] = int(cpu/100*40)
+        view['mem'] = "{:>3}%".format(int(mem))
+        view['mem_bar'] = int(mem/100*40)
+        view['temp'] = "{:>3}".format(int(temp))
+        view['temp_bar'] = min(int((temp/100)*40),40)
+        # Zamiast SSID: od kiedy dane są nieaktualne
+        view['status'] = stale_text(server) if server.stale else SSID_TEXT
+    oled.text(view['name'], view['name_x'], 0, 1)
     oled.hline(0, 10, 128, 1)
-    try:
-        cpu = float(data['cpu'])
-    except:
-        cpu = 0
-    try:
-        mem = float(data['mem'])
-    except:
-        mem = 0
-    try:
-        temp = float(data['temp'])
-    except:
-        temp = 0
-    oled.text("{:>3}%".format(int(cpu)), 6, 20, 1)
-    oled.fill_rect(0, 34, int(cpu/100*40), 4, 1)
+    oled.text(view['cpu'], 6, 20, 1)
+    oled.fill_rect(0, 34, view['cpu_bar'], 4, 1)
     oled.rect(0, 34, 40, 4, 1)
     oled.text("CPU", 10, 40, 1)
-    oled.text("{:>3}%".format(int(mem)), 48, 20, 1)
-    oled.fill_rect(44, 34, int(mem/100*40), 4, 1)
+    oled.text(view['mem'], 48, 20, 1)
+    oled.fill_rect(44, 34, view['mem_bar'], 4, 1)
     oled.rect(44, 34, 40, 4, 1)
     oled.text("RAM", 52, 40, 1)
-    oled.text("{:>3}".format(int(temp)), 90, 20, 1)
+    oled.text(view['temp'], 90, 20, 1)
     oled.text("C", 110, 20, 1)
-    oled.fill_rect(88, 34, min(int((temp/100)*40),40), 4, 1)
+    oled.fill_rect(88, 34, view['temp_bar'], 4, 1)
     oled.rect(88, 34, 40, 4, 1)
     oled.text("TEMP", 92, 40, 1)
     oled.hline(0, 52, 128, 1)
-    wlan = wifi
-    wifi_ok = wlan and wlan.isconnected()
-    draw_wifi_icon(2, 54, wifi_ok)
-    ssid_disp = ascii_polish(SSID)
-    oled.text(ssid_disp, 24, 56, 1)
+    draw_wifi_icon(2, 54, wifi_connected())
+    oled.text(view['status'], 24, 56, 1)
+    if slider_visible:
+        draw_brightness_slider()
+    oled.show()
+
+def display_splash():
+    # Pierwsza klatka po starcie, zanim przyjdą dane: wersja, WiFi i adres serwera
+    oled.fill(0)
+    if view_stale(SPLASH_VIEW, server.version):
+        host = ascii_polish(server.label() or server.host())[:16]
+        view['host'] = host
+        view['host_x'] = (128 - len(host)*8)//2
+        view['ver'] = "v" + MAIN_VERSION
+        view['ver_x'] = (128 - len(view['ver'])*8)//2
+    oled.text("Server Helper", 12, 6, 1)
+    oled.text(view['ver'], view['ver_x'], 18, 1)
+    oled.hline(0, 30, 128, 1)
+    if wifi_connected():
+        oled.text(view['host'], view['host_x'], 38, 1)
+    else:
+        connecting = T("CONNECTING")
+        oled.text(connecting, (128 - len(connecting)*8)//2, 38, 1)
+    oled.hline(0, 52, 128, 1)
+    draw_wifi_icon(2, 54, wifi_connected())
+    oled.text(SSID_TEXT, 24, 56, 1)
     if slider_visible:
         draw_brightness_slider()
     oled.show()
 
+def stale_text(srv):
+    # "stan z 14:05"; starsze niż doba - "stan z 17.10"
+    if not srv.good_at:
+        return T("STALE")
+    t = time.localtime(srv.good_at + int(settings_state.get("timezone", 0)) * 3600)
+    if servers.clock() - srv.good_at < 86400:
+        when = "%02d:%02d" % (t[3], t[4])
+    else:
+        when = "%02d.%02d" % (t[2], t[1])
+    return T("STALE_SINCE") % when
+
 def draw_net_icon(x, y):
-    oled.line(x+4, y+8, x+4, y+2, 1)
-    oled.pixel(x+4, y+1, 1)
-    oled.pixel(x+2, y+4, 1)
-    oled.pixel(x+6, y+4, 1)
-    oled.pixel(x+1, y+6, 1)
-    oled.pixel(x+7, y+6, 1)
-    oled.pixel(x+0, y+8, 1)
-    oled.pixel(x+8, y+8, 1)
+    oled.blit(sprites.NET, x, y, 0)
 
 def draw_upload_icon(x, y):
-    oled.vline(x+4, y+2, 8, 1)
-    oled.hline(x+2, y+2, 5, 1)
-    oled.pixel(x+4, y, 1)
-    oled.pixel(x+3, y+1, 1)
-    oled.pixel(x+5, y+1, 1)
+    oled.blit(sprites.UPLOAD, x, y, 0)
 
 def draw_download_icon(x, y):
-    oled.vline(x+4, y, 8, 1)
-    oled.hline(x+2, y+6, 5, 1)
-    oled.pixel(x+4, y+8, 1)
-    oled.pixel(x+3, y+7, 1)
-    oled.pixel(x+5, y+7, 1)
+    oled.blit(sprites.DOWNLOAD, x, y, 0)
 
 def draw_speed_icon(x, y):
-    for i in range(8):
-        angle = i * (3.1415/4)
-        dx = int(5 * math.cos(angle))
-        dy = int(5 * math.sin(angle))
-        oled.pixel(x+4+dx, y+4+dy, 1)
-    oled.ellipse(x+4, y+4, 3, 3, 1)
+    oled.blit(sprites.SPEED, x, y, 0)
 
 def draw_ip_icon(x, y):
     # Prosta ikonka IP (monitor z kropką)
-    oled.rect(x, y, 16, 10, 1)
-    oled.hline(x+3, y+8, 10, 1)
-    oled.fill_rect(x+7, y+11, 2, 2, 1)
-    oled.pixel(x+14, y+12, 1)
+    oled.blit(sprites.IP, x, y, 0)
 
 def display_net_data(data):
     oled.fill(0)
-    iface = None
-    unit = "MB"
-    if data and isinstance(data, list):
-        for i in data:
-            if i.get('interface_name', '') == 'enp3s0':
-                iface = i
-                break
+    if view_stale(2, server.version):
+        iface = None
+        unit = "MB"
+        if data and isinstance(data, list):
+            for i in data:
+                if i.get('interface_name', '') == server.iface:
+                    iface = i
+                    break
+        view['iface'] = iface is not None
+        if iface:
+            view['sent'] = format_bytes_custom(iface.get('bytes_sent_gauge', 0), unit)
+            view['recv'] = format_bytes_custom(iface.get('bytes_recv_gauge', 0), unit)
+            view['speed'] = format_bytes_custom(iface.get('speed', 0), unit)+"/s"
+        else:
+            view['none'] = T("NETWORK_NO") % server.iface
+        # IP serwera centralnie pod bandwidth z własną ikoną
+        ip = get_server_ip()
+        view['ip'] = ip
+        view['ip_x'] = (128 - len(ip)*8)//2
     draw_net_icon(4, 4)
-    oled.text("enp3s0", 20, 0, 1)
+    oled.text(server.iface, 20, 0, 1)
     oled.hline(0, 12, 128, 1)
-    if iface:
-        sent = iface.get('bytes_sent', 0)
-        recv = iface.get('bytes_recv', 0)
-        speed = iface.get('speed', 0)
+    if view['iface']:
         draw_upload_icon(4, 18)
-        oled.text(format_bytes_custom(sent, unit), 20, 16, 1)
+        oled.text(view['sent'], 20, 16, 1)
         draw_download_icon(4, 32)
-        oled.text(format_bytes_custom(recv, unit), 20, 30, 1)
+        oled.text(view['recv'], 20, 30, 1)
         draw_speed_icon(4, 46)
-        oled.text(format_bytes_custom(speed, unit)+"/s", 20, 44, 1)
+        oled.text(view['speed'], 20, 44, 1)
     else:
-        oled.text(T("NETWORK_NO"), 0, 28)
-    # IP serwera centralnie pod bandwidth z własną ikoną
-    ip = get_server_ip()
-    x_ip = (128 - len(ip)*8)//2
+        oled.text(view['none'], 0, 28)
+    x_ip = view['ip_x']
     draw_ip_icon(x_ip-18, 54)  # Ikona z lewej strony IP
-    oled.text(ip, x_ip, 56, 1)
+    oled.text(view['ip'], x_ip, 56, 1)
+    oled.show()
+
+def draw_sparkline(series, x, y, w, h):
+    n = series.count if series.count < w else w
+    top = series.scale or (series.hi if series.hi > 0 else 1)
+    first = series.count - n
+    prev_x = prev_y = -1
+    for k in range(n):
+        v = series.at(first + k)
+        if v < 0:
+            v = 0
+        elif v > top:
+            v = top
+        px = x + w - n + k
+        py = y + h - 1 - v * (h - 1) // top
+        if prev_x >= 0:
+            oled.line(prev_x, prev_y, px, py, 1)
+        else:
+            oled.pixel(px, py, 1)
+        prev_x = px
+        prev_y = py
+
+def history_label(idx):
+    metrics = server.history.metrics
+    disk_no = idx - (len(metrics) - history.MAX_DISKS)
+    if 0 <= disk_no < len(server.disks):
+        return simplify_disk_name(server.disks[disk_no].get('mnt_point', ''))[:10] + " %"
+    return metrics[idx].label
+
+def rollup_label(value):
+    return "-" if value == rollup.MISSING else str(value)
+
+def display_rollup(store, res):
+    # Słupek min..max na przedział; plik czytany tylko po zamknięciu przedziału albo zmianie wyboru
+    oled.fill(0)
+    series = server.history.metrics[history_index]
+    if view_stale(ROLLUP_VIEW, store.version):
+        view['found'] = store.read(res, history_index)
+        lo = hi = rollup.MISSING
+        total = count = 0
+        for k in range(rollup.BUCKETS):
+            if rollup.avg[k] == rollup.MISSING:
+                continue
+            if lo == rollup.MISSING or rollup.lo[k] < lo:
+                lo = rollup.lo[k]
+            if hi == rollup.MISSING or rollup.hi[k] > hi:
+                hi = rollup.hi[k]
+            total += rollup.avg[k]
+            count += 1
+        view['label'] = history_label(history_index)
+        name = rollup.RESOLUTIONS[res][0]
+        view['idx'] = name
+        view['idx_x'] = 128 - len(name)*8
+        view['lo'] = rollup_label(lo)
+        avg = "~" + (str(total // count) if count else "-")
+        view['avg'] = avg
+        view['avg_x'] = (128 - len(avg)*8)//2
+        hi_text = rollup_label(hi)
+        view['hi'] = hi_text
+        view['hi_x'] = 128 - len(hi_text)*8
+        view['top'] = series.scale or (hi if hi > 0 else 1)
+    oled.text(view['label'], 0, 0, 1)
+    oled.text(view['idx'], view['idx_x'], 0, 1)
+    oled.hline(0, 10, 128, 1)
+    if not view['found']:
+        oled.text(T("HISTORY_NONE"), 0, 32, 1)
+    else:
+        oled.text(view['lo'], 0, 13, 1)
+        oled.text(view['avg'], view['avg_x'], 13, 1)
+        oled.text(view['hi'], view['hi_x'], 13, 1)
+        top = view['top']
+        for k in range(rollup.BUCKETS):
+            if rollup.avg[k] == rollup.MISSING:
+                continue
+            a = min(max(rollup.lo[k], 0), top)
+            b = min(max(rollup.hi[k], 0), top)
+            y1 = 63 - b * 40 // top
+            y2 = 63 - a * 40 // top
+            oled.vline(k, y1, y2 - y1 + 1, 1)
+    oled.show()
+
+def display_history():
+    store = server.history.sink
+    if history_range and store is not None:
+        display_rollup(store, history_range - 1)
+        return
+    oled.fill(0)
+    metrics = server.history.metrics
+    series = metrics[history_index]
+    if view_stale(3, server.version):
+        view['label'] = history_label(history_index)
+        idx_str = f"{history_index+1}/{len(metrics)}"
+        view['idx'] = idx_str
+        view['idx_x'] = 128 - len(idx_str)*8
+        # min z lewej, średnia na środku, max z prawej
+        view['lo'] = str(series.lo)
+        avg = "~" + str(series.avg)
+        view['avg'] = avg
+        view['avg_x'] = (128 - len(avg)*8)//2
+        hi = str(series.hi)
+        view['hi'] = hi
+        view['hi_x'] = 128 - len(hi)*8
+    oled.text(view['label'], 0, 0, 1)
+    oled.text(view['idx'], view['idx_x'], 0, 1)
+    oled.hline(0, 10, 128, 1)
+    if not series.count:
+        oled.text(T("HISTORY_NONE"), 0, 32, 1)
+    else:
+        oled.text(view['lo'], 0, 13, 1)
+        oled.text(view['avg'], view['avg_x'], 13, 1)
+        oled.text(view['hi'], view['hi_x'], 13, 1)
+        draw_sparkline(series, 0, 23, 128, 41)
+    oled.show()
+
+def overview_value(value):
+    try:
+        return "{:>3}".format(int(float(value)))
+    except (TypeError, ValueError):
+        return " --"
+
+def overview_rows():
+    # (nazwa, cpu, ram, temp); cpu = None, gdy serwer nie odpowiada
+    rows = []
+    for srv in server_list:
+        name = ascii_polish(srv.label())[:5]
+        if srv.sched.offline or not srv.stats:
+            rows.append((name, None, None, None))
+            continue
+        stats = srv.stats
+        rows.append((name, overview_value(stats.get('cpu')), overview_value(stats.get('mem')),
+                     overview_value(stats.get('temp'))))
+    return rows
+
+def display_overview():
+    # Wszystkie serwery naraz: nazwa, CPU, RAM, temperatura; wybrany serwer w negatywie
+    oled.fill(0)
+    version = 0
+    for srv in server_list:
+        version += srv.version
+    if view_stale(OVERVIEW_PAGE, version):
+        view['rows'] = overview_rows()
+    oled.text("CPU", 48, 0, 1)
+    oled.text("RAM", 76, 0, 1)
+    oled.text("TMP", 104, 0, 1)
+    oled.hline(0, 10, 128, 1)
+    rows = view['rows']
+    for i in range(len(rows)):
+        row = rows[i]
+        y = 14 + i * 13
+        c = 1
+        if i == server_index:
+            oled.fill_rect(0, y - 2, 128, 12, 1)
+            c = 0
+        oled.text(row[0], 0, y, c)
+        if row[1] is None:
+            oled.text(T("OFFLINE"), 48, y, c)
+            continue
+        oled.text(row[1], 48, y, c)
+        oled.text(row[2], 76, y, c)
+        oled.text(row[3], 104, y, c)
     oled.show()
 
 def scroll_version_text(version, y, selected, now):
@@ -551,53 +895,101 @@ def scroll_version_text(version, y, selected, now):
         text = text[:max_width // char_width]
     return text
 
-def display_settings_panel(now=0):
-    oled.fill(0)
-    global settings, settings_index, settings_state, settings_scroll_offset
-    oled.rect(0, 0, 128, 12, 1)
-    oled.text(T("SETTINGS"), 33, 2, 1)
-    oled.hline(0, 12, 128, 1)
-
+def settings_rows():
+    # (napis, x, y, nagłówek, wybrany) dla widocznych pozycji ustawień
+    global settings_scroll_offset
+    rows = []
     visible_lines = 3
     if settings_index < settings_scroll_offset:
         settings_scroll_offset = settings_index
     elif settings_index >= settings_scroll_offset + visible_lines:
         settings_scroll_offset = settings_index - visible_lines + 1
     visible_settings = settings[settings_scroll_offset:settings_scroll_offset+visible_lines]
-    visible_idx = 0
-    total_items = len(settings)
     for i, s in enumerate(visible_settings):
-        y = 18 + 14 * visible_idx
+        y = 18 + 14 * i
         idx = settings_scroll_offset + i
+        selected = idx == settings_index
+        prefix = ">" if selected else " "
         if s.get("header") and s["label"] == "VERSION":
             version_text = f"{T('VERSION')}. {MAIN_VERSION.strip()}"
-            oled.text("- " + version_text + " -", 8, y, 1)
-            oled.hline(0, y+10, 128, 1)
+            rows.append(("- " + version_text + " -", 8, y, True, False))
         elif s.get("header"):
-            oled.text("- " + T(s["label"]) + " -", 10, y, 1)
-            oled.hline(0, y+10, 128, 1)
-        elif s.get("update"):
-            if idx == settings_index:
-                oled.rect(0, y-2, 128, 14, 1)
-                oled.fill_rect(2, y, 124, 10, 0)
-            prefix = ">" if idx == settings_index else " "
-            oled.text(f"{prefix}{T('UPDATE')}", 4, y, 1)
-        elif s.get("reset"):
-            if idx == settings_index:
-                oled.rect(0, y-2, 128, 14, 1)
-                oled.fill_rect(2, y, 124, 10, 0)
-            prefix = ">" if idx == settings_index else " "
-            oled.text(f"{prefix}{T('RESET_DEFAULTS')}", 4, y, 1)
+            rows.append(("- " + T(s["label"]) + " -", 10, y, True, False))
+        elif s.get("update") or s.get("reset") or s.get("diag"):
+            rows.append((f"{prefix}{T(s['label'])}", 4, y, False, selected))
         else:
-            if idx == settings_index:
-                oled.rect(0, y-2, 128, 14, 1)
-                oled.fill_rect(2, y, 124, 10, 0)
-            prefix = ">" if idx == settings_index else " "
             val = settings_state[s["key"]]
             if s["key"] == "sleep_enabled" or s["key"] == "eco_mode":
                 val = "On" if val else "Off"
-            oled.text(f"{prefix}{T(s['label'])}: {val}", 4, y, 1)
-        visible_idx += 1
+            rows.append((f"{prefix}{T(s['label'])}: {val}", 4, y, False, selected))
+    return rows
+
+def display_settings_panel(now=0):
+    oled.fill(0)
+    if view_stale(SETTINGS_VIEW, 0):
+        view['rows'] = settings_rows()
+    oled.rect(0, 0, 128, 12, 1)
+    oled.text(T("SETTINGS"), 33, 2, 1)
+    oled.hline(0, 12, 128, 1)
+    rows = view['rows']
+    for i in range(len(rows)):
+        text, x, y, header, selected = rows[i]
+        if selected:
+            oled.rect(0, y-2, 128, 14, 1)
+            oled.fill_rect(2, y, 124, 10, 0)
+        oled.text(text, x, y, 1)
+        if header:
+            oled.hline(0, y+10, 128, 1)
+    oled.show()
+
+# Krótkie nazwy zapytań na stronie diagnostyki
+ENDPOINT_NAMES = {'quicklook': 'quick', 'sensors': 'temp', 'network': 'net', 'system': 'sys', 'status': 'probe'}
+
+def endpoint_name(url):
+    # .../api/4/fs/mnt_point/%2Fmnt%2Fdane -> dane, .../api/4/sensors/label/CPUTIN -> temp
+    i = url.find('/api/4/')
+    if i < 0:
+        return "proxy"
+    parts = url[i + 7:].split('/')
+    if parts[0] == 'fs' and len(parts) > 2:
+        return parts[-1].replace('%2F', '/').rstrip('/').rsplit('/', 1)[-1] or '/'
+    return ENDPOINT_NAMES.get(parts[0], parts[0])
+
+def format_us(us):
+    return "%d.%dms" % (us // 1000, us // 100 % 10)
+
+def format_size(size):
+    if size < 0:
+        return "ERR"
+    if size < 1000:
+        return "%dB" % size
+    return "%dK" % (size // 1024)
+
+def display_diagnostics(now):
+    # Ekran 1: pętla, rysowanie, I2C, GC, pamięć i czasy startu; ekran 2: ostatnie zapytania bieżącego serwera
+    oled.fill(0)
+    oled.text("DIAG %d/2" % (diag_screen + 1), 0, 0, 1)
+    if wifi_connected():
+        try:
+            oled.text("%ddBm" % wifi.status('rssi'), 80, 0, 1)
+        except (OSError, ValueError, TypeError):
+            pass
+    oled.hline(0, 10, 128, 1)
+    if diag_screen == 0:
+        diag.update(now)
+        avg, p95 = diag.loop_stats()
+        rows = ("LOOP %d/%dms" % (avg // 1000, p95 // 1000),
+                "DRAW " + format_us(diag.draw_us),
+                "I2C %s %dB" % (format_us(oled.flush_us), oled.frame_bytes),
+                "GC " + format_us(diag.gc_us),
+                "MEM %dK/%dK" % (gc.mem_free() // 1024, gc.mem_alloc() // 1024),
+                "BLOCK %dK" % (diag.largest_block // 1024),
+                "BOOT %d/%dms" % (diag.boot_frame, diag.boot_live))
+    else:
+        rows = ["%-5s%4dms%5s" % (endpoint_name(url)[:5], min(t[0], 9999), format_size(t[1]))
+                for url, t in server.timings.items()]
+    for i, row in enumerate(rows[diag_scroll:diag_scroll + DIAG_ROWS]):
+        oled.text(row, 0, 12 + i * 9, 1)
     oled.show()
 
 def display_update_confirm():
@@ -625,7 +1017,6 @@ def display_reset_done():
     oled.rect(0, 0, 128, 64, 1)
     oled.text(T("RESET_DONE"), 12, 28, 1)
     oled.show()
-    time.sleep(1)
 
 def display_update_progress(progress=0):
     oled.fill(0)
@@ -638,31 +1029,38 @@ def display_update_progress(progress=0):
     oled.fill_rect(4, 48, bar_width, 8, 1)
     oled.show()
 
-def do_update_with_progress():
-    for p in [10, 40, 70, 100]:
-        display_update_progress(p)
-        time.sleep(0.4)
-    ugit.update_main()
+async def do_update_with_progress():
+    # Pobieranie blokuje pętlę (TLS jest tylko w kliencie synchronicznym),
+    # pasek postępu rysuje się z wywołań zwrotnych ugit
+    conf.flush(time.ticks_ms(), True)
+    for srv in server_list:
+        flush_rollup(srv, time.ticks_ms(), True)
+    display_update_progress(0)
+    await asyncio.sleep(0)
+    if fetcher is not None:
+        # Pula gniazd uhttp.get należy do rdzenia 1 - na czas OTA go zatrzymujemy
+        fetcher.stop()
+    uhttp.close_all()
+    ok = ugit.update_main(config["OTA_URL"], display_update_progress, MAIN_VERSION)
+    if ok:
+        display_update_progress(100)
+        await asyncio.sleep(1)
+        reset()
+    elif ok is None:
+        trigger_alert(T("UP_TO_DATE"), alerts.INFO)
+    else:
+        trigger_alert(T("UPDATE_FAILED"), alerts.WARNING)
+    if fetcher is not None:
+        fetcher.start()
 
-def check_alert_triggers(data, disk_data):
-    try:
-        cpu = float(data.get('cpu', 0))
-        if cpu > 90:
-            trigger_alert("CPU > 90%")
-    except:
-        pass
-    try:
-        mem = float(data.get('mem', 0))
-        if mem > 90:
-            trigger_alert("RAM > 90%")
-    except:
-        pass
-    try:
-        temp = float(data.get('temp', 0))
-        if temp > 75:
-            trigger_alert("TEMP > 75C")
-    except:
-        pass
+def server_alert(srv, msg, severity):
+    # Przy kilku serwerach alert mówi, którego dotyczy
+    if len(server_list) > 1:
+        msg = srv.label() + ": " + msg
+    trigger_alert(msg, severity)
+
+for _srv in server_list:
+    _srv.on_alert = server_alert
 
 def get_local_hour():
     try:
@@ -689,22 +1087,60 @@ def is_sleep_time():
         return False
 
 def handle_sleep_mode():
-    global screen_off, last_activity_time, sleep_wake_ignore
+    # Wybudzanie przyciskiem obsługuje handle_event()
+    global screen_off
+    now = time.ticks_ms()
     if is_sleep_time():
-        if not button_k1.value() or not button_k2.value() or not button_k3.value() or not button_k4.value():
-            if screen_off:
-                sleep_wake_ignore = True
-            screen_off = False
-            last_activity_time = time.ticks_ms()
-            oled.poweron()
-            oled.contrast(brightness)
-        if time.ticks_diff(time.ticks_ms(), last_activity_time) > SLEEP_DURATION:
+        if not screen_off and time.ticks_diff(now, last_activity_time) > SLEEP_DURATION:
             screen_off = True
             oled.poweroff()
-    else:
+            power.screen.start(now)
+            suspend_wifi(now)
+    elif screen_off:
         screen_off = False
         oled.poweron()
         oled.contrast(brightness)
+        power.screen.stop(now)
+        resume_wifi(now)
+        print("Energia:", power.report(now))
+
+def wake_screen(now):
+    global screen_off, sleep_wake_ignore
+    screen_off = False
+    sleep_wake_ignore = True
+    oled.poweron()
+    oled.contrast(brightness)
+    power.screen.stop(now)
+    resume_wifi(now)
+
+def suspend_wifi(now):
+    # Przy zgaszonym ekranie nic nie pobieramy, więc radio może odpocząć
+    global wifi_paused
+    if wifi_paused:
+        return
+    wifi_paused = True
+    if SLEEP_WLAN_OFF and fetcher is None:
+        # W trybie DUAL_CORE gniazda zamyka rdzeń 1, gdy przestaje pobierać
+        uhttp.close_all()
+    power.wlan_suspend(wifi, SLEEP_WLAN_OFF, now)
+
+def resume_wifi(now):
+    global wifi_paused, wifi_reconnect_time
+    if not wifi_paused:
+        return
+    wifi_paused = False
+    power.wlan_resume(wifi, now)
+    # wifi_task połączy się od razu, bez czekania na kolejną próbę
+    wifi_reconnect_time = time.ticks_add(now, -WIFI_RETRY - 1)
+    for srv in server_list:
+        srv.wake.set()
+
+def doze():
+    # Lightsleep do końca okna snu albo do naciśnięcia przycisku
+    # Lightsleep zatrzymałby rdzeń 1 w pół zapytania - w trybie DUAL_CORE ekran tylko gaśnie
+    if not LIGHTSLEEP or fetcher is not None or in_update_progress or buttons.any_down() or buttons.pending():
+        return
+    power.sleep(power.ms_until(settings_state["sleep_end"], int(settings_state.get("timezone", 0))))
 
 def eco_mode_active():
     if settings_state.get("eco_mode", 0):
@@ -712,213 +1148,414 @@ def eco_mode_active():
         return time.ticks_diff(now, last_activity_time) > ECO_TIMEOUT
     return False
 
-def any_button_pressed():
-    return (not button_k1.value() or not button_k2.value() or
-            not button_k3.value() or not button_k4.value())
+def last_page():
+    return OVERVIEW_PAGE if len(server_list) > 1 else 3
 
-def main():
-    global settings_index, in_settings, in_update_confirm, in_update_progress, in_reset_confirm, settings_scroll_offset
-    global brightness, slider_visible, slider_show_time, current_page, selected_disk_index
-    global alert_active, alert_message, alert_start_time, server_name, sleep_wake_ignore, last_activity_time
-
-    connect_wifi()
-    try:
-        ntptime.settime()
-    except:
-        pass
-    fetch_server_name()
-    set_brightness(brightness)
-    last_press_time = time.ticks_ms()
-    debounce_delay = 200
-    last_fetch = time.ticks_ms() - settings_state["refresh"] * 1000
-    data = fetch_data()
-    disk_data = None
-    net_data = None
+def change_page(page):
+    global current_page, selected_disk_index
+    current_page = page
+    if page == 1:
+        selected_disk_index = 0
+    # Pobranie danych nowej strony odbywa się w tle, ekran pokazuje ostatnie znane
+    now = time.ticks_ms()
+    if page == OVERVIEW_PAGE:
+        for srv in server_list:
+            srv.poke(now, True, False, False)
+    else:
+        server.poke(now, page in (0, 3), page == 1, page in (2, 3))
+
+def select_server(idx):
+    global server_index, server, selected_disk_index
+    server_index = idx % len(server_list)
+    server = server_list[server_index]
+    selected_disk_index = 0
+    touch_ui()
+    if current_page != OVERVIEW_PAGE:
+        change_page(current_page)
+
+def rotate_servers(now):
+    # Automatyczne przełączanie serwerów, gdy nikt nie używa przycisków
+    global last_rotate_time
+    if not ROTATE_PERIOD or len(server_list) < 2 or in_settings or current_page == OVERVIEW_PAGE:
+        return
+    if time.ticks_diff(now, last_activity_time) < ROTATE_PERIOD:
+        return
+    if time.ticks_diff(now, last_rotate_time) >= ROTATE_PERIOD:
+        last_rotate_time = now
+        select_server(server_index + 1)
+
+def handle_settings_event(btn, kind, now):
+    global settings_index, in_settings, in_update_confirm, in_update_progress, in_reset_confirm
+    global settings_scroll_offset, reset_done_time, in_diag
+    num_options = len(settings)
+    if in_diag:
+        handle_diag_event(btn, kind)
+        return
+    if in_update_confirm:
+        if kind != buttons.PRESS:
+            return
+        if btn == K1:
+            in_update_confirm = False
+            in_update_progress = True
+        elif btn == K2:
+            in_update_confirm = False
+        return
+    if in_reset_confirm:
+        if kind != buttons.PRESS:
+            return
+        if btn == K1:
+            in_reset_confirm = False
+            reset_settings()
+            reset_done_time = now
+        elif btn == K2:
+            in_reset_confirm = False
+        return
+    if btn == K4:
+        in_settings = False
+        settings_index = 0
+        settings_scroll_offset = 0
+        conf.flush(now, True)
+        return
+    if btn == K3:
+        settings_index = (settings_index + 1) % num_options
+        return
+    s = settings[settings_index]
+    if s.get("header"):
+        return
+    if s.get("update") or s.get("reset") or s.get("diag"):
+        if kind == buttons.PRESS:
+            if s.get("update"):
+                in_update_confirm = True
+            elif s.get("reset"):
+                in_reset_confirm = True
+            else:
+                in_diag = True
+                diag.open()
+        return
+    key = s["key"]
+    if btn == K1:
+        if "options" in s:
+            idx = s["options"].index(settings_state[key])
+            settings_state[key] = s["options"][(idx + 1) % len(s["options"])]
+        else:
+            settings_state[key] = min(s["max"], settings_state[key] + s["step"])
+        save_settings()
+    elif btn == K2:
+        if "options" in s:
+            idx = s["options"].index(settings_state[key])
+            settings_state[key] = s["options"][(idx - 1) % len(s["options"])]
+        else:
+            settings_state[key] = max(s["min"], settings_state[key] - s["step"])
+        save_settings()
+
+def handle_diag_event(btn, kind):
+    # K1/K2 przewijają wiersze, K3 zmienia ekran, K4 wraca do ustawień
+    global in_diag, diag_screen, diag_scroll
+    if btn == K4:
+        if kind == buttons.PRESS:
+            in_diag = False
+            diag.close()
+    elif btn == K3:
+        diag_screen = 1 - diag_screen
+        diag_scroll = 0
+    elif btn == K1:
+        diag_scroll = max(0, diag_scroll - 1)
+    elif btn == K2:
+        rows = len(server.timings) if diag_screen else DIAG_STATS_ROWS
+        diag_scroll = min(max(0, rows - DIAG_ROWS), diag_scroll + 1)
+
+def handle_event(ev, now):
+    global in_settings, settings_index, settings_scroll_offset, selected_disk_index, history_index, history_range
+    global slider_visible, slider_show_time, alert_active, sleep_wake_ignore, last_activity_time
+    btn = ev >> 2
+    kind = ev & 3
+    if kind == buttons.RELEASE:
+        sleep_wake_ignore = False
+        return
+    if kind == buttons.LONG:
+        return
+    # Przytrzymanie powtarza tylko K1/K2 (zmiana wartości, jasność, lista dysków)
+    if kind == buttons.REPEAT and btn > K2:
+        return
+    last_activity_time = now
+    touch_ui()
+    if screen_off:
+        # Naciśnięcie, które wybudziło ekran, nie jest traktowane jako akcja
+        wake_screen(now)
+        return
+    if sleep_wake_ignore:
+        return
+    if alert_active:
+        alert_active = False
+        return
+    if in_settings:
+        handle_settings_event(btn, kind, now)
+        return
+    if current_page == 1 and server.disks:
+        if btn == K1:
+            selected_disk_index = (selected_disk_index - 1) % len(server.disks)
+        elif btn == K2:
+            selected_disk_index = (selected_disk_index + 1) % len(server.disks)
+        elif btn == K3:
+            change_page(2)
+    elif current_page == 2:
+        if btn == K3:
+            change_page(3)
+    elif current_page == 3:
+        metrics = server.history.metrics
+        if btn == K1:
+            history_index = (history_index - 1) % len(metrics)
+        elif btn == K2:
+            history_index = (history_index + 1) % len(metrics)
+        elif btn == K3:
+            change_page(0 if last_page() == 3 else OVERVIEW_PAGE)
+        elif btn == K4 and server.history.sink is not None:
+            # Zakres: ostatnie próbki -> 1 min -> 15 min -> 1 h
+            history_range = (history_range + 1) % (len(rollup.RESOLUTIONS) + 1)
+    elif current_page == OVERVIEW_PAGE:
+        # K1/K2 wybierają serwer pokazywany na pozostałych stronach
+        if btn == K1:
+            select_server(server_index - 1)
+        elif btn == K2:
+            select_server(server_index + 1)
+        elif btn == K3:
+            change_page(0)
+    else:
+        if btn == K1:
+            set_brightness(brightness + 15)
+            slider_visible = True
+            slider_show_time = now
+        elif btn == K2:
+            set_brightness(brightness - 15)
+            slider_visible = True
+            slider_show_time = now
+        elif btn == K3:
+            change_page(current_page + 1 if current_page < last_page() else 0)
+        elif btn == K4:
+            in_settings = True
+            settings_index = 0
+            settings_scroll_offset = 0
+
+def expire_overlays(now):
+    global alert_active, slider_visible
+    if alert_active and time.ticks_diff(now, alert_start_time) > ALERT_TIME[alert_severity]:
+        alert_active = False
+    if slider_visible and time.ticks_diff(now, slider_show_time) > 3000:
+        slider_visible = False
+
+def render(now):
+    # Rysuje wyłącznie z ostatnio pobranych danych - nigdy nie czeka na sieć
+    expire_overlays(now)
+    if screen_off or in_update_progress:
+        return
+    if alert_active:
+        show_alert(now)
+    elif in_settings:
+        if in_update_confirm:
+            display_update_confirm()
+        elif in_reset_confirm:
+            display_reset_confirm()
+        elif reset_done_time is not None and time.ticks_diff(now, reset_done_time) < 1000:
+            display_reset_done()
+        elif in_diag:
+            display_diagnostics(now)
+        else:
+            display_settings_panel(now)
+    elif current_page == 0:
+        if server.stats:
+            display_stats(server.stats)
+        else:
+            display_splash()
+    elif current_page == 1:
+        display_disk_details()
+    elif current_page == 2:
+        display_net_data(server.net_data)
+    elif current_page == 3:
+        display_history()
+    elif current_page == OVERVIEW_PAGE:
+        display_overview()
+
+def tune_server(srv):
+    # Widoczne strony wybranego serwera odświeżamy co "refresh", resztę w tle;
+    # strona przeglądu potrzebuje statystyk wszystkich serwerów
+    refresh = settings_state["refresh"] * 1000
+    page = current_page
+    if page == OVERVIEW_PAGE:
+        srv.tune(refresh, True, False, False)
+    elif srv is server:
+        srv.tune(refresh, page in (0, 3), page == 1, page in (2, 3))
+    else:
+        srv.tune(refresh, False, False, False)
 
-    eco_active = False
+async def input_task():
+    global in_update_progress, in_settings
+    while True:
+        buttons.poll(time.ticks_ms())
+        ev = buttons.pop()
+        while ev >= 0:
+            handle_event(ev, buttons.event_time)
+            ev = buttons.pop()
+        if in_update_progress:
+            await do_update_with_progress()
+            in_update_progress = False
+            in_settings = False
+        if buttons.flag is not None and not buttons.any_down():
+            # Nic nie jest wciśnięte - śpimy do przerwania od przycisku
+            await buttons.flag.wait()
+        else:
+            await asyncio.sleep(INPUT_PERIOD)
 
+async def render_task():
+    while True:
+        start = time.ticks_us()
+        diag.loop(start)
+        render(time.ticks_ms())
+        diag.draw_us = time.ticks_diff(time.ticks_us(), start)
+        if diag.boot_live < 0 and server.stats and not screen_off:
+            mark_live(time.ticks_ms())
+        await asyncio.sleep_ms(RENDER_MS)
+
+def collect_garbage():
+    # Render nie alokuje, więc sprzątamy tylko po pobraniach, które narobiły śmieci
+    global gc_mark
+    if gc.mem_alloc() - gc_mark < GC_STEP:
+        return
+    start = time.ticks_us()
+    gc.collect()
+    diag.gc_us = time.ticks_diff(time.ticks_us(), start)
+    gc_mark = gc.mem_alloc()
+
+def flush_rollup(srv, now, force=False):
+    store = srv.history.sink
+    if store is not None:
+        store.flush(now, force)
+
+async def fetch_task(srv):
+    # Jedno zadanie na serwer: śpi do najbliższego terminu któregoś ze źródeł,
+    # gdy serwer leży, tylko go sonduje. Serwery nie czekają na siebie nawzajem
+    index = server_list.index(srv)
+    while True:
+        wait = settings_state["refresh"] * 1000
+        if not screen_off and wifi_connected() and not (srv is server_list[0] and push_active()):
+            tune_server(srv)
+            wait = await srv.step(wait)
+            collect_garbage()
+        cache.save(srv, index, time.ticks_ms())
+        flush_rollup(srv, time.ticks_ms())
+        try:
+            await asyncio.wait_for(srv.wake.wait(), wait / 1000)
+        except asyncio.TimeoutError:
+            pass
+        srv.wake.clear()
+
+async def dual_task():
+    # Rdzeń 0 w trybie DUAL_CORE: przekazuje rdzeniowi 1 interwały i prośby o
+    # odświeżenie, odbiera gotowe zrzuty. Obiekty Server zmienia tylko ten rdzeń
+    fetcher.start()
+    jobs = fetcher.jobs
     while True:
         now = time.ticks_ms()
-        ensure_wifi()
-        handle_sleep_mode()
+        active = not screen_off and wifi_connected()
+        for i in range(len(server_list)):
+            srv = server_list[i]
+            job = jobs[i]
+            tune_server(srv)
+            job.interval = srv.stats_source.period(now)
+            job.disk_interval = srv.disk_source.interval
+            job.net_interval = srv.net_source.interval
+            job.enabled = active and not (i == 0 and push_active())
+            if srv.wake.is_set():
+                # change_page()/resume_wifi() budzą serwer - tutaj budzi to rdzeń 1
+                srv.wake.clear()
+                job.poked = True
+            snap = job.exchange.take()
+            if snap is not None:
+                srv.apply_snapshot(snap)
+                collect_garbage()
+            srv.report_offline(job.offline)
+            cache.save(srv, i, now)
+            flush_rollup(srv, now)
+        await asyncio.sleep(DUAL_POLL)
+
+def ntp_due(now):
+    if ntp_synced or not wifi_connected():
+        return False
+    if diag.boot_live < 0 and time.ticks_diff(now, NTP_DELAY) < 0:
+        return False
+    return time.ticks_diff(now, ntp_retry_time) >= 0
 
+async def wifi_task():
+    global ntp_synced, ntp_retry_time
+    while True:
+        if wifi_paused:
+            await asyncio.sleep(1)
+            continue
+        if not wifi_connected() and (wifi is None or time.ticks_diff(time.ticks_ms(), wifi_reconnect_time) > WIFI_RETRY):
+            await connect_wifi()
+            if wifi_connected():
+                for srv in server_list:
+                    srv.sched.poke_all(time.ticks_ms())
+                    srv.wake.set()
+        if ntp_due(time.ticks_ms()):
+            try:
+                ntptime.settime()
+                ntp_synced = True
+            except:
+                ntp_retry_time = time.ticks_add(time.ticks_ms(), NTP_RETRY)
+        await asyncio.sleep(1)
+
+async def power_task():
+    eco_active = False
+    confirmed = False
+    while True:
+        if not confirmed and time.ticks_diff(time.ticks_ms(), OTA_CONFIRM) >= 0:
+            # Serwer może nie odpowiadać - po OTA_CONFIRM ms od startu wersja i tak jest dobra
+            ugit.confirm()
+            confirmed = True
+        handle_sleep_mode()
+        rotate_servers(time.ticks_ms())
         if eco_mode_active():
             if not eco_active:
                 set_brightness(eco_brightness)
+                power.wlan_save(wifi, True)
                 eco_active = True
         else:
             if eco_active:
                 set_brightness(brightness)
+                power.wlan_save(wifi, False)
                 eco_active = False
-
+        conf.flush(time.ticks_ms())
         if screen_off:
-            time.sleep(0.1)
-            continue
-        if sleep_wake_ignore:
-            if any_button_pressed():
-                while any_button_pressed():
-                    time.sleep(0.01)
-                sleep_wake_ignore = False
-            continue
-        if alert_active:
-            show_alert(alert_message, now)
-            check_alert_clear()
-            if time.ticks_diff(now, alert_start_time) > 10000:
-                alert_active = False
-            time.sleep(0.05)
-            continue
-        if in_settings:
-            num_options = len(settings)
-            if in_update_progress:
-                do_update_with_progress()
-                in_update_progress = False
-                in_settings = False
-                continue
-            if in_update_confirm:
-                display_update_confirm()
-                if not button_k1.value():
-                    in_update_confirm = False
-                    in_update_progress = True
-                elif not button_k2.value():
-                    in_update_confirm = False
-                time.sleep(0.05)
-                continue
-            if in_reset_confirm:
-                display_reset_confirm()
-                if not button_k1.value():
-                    in_reset_confirm = False
-                    reset_settings()
-                    display_reset_done()
-                elif not button_k2.value():
-                    in_reset_confirm = False
-                time.sleep(0.05)
-                continue
-            s = settings[settings_index]
-            if s.get("header"):
-                if not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    settings_index = (settings_index + 1) % num_options
-                    last_press_time = now
-            elif s.get("update"):
-                if (not button_k1.value() or not button_k2.value()) and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    in_update_confirm = True
-                    last_press_time = now
-                elif not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    settings_index = (settings_index + 1) % num_options
-                    last_press_time = now
-            elif s.get("reset"):
-                if (not button_k1.value() or not button_k2.value()) and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    in_reset_confirm = True
-                    last_press_time = now
-                elif not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    settings_index = (settings_index + 1) % num_options
-                    last_press_time = now
-            else:
-                key = s["key"]
-                if not button_k1.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    if "options" in s:
-                        idx = s["options"].index(settings_state[key])
-                        settings_state[key] = s["options"][(idx + 1) % len(s["options"])]
-                    else:
-                        settings_state[key] = min(s["max"], settings_state[key] + s["step"])
-                    save_settings()
-                    last_press_time = now
-                elif not button_k2.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    if "options" in s:
-                        idx = s["options"].index(settings_state[key])
-                        settings_state[key] = s["options"][(idx - 1) % len(s["options"])]
-                    else:
-                        settings_state[key] = max(s["min"], settings_state[key] - s["step"])
-                    save_settings()
-                    last_press_time = now
-                elif not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                    settings_index = (settings_index + 1) % num_options
-                    last_press_time = now
-            if not button_k4.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                in_settings = False
-                settings_index = 0
-                settings_scroll_offset = 0
-                last_press_time = now
-            display_settings_panel(now)
-            time.sleep(0.05)
-            continue
-        if any_button_pressed():
-            last_activity_time = time.ticks_ms()
-        if current_page == 1 and filtered_disks:
-            if not button_k1.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                selected_disk_index = (selected_disk_index - 1) % len(filtered_disks)
-                last_press_time = now
-            elif not button_k2.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                selected_disk_index = (selected_disk_index + 1) % len(filtered_disks)
-                last_press_time = now
-            elif not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                current_page = 2
-                net_data = fetch_net_data()
-                last_press_time = now
-        elif current_page == 2:
-            if not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                current_page = 0
-                last_press_time = now
-        else:
-            if not button_k1.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                set_brightness(brightness + 15)
-                slider_visible = True
-                slider_show_time = now
-                last_press_time = now
-            elif not button_k2.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                set_brightness(brightness - 15)
-                slider_visible = True
-                slider_show_time = now
-                last_press_time = now
-            elif not button_k3.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                if current_page == 0:
-                    current_page = 1
-                    disk_data = fetch_disk_data()
-                    update_filtered_disks(disk_data)
-                    selected_disk_index = 0
-                elif current_page == 1:
-                    current_page = 2
-                    net_data = fetch_net_data()
-                elif current_page == 2:
-                    current_page = 0
-                last_press_time = now
-            elif not button_k4.value() and time.ticks_diff(now, last_press_time) > debounce_delay:
-                in_settings = True
-                settings_index = 0
-                settings_scroll_offset = 0
-                last_press_time = now
-        if slider_visible and time.ticks_diff(now, slider_show_time) > 3000:
-            slider_visible = False
-        if time.ticks_diff(now, last_fetch) > settings_state["refresh"] * 1000:
-            if current_page == 0:
-                try:
-                    data = fetch_data()
-                    fetch_server_name()
-                except:
-                    trigger_alert("Serwer offline!")
-            elif current_page == 1:
-                try:
-                    disk_data = fetch_disk_data()
-                    update_filtered_disks(disk_data)
-                    if selected_disk_index >= len(filtered_disks):
-                        selected_disk_index = 0
-                except:
-                    trigger_alert("Serwer offline!")
-            elif current_page == 2:
-                try:
-                    net_data = fetch_net_data()
-                except:
-                    trigger_alert("Serwer offline!")
-            last_fetch = now
-            check_alert_triggers(data, disk_data)
-        if current_page == 0:
-            display_stats(data)
-        elif current_page == 1:
-            display_disk_details()
-        elif current_page == 2:
-            display_net_data(net_data)
-        time.sleep(0.03)
-        gc.collect()
+            doze()
+        await asyncio.sleep(0.1)
+
+async def main_async():
+    global gc_mark
+    set_brightness(brightness)
+    # Automatyczne gc.collect() zanim sterta się skończy (gdyby pobieranie przyszło seriami)
+    gc.collect()
+    gc_mark = gc.mem_alloc()
+    gc.threshold(gc.mem_free() // 4 + gc_mark)
+    # Pierwsza klatka zanim ruszy WiFi (wlan.active() potrafi blokować)
+    render(time.ticks_ms())
+    diag.mark_frame(time.ticks_ms())
+    tasks = [
+        render_task(),
+        input_task(),
+        wifi_task(),
+        power_task(),
+    ]
+    if fetcher is not None:
+        tasks.append(dual_task())
+    else:
+        for srv in server_list:
+            tasks.append(fetch_task(srv))
+    if PUSH_PORT:
+        tasks.append(push_task())
+    await asyncio.gather(*tasks)
+
+def main():
+    asyncio.run(main_async())
 
 if __name__ == "__main__":
     main()
-
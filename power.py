@@ -0,0 +1,112 @@
+import time
+import machine
+import network
+
+# Oszczędzanie energii w oknie snu.
+# Gdy ekran jest wygaszony, płytka nie kręci pętlą uasyncio, tylko zasypia
+# w machine.lightsleep(). Budzi ją przerwanie od przycisku K1-K4 (handlery
+# Pin.irq z buttons.setup()) albo zegar o godzinie końca okna snu.
+# Radio na ten czas jest wyłączane (albo przechodzi w tryb oszczędny).
+# Liczniki czasu pozwalają porównać pobór prądu przed i po zmianie.
+
+# Dłuższe okno śpimy kawałkami - po każdym sprawdzamy zegar ponownie
+MAX_SLEEP = 60 * 1000
+MIN_SLEEP = 50
+
+
+class Meter:
+    # Łączny czas w jednym stanie (uśpienie, zgaszony ekran, wyłączone radio)
+    def __init__(self):
+        self.total = 0
+        self.since = None
+
+    def start(self, now):
+        if self.since is None:
+            self.since = now
+
+    def stop(self, now):
+        if self.since is not None:
+            self.total += time.ticks_diff(now, self.since)
+            self.since = None
+
+    def value(self, now):
+        if self.since is None:
+            return self.total
+        return self.total + time.ticks_diff(now, self.since)
+
+
+started = time.ticks_ms()
+asleep = Meter()
+screen = Meter()
+radio = Meter()
+wakes = 0
+button_wakes = 0
+
+
+def ms_until(hour, tz):
+    # Ile ms zostało do pełnej godziny "hour" czasu lokalnego
+    t = time.localtime()
+    now = ((t[3] + tz) % 24) * 3600 + t[4] * 60 + t[5]
+    return (hour * 3600 - now) % 86400 * 1000
+
+
+def sleep(ms):
+    # Blokuje całą pętlę uasyncio - nic w tym czasie nie pobiera ani nie rysuje
+    global wakes, button_wakes
+    if ms > MAX_SLEEP:
+        ms = MAX_SLEEP
+    if ms < MIN_SLEEP:
+        return
+    t0 = time.ticks_ms()
+    asleep.start(t0)
+    machine.lightsleep(ms)
+    now = time.ticks_ms()
+    asleep.stop(now)
+    wakes += 1
+    # Wcześniejsze wybudzenie to przerwanie od przycisku
+    if time.ticks_diff(now, t0) < ms - MIN_SLEEP:
+        button_wakes += 1
+
+
+def wlan_save(wlan, save):
+    # Tryb oszczędny radia; nie każdy port zna stałe PM_*
+    pm = getattr(network.WLAN, "PM_POWERSAVE" if save else "PM_PERFORMANCE", None)
+    if wlan is None or pm is None:
+        return
+    try:
+        wlan.config(pm=pm)
+    except (ValueError, OSError, TypeError):
+        pass
+
+
+def wlan_suspend(wlan, off, now):
+    if wlan is None:
+        return
+    if off:
+        wlan.disconnect()
+        wlan.active(False)
+        radio.start(now)
+    else:
+        wlan_save(wlan, True)
+
+
+def wlan_resume(wlan, now):
+    radio.stop(now)
+    if wlan is not None:
+        wlan.active(True)
+
+
+def duty(now):
+    # Promile czasu z procesorem na chodzie (przed zmianą zawsze 1000)
+    total = time.ticks_diff(now, started)
+    if total <= 0:
+        return 1000
+    return 1000 - asleep.value(now) * 1000 // total
+
+
+def report(now):
+    total = time.ticks_diff(now, started) or 1
+    d = duty(now)
+    return "awake %d.%d%% screen off %d%% radio off %d%% wakes %d (buttons %d)" % (
+        d // 10, d % 10, screen.value(now) * 100 // total, radio.value(now) * 100 // total,
+        wakes, button_wakes)
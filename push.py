@@ -0,0 +1,64 @@
+import socket
+import time
+import snapshot
+
+# Odbiór zrzutów wysyłanych przez server/glances_proxy.py --push.
+# Gniazdo UDP jest nieblokujące; poll() opróżnia kolejkę datagramów
+# i dekoduje najnowszy. Numer kolejny w nagłówku zrzutu pozwala
+# policzyć zgubione pakiety, a brak heartbeatu przez HEARTBEAT_TIMEOUT
+# oznacza powrót do odpytywania HTTP.
+
+HEARTBEAT_TIMEOUT = 15 * 1000
+
+
+class Listener:
+    def __init__(self, port):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("0.0.0.0", port))
+        s.setblocking(False)
+        self.sock = s
+        self._recv = s.recv_into if hasattr(s, "recv_into") else s.readinto
+        self.buf = bytearray(snapshot.SIZE)
+        self.last_seq = -1
+        self.received = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.last_rx = None
+
+    def _read(self):
+        try:
+            return self._recv(self.buf)
+        except OSError:
+            # EAGAIN - brak datagramów
+            return None
+
+    def poll(self, snap, now):
+        got = False
+        while True:
+            n = self._read()
+            if not n:
+                break
+            if n != snapshot.SIZE:
+                self.invalid += 1
+                continue
+            try:
+                snap.decode(self.buf)
+            except ValueError:
+                self.invalid += 1
+                continue
+            seq = snap.seq
+            if self.last_seq >= 0 and seq > self.last_seq + 1:
+                self.dropped += seq - self.last_seq - 1
+            # seq <= last_seq: nadawca wystartował od nowa, liczymy od tego miejsca
+            self.last_seq = seq
+            self.received += 1
+            self.last_rx = now
+            got = True
+        return got
+
+    def alive(self, now):
+        return self.last_rx is not None and time.ticks_diff(now, self.last_rx) < HEARTBEAT_TIMEOUT
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,239 @@
+import time
+from array import array
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+import servers
+
+# Zbiorcze dane metryk na flashu w kilku rozdzielczościach (1 min / 15 min / 1 h),
+# żeby rano było widać, co serwer robił w nocy.
+# Każda próbka z History (te same metryki i kolejność co History.metrics)
+# aktualizuje w RAM bieżący przedział każdej rozdzielczości: min, suma, max,
+# liczba. Zamknięty przedział trafia do kolejki, a kolejka na flash dopiero
+# po BATCH rekordach albo po FLUSH_PERIOD - nie ma zapisu na próbkę.
+#
+# Plik na serwer i rozdzielczość (roll<N>_<nazwa>.bin) to pierścień BUCKETS
+# rekordów o stałym rozmiarze. Miejsce rekordu wynika z czasu:
+# slot = numer przedziału % BUCKETS, więc nie ma wskaźnika zapisu, a stary
+# rekord rozpoznajemy po numerze przedziału. Czas z RTC (NTP) - dopóki zegar
+# nie jest ustawiony, nic nie zbieramy.
+#
+#   rekord  I        numer przedziału (sekundy epoki // okres)
+#           9 x hhh  min, średnia, max każdej metryki (MISSING = brak próbek)
+#
+# Przedział otwarty w chwili restartu i niezapisana kolejka (najwyżej
+# FLUSH_PERIOD) przepadają.
+
+RESOLUTIONS = (("1m", 60), ("15m", 15 * 60), ("1h", 60 * 60))
+BUCKETS = 128
+METRICS = 9
+MISSING = -32768
+RECORD_FMT = "<I" + "hhh" * METRICS
+RECORD_SIZE = struct.calcsize(RECORD_FMT)
+# Górna granica kolejki; zwykle zapis wyznacza FLUSH_PERIOD
+BATCH = 16
+FLUSH_PERIOD = 10 * 60 * 1000
+READ_RECORDS = 8
+
+# Wspólne dla wszystkich serwerów - strona rysuje jeden wykres naraz
+_chunk = bytearray(READ_RECORDS * RECORD_SIZE)
+lo = array('h', [0] * BUCKETS)
+avg = array('h', [0] * BUCKETS)
+hi = array('h', [0] * BUCKETS)
+
+
+def path(index, res):
+    return "roll%d_%s.bin" % (index, RESOLUTIONS[res][0])
+
+
+def _u32(buf, off):
+    return buf[off] | buf[off + 1] << 8 | buf[off + 2] << 16 | buf[off + 3] << 24
+
+
+def _i16(buf, off):
+    # Bez struct.unpack_from - odczyt wykresu nie tworzy krotek
+    v = buf[off] | buf[off + 1] << 8
+    return v - 65536 if v & 0x8000 else v
+
+
+def _clamp(v):
+    return -32767 if v < -32767 else 32767 if v > 32767 else v
+
+
+class Store:
+    def __init__(self, index):
+        self.index = index
+        n = len(RESOLUTIONS) * METRICS
+        # Bieżący przedział każdej rozdzielczości; numer -1 = jeszcze żaden
+        self.bucket = [-1] * len(RESOLUTIONS)
+        self.count = array('l', [0] * n)
+        self.total = array('l', [0] * n)
+        self.low = array('l', [0] * n)
+        self.high = array('l', [0] * n)
+        # Zamknięte przedziały czekające na zapis: rozdzielczość + rekord
+        self.queue = bytearray(BATCH * RECORD_SIZE)
+        self.queue_res = bytearray(BATCH)
+        self.queued = 0
+        # Kiedy flush() pierwszy raz zobaczył niepustą kolejkę (None = jeszcze nie)
+        self.queued_at = None
+        # Rośnie po zamknięciu przedziału - strona przelicza wtedy wykres
+        self.version = 0
+        self.writes = 0
+
+    # --- zbieranie ---
+
+    def add(self, metric, value):
+        t = servers.clock()
+        if not t:
+            return
+        for res in range(len(RESOLUTIONS)):
+            b = t // RESOLUTIONS[res][1]
+            if b != self.bucket[res]:
+                if self.bucket[res] >= 0:
+                    self.close(res)
+                self.bucket[res] = b
+            i = res * METRICS + metric
+            if self.count[i]:
+                if value < self.low[i]:
+                    self.low[i] = value
+                if value > self.high[i]:
+                    self.high[i] = value
+            else:
+                self.low[i] = self.high[i] = value
+            self.total[i] += value
+            self.count[i] += 1
+
+    def close(self, res):
+        # Przedział res się skończył: rekord do kolejki, liczniki od zera
+        if self.queued == BATCH:
+            self.flush(0, True)
+        off = self.queued * RECORD_SIZE
+        struct.pack_into("<I", self.queue, off, self.bucket[res])
+        base = res * METRICS
+        for m in range(METRICS):
+            i = base + m
+            p = off + 4 + m * 6
+            n = self.count[i]
+            if n:
+                struct.pack_into("<hhh", self.queue, p, _clamp(self.low[i]), _clamp(self.total[i] // n), _clamp(self.high[i]))
+            else:
+                struct.pack_into("<hhh", self.queue, p, MISSING, MISSING, MISSING)
+            self.count[i] = 0
+            self.total[i] = 0
+        self.queue_res[self.queued] = res
+        self.queued += 1
+        self.version += 1
+
+    # --- zapis ---
+
+    def due(self, now):
+        if not self.queued:
+            return False
+        if self.queued_at is None:
+            self.queued_at = now
+        return self.queued >= BATCH or time.ticks_diff(now, self.queued_at) >= FLUSH_PERIOD
+
+    def open_file(self, res):
+        # Plik ma stały rozmiar; brakujący albo obcy tworzymy od zera
+        name = path(self.index, res)
+        try:
+            f = open(name, "r+b")
+            if f.seek(0, 2) == BUCKETS * RECORD_SIZE:
+                return f
+            f.close()
+        except OSError:
+            pass
+        f = open(name, "w+b")
+        empty = bytes(RECORD_SIZE)
+        for _ in range(BUCKETS):
+            f.write(empty)
+        return f
+
+    def flush(self, now, force=False):
+        # Jeden plik otwierany raz na zapis całej kolejki
+        if not (force and self.queued) and not self.due(now):
+            return False
+        mv = memoryview(self.queue)
+        try:
+            for res in range(len(RESOLUTIONS)):
+                f = None
+                for k in range(self.queued):
+                    if self.queue_res[k] != res:
+                        continue
+                    if f is None:
+                        f = self.open_file(res)
+                    off = k * RECORD_SIZE
+                    b = _u32(self.queue, off)
+                    f.seek((b % BUCKETS) * RECORD_SIZE)
+                    f.write(mv[off:off + RECORD_SIZE])
+                if f is not None:
+                    f.close()
+                    self.writes += 1
+        except OSError as e:
+            print("Błąd zapisu historii:", e)
+        self.queued = 0
+        self.queued_at = None
+        return True
+
+    # --- odczyt ---
+
+    def queued_record(self, res, b):
+        # Offset rekordu z kolejki (jeszcze nie na flashu) albo -1
+        for k in range(self.queued):
+            off = k * RECORD_SIZE
+            if self.queue_res[k] == res and _u32(self.queue, off) == b:
+                return off
+        return -1
+
+    def read(self, res, metric):
+        # Ostatnie BUCKETS zamkniętych przedziałów do lo/avg/hi (MISSING = brak);
+        # plik czytany po READ_RECORDS rekordów do wspólnego bufora.
+        # Zwraca liczbę przedziałów z danymi
+        for k in range(BUCKETS):
+            lo[k] = avg[k] = hi[k] = MISSING
+        current = self.bucket[res]
+        if current < 0:
+            # Od startu nie było próbki - bieżący przedział z zegara
+            current = servers.clock() // RESOLUTIONS[res][1]
+            if not current:
+                return 0
+        first = current - BUCKETS
+        found = 0
+        try:
+            f = open(path(self.index, res), "rb")
+        except OSError:
+            f = None
+        pos = 0
+        field = 4 + metric * 6
+        while pos < BUCKETS:
+            b = first + pos
+            slot = b % BUCKETS
+            n = min(READ_RECORDS, BUCKETS - pos, BUCKETS - slot)
+            got = 0
+            if f is not None:
+                f.seek(slot * RECORD_SIZE)
+                got = f.readinto(_chunk) // RECORD_SIZE
+                if got > n:
+                    got = n
+            for j in range(n):
+                off = self.queued_record(res, b + j)
+                buf = self.queue
+                if off < 0:
+                    if j >= got:
+                        continue
+                    off = j * RECORD_SIZE
+                    buf = _chunk
+                    if _u32(buf, off) != b + j:
+                        continue
+                off += field
+                a = _i16(buf, off + 2)
+                if a != MISSING:
+                    lo[pos + j] = _i16(buf, off)
+                    avg[pos + j] = a
+                    hi[pos + j] = _i16(buf, off + 4)
+                    found += 1
+            pos += n
+        if f is not None:
+            f.close()
+        return found
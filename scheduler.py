@@ -0,0 +1,131 @@
+import time
+import random
+
+# Harmonogram pobierania danych.
+# Każde źródło (statystyki, dyski, sieć, nazwa hosta) ma własny interwał
+# i termin. Po błędzie termin odsuwa się wykładniczo (z losowym rozrzutem),
+# a po kilku kolejnych błędach serwer uznajemy za niedostępny: zamiast
+# wszystkich źródeł odpytujemy wtedy tylko tani adres kontrolny.
+
+MAX_BACKOFF = 120 * 1000
+OFFLINE_AFTER = 2
+PROBE_INTERVAL = 2 * 1000
+
+
+def jitter(ms):
+    # 0..25% opóźnienia, żeby kilka urządzeń nie budziło serwera naraz
+    return ms * random.getrandbits(8) // 1024
+
+
+def backoff(base, failures):
+    delay = base << min(failures, 6)
+    if delay > MAX_BACKOFF:
+        delay = MAX_BACKOFF
+    return delay + jitter(delay)
+
+
+class Source:
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self.next_due = time.ticks_ms()
+        self.enabled = True
+        self.failures = 0
+        self.fast = 0
+        self.fast_until = None
+
+    def period(self, now):
+        if self.fast_until is not None:
+            if time.ticks_diff(self.fast_until, now) > 0:
+                return self.fast
+            self.fast_until = None
+        return self.interval
+
+    def is_due(self, now):
+        return self.enabled and time.ticks_diff(now, self.next_due) >= 0
+
+    def done(self, now, ok):
+        if ok:
+            self.failures = 0
+            self.next_due = time.ticks_add(now, self.period(now))
+        else:
+            self.failures += 1
+            self.next_due = time.ticks_add(now, backoff(self.period(now), self.failures))
+
+    def poke(self, now):
+        self.next_due = now
+
+    def boost(self, now, fast, duration):
+        # Tymczasowo częstsze odświeżanie, np. gdy metryka przekroczyła próg alertu
+        if self.fast_until is None:
+            self.next_due = time.ticks_add(now, fast)
+        self.fast = fast
+        self.fast_until = time.ticks_add(now, duration)
+
+
+class Scheduler:
+    def __init__(self, sources):
+        self.sources = sources
+        self.offline = False
+        self.fail_streak = 0
+        self.probe_failures = 0
+        self.probe_due = 0
+
+    def next_due(self, now):
+        best = None
+        for src in self.sources:
+            if src.is_due(now) and (best is None or time.ticks_diff(src.next_due, best.next_due) < 0):
+                best = src
+        return best
+
+    def wait_ms(self, now, limit):
+        wait = limit
+        if self.offline:
+            d = time.ticks_diff(self.probe_due, now)
+            return d if d < wait else wait
+        for src in self.sources:
+            if src.enabled:
+                d = time.ticks_diff(src.next_due, now)
+                if d < wait:
+                    wait = d
+        return wait if wait > 0 else 0
+
+    def report(self, src, now, ok):
+        # Zwraca True, gdy właśnie uznaliśmy serwer za niedostępny
+        src.done(now, ok)
+        if ok:
+            self.fail_streak = 0
+            return False
+        self.fail_streak += 1
+        if not self.offline and self.fail_streak >= OFFLINE_AFTER:
+            self.offline = True
+            self.probe_failures = 0
+            self.probe_due = time.ticks_add(now, backoff(PROBE_INTERVAL, 0))
+            return True
+        return False
+
+    def probe_is_due(self, now):
+        return self.offline and time.ticks_diff(now, self.probe_due) >= 0
+
+    def probe_done(self, now, ok):
+        if ok:
+            self.offline = False
+            self.fail_streak = 0
+            for src in self.sources:
+                src.failures = 0
+                src.poke(now)
+        else:
+            self.probe_failures += 1
+            self.probe_due = time.ticks_add(now, backoff(PROBE_INTERVAL, self.probe_failures))
+
+    def all_done(self, now):
+        # Jedno zapytanie dostarczyło dane wszystkich źródeł (zrzut z proxy)
+        self.fail_streak = 0
+        for src in self.sources:
+            if src.enabled:
+                src.done(now, True)
+
+    def poke_all(self, now):
+        self.probe_due = now
+        for src in self.sources:
+            src.poke(now)
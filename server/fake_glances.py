@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Fake Glances REST API (v4) for testing Server Helper without a real server.
+
+Serves canned /api/4/{quicklook,cpu,mem,sensors,system,fs,network} responses,
+including the /api/4/<plugin>/<item> and /api/4/<plugin>/<item>/<value>
+forms, and can inject latency, HTTP errors and oversized payloads:
+
+    python3 fake_glances.py --port 61208 --latency 0.5 --error-rate 0.1 --extra 200
+
+--extra N appends N junk sensors, loop mounts and interfaces to the list
+endpoints, which is what a big server with many mounts looks like.
+--no-item-api answers the item forms with 404, like an old Glances.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds between Glances' own refreshes (its default)
+REFRESH = 2
+
+
+class State:
+    def __init__(self, latency=0.0, error_rate=0.0, extra=0, seed=None, item_api=True):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.extra = extra
+        self.item_api = item_api
+        self.down = False
+        self.hits = {}
+        self.bytes_sent = 0
+        self.started = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.cpu = 23.5
+        self.mem = 41.2
+        self.temp = 48.0
+        self.hostname = "fake-server"
+
+    def count(self, path, size):
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+            self.bytes_sent += size
+
+    @staticmethod
+    def iface(name, sent, recv, rate, speed):
+        # rate is B/s sent; received is 4x that
+        return {"interface_name": name,
+                "bytes_sent": rate * REFRESH, "bytes_recv": 4 * rate * REFRESH,
+                "bytes_sent_gauge": sent, "bytes_recv_gauge": recv,
+                "bytes_sent_rate_per_sec": rate, "bytes_recv_rate_per_sec": 4 * rate,
+                "time_since_update": REFRESH, "speed": speed}
+
+    def payload(self, plugin):
+        extra = self.extra
+        up = time.monotonic() - self.started
+        if plugin == "status":
+            return {"version": "4.0.0-fake"}
+        if plugin == "quicklook":
+            return {"cpu": self.cpu, "mem": self.mem, "swap": 0.0, "cpu_name": "Fake CPU",
+                    "percpu": [{"cpu_number": i, "total": self.cpu} for i in range(8)]}
+        if plugin == "cpu":
+            return {"total": self.cpu, "user": self.cpu / 2, "system": self.cpu / 2, "idle": 100 - self.cpu}
+        if plugin == "mem":
+            return {"total": 16 * 2**30, "percent": self.mem, "used": int(16 * 2**30 * self.mem / 100)}
+        if plugin == "system":
+            return {"hostname": self.hostname, "os_name": "Linux", "platform": "64bit"}
+        if plugin == "sensors":
+            items = [{"label": "Core %d" % i, "value": 40 + i, "unit": "C", "type": "temperature_core"}
+                     for i in range(4 + extra)]
+            items.append({"label": "CPUTIN", "value": self.temp, "unit": "C", "type": "temperature_core"})
+            return items
+        if plugin == "fs":
+            items = [{"device_name": "/dev/loop%d" % i, "fs_type": "squashfs", "mnt_point": "/snap/pkg%d" % i,
+                      "size": 2**20, "used": 2**20, "free": 0, "percent": 100.0} for i in range(2 + extra)]
+            items += [
+                {"device_name": "/dev/sda1", "fs_type": "ext4", "mnt_point": "/",
+                 "size": 500 * 2**30, "used": 120 * 2**30, "free": 380 * 2**30, "percent": 24.0},
+                {"device_name": "/dev/sdb1", "fs_type": "ext4", "mnt_point": "/mnt/dane",
+                 "size": 2 * 2**40, "used": 2**40, "free": 2**40, "percent": 50.0},
+            ]
+            return items
+        if plugin == "network":
+            # Like Glances v4: bytes_* is the amount since its last refresh
+            # (REFRESH s ago), the running totals are bytes_*_gauge
+            rate = 125000
+            items = [self.iface("veth%d" % i, i, i, 0, 0) for i in range(extra)]
+            items += [
+                self.iface("lo", 1000, 1000, 0, 0),
+                self.iface("enp3s0", int(123456789 + rate * up), int(987654321 + 4 * rate * up), rate, 125000000),
+            ]
+            return items
+        return None
+
+    def select(self, plugin, item=None, value=None):
+        # Same shapes as Glances: {item: value-or-list} and {value: [matching items]}
+        obj = self.payload(plugin)
+        if obj is None or item is None:
+            return obj
+        if not self.item_api:
+            return None
+        if isinstance(obj, dict):
+            return {item: obj[item]} if item in obj and value is None else None
+        if value is None:
+            return {item: [i.get(item) for i in obj]} if any(item in i for i in obj) else None
+        found = [i for i in obj if str(i.get(item)) == value]
+        return {value: found} if found else None
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in two writes; with Nagle on, every keep-alive
+        # response would wait ~40 ms for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def reply(self, code, body=b"", ctype="application/json"):
+            # Counted before sending, so a client that has the response has been counted
+            state.count(self.path, len(body))
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            if state.down or state.random.random() < state.error_rate:
+                self.reply(500, b'{"error": "injected"}')
+                return
+            parts = self.path.split("?")[0].lstrip("/").split("/", 4)
+            obj = None
+            if 3 <= len(parts) and parts[:2] == ["api", "4"]:
+                item = parts[3] or None if len(parts) > 3 else None
+                value = urllib.parse.unquote(parts[4]) if len(parts) > 4 else None
+                obj = state.select(parts[2], item, value)
+            if obj is None:
+                self.reply(404)
+                return
+            self.reply(200, json.dumps(obj).encode())
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def start(port=0, host="127.0.0.1", **kw):
+    """Start the fake server in a background thread; returns (server, state)."""
+    state = State(**kw)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=61208)
+    p.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    p.add_argument("--extra", type=int, default=0, help="junk items added to list endpoints")
+    p.add_argument("--no-item-api", action="store_true", help="404 on /api/4/<plugin>/<item> forms")
+    args = p.parse_args(argv)
+    state = State(args.latency, args.error_rate, args.extra, item_api=not args.no_item_api)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print("Fake Glances on http://%s:%d/api/4/" % (args.host, args.port))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Companion proxy for Server Helper.
+
+Runs next to Glances on the monitored server, polls its REST API locally and
+serves one fixed-size binary snapshot (see snapshot.py) at /snapshot, so the
+Pico downloads ~150 bytes instead of several kilobytes of JSON.
+
+Copy this file together with snapshot.py to the server and run:
+
+    python3 glances_proxy.py --glances http://127.0.0.1:61208 --port 61209
+
+Then set PROXY_URL in conf.json on the Pico to http://<server-ip>:61209/snapshot.
+
+With --push <pico-ip>:<port> the same snapshot is also sent as a UDP datagram
+whenever the metrics change and at least every --heartbeat seconds; set
+PUSH_PORT in conf.json to the same port so the Pico stops polling.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import snapshot  # noqa: E402
+
+
+class Poller:
+    def __init__(self, glances, iface, sensor, interval, timeout=3, push=None, heartbeat=5.0):
+        self.base = glances.rstrip("/") + "/api/4/"
+        self.push = push
+        self.heartbeat = heartbeat
+        self.last_push = 0.0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if push else None
+        self.iface = iface
+        self.sensor = sensor
+        self.interval = interval
+        self.timeout = timeout
+        self.seq = 0
+        self.hostname = ""
+        self.lock = threading.Lock()
+        self.data = snapshot.encode(0, None, None, None, "", None, [])
+
+    def get(self, plugin):
+        with urllib.request.urlopen(self.base + plugin, timeout=self.timeout) as r:
+            return json.load(r)
+
+    def try_get(self, plugin):
+        try:
+            return self.get(plugin)
+        except (OSError, ValueError) as e:
+            print("glances %s: %s" % (plugin, e), file=sys.stderr)
+            return None
+
+    def poll(self):
+        ql = self.try_get("quicklook") or {}
+        cpu = ql.get("cpu")
+        mem = ql.get("mem")
+        if cpu is None:
+            cpu = (self.try_get("cpu") or {}).get("total")
+        if mem is None:
+            mem = (self.try_get("mem") or {}).get("percent")
+        temp = None
+        for s in self.try_get("sensors") or []:
+            if s.get("label") == self.sensor:
+                temp = s.get("value")
+                break
+        if not self.hostname:
+            self.hostname = (self.try_get("system") or {}).get("hostname", "")
+        iface = None
+        for i in self.try_get("network") or []:
+            if i.get("interface_name") == self.iface:
+                iface = i
+                break
+        disks = [d for d in self.try_get("fs") or []
+                 if snapshot.disk_visible(d.get("mnt_point", ""), d.get("device_name", d.get("device", "")))]
+        # Numer kolejny rośnie tylko przy publikacji (zmiana danych lub heartbeat),
+        # więc luka w numeracji po stronie Pico oznacza zgubiony datagram
+        data = snapshot.encode(self.seq, cpu, mem, temp, self.hostname, iface, disks)
+        now = time.monotonic()
+        changed = data[snapshot.PAYLOAD_OFFSET:] != self.data[snapshot.PAYLOAD_OFFSET:]
+        if not changed and not (self.push and now - self.last_push >= self.heartbeat):
+            return
+        self.seq += 1
+        data = snapshot.encode(self.seq, cpu, mem, temp, self.hostname, iface, disks)
+        with self.lock:
+            self.data = data
+        if self.push:
+            try:
+                self.sock.sendto(data, self.push)
+            except OSError as e:
+                print("push: %s" % e, file=sys.stderr)
+            self.last_push = now
+
+    def latest(self):
+        with self.lock:
+            return self.data
+
+    def run(self):
+        while True:
+            start = time.monotonic()
+            self.poll()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - start)))
+
+
+def make_handler(poller):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/snapshot":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = poller.latest()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def parse_push(value):
+    if not value:
+        return None
+    host, _, port = value.rpartition(":")
+    return host, int(port)
+
+
+def serve(glances, listen, port, iface, sensor, interval, push=None, heartbeat=5.0):
+    poller = Poller(glances, iface, sensor, interval, push=push, heartbeat=heartbeat)
+    poller.poll()
+    threading.Thread(target=poller.run, daemon=True).start()
+    server = ThreadingHTTPServer((listen, port), make_handler(poller))
+    return server, poller
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--glances", default="http://127.0.0.1:61208", help="Glances base URL")
+    p.add_argument("--listen", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=61209)
+    p.add_argument("--iface", default="enp3s0", help="network interface to report")
+    p.add_argument("--sensor", default="CPUTIN", help="temperature sensor label")
+    p.add_argument("--interval", type=float, default=2.0, help="Glances poll interval (s)")
+    p.add_argument("--push", help="also push snapshots over UDP to HOST:PORT")
+    p.add_argument("--heartbeat", type=float, default=5.0, help="max seconds between pushes")
+    args = p.parse_args(argv)
+    server, _ = serve(args.glances, args.listen, args.port, args.iface, args.sensor, args.interval,
+                      parse_push(args.push), args.heartbeat)
+    print("Serving %d-byte snapshots on %s:%d/snapshot" % (snapshot.SIZE, args.listen, args.port))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
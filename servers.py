@@ -0,0 +1,541 @@
+import time
+import gc
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import uhttp
+import ujstream
+import snapshot
+import scheduler
+import history
+import alerts
+
+# Jeden monitorowany serwer: adresy API, ostatnie dane, historia, reguły alertów
+# i własny harmonogram źródeł. Każdy serwer ma osobne zadanie pobierania,
+# osobne gniazdo keep-alive i własny limit czasu, więc martwy serwer
+# nie opóźnia odświeżania pozostałych.
+
+MAX_SERVERS = 4
+FETCH_TIMEOUT = 5
+
+DISK_FIELDS = ('mnt_point', 'device', 'device_name', 'used', 'size', 'percent')
+# Glances v4: bytes_sent/bytes_recv to ilość z ostatniego odświeżenia Glances,
+# sumy od startu są w polach _gauge
+NET_FIELDS = ('interface_name', 'bytes_sent_gauge', 'bytes_recv_gauge', 'speed')
+
+# Każde źródło danych ma własny interwał; niewidoczne strony odświeżamy rzadziej
+DISK_INTERVAL = 30 * 1000
+IDLE_INTERVAL = 60 * 1000
+IDLE_DISK_INTERVAL = 300 * 1000
+SYSTEM_RETRY = 60 * 1000
+ALERT_INTERVAL = 1000
+ALERT_BOOST = 60 * 1000
+PROXY_RETRY = 60 * 1000
+STATS_METRICS = ('cpu', 'mem', 'temp')
+# Wcześniejszy rok oznacza, że zegar nie był jeszcze ustawiony przez NTP
+CLOCK_YEAR = 2024
+
+
+def is_http_error(e):
+    return str(e).startswith("HTTP")
+
+
+def clock():
+    # Sekundy epoki albo 0, gdy zegar jest nieustawiony
+    t = int(time.time())
+    return t if time.localtime(t)[0] >= CLOCK_YEAR else 0
+
+
+class Server:
+    def __init__(self, cfg, rules, refresh):
+        url = cfg["url"].rstrip("/")
+        api = url + '/api/4/'
+        self.url = url
+        self.name = cfg.get("name", "")
+        self.iface = cfg.get("iface", "enp3s0")
+        self.sensor = cfg.get("sensor", "CPUTIN")
+        self.disk_filter = cfg.get("disks") or []
+        self.proxy_url = cfg.get("proxy", "")
+        self.timeout = cfg.get("timeout", FETCH_TIMEOUT)
+        self.quicklook_url = api + 'quicklook'
+        self.cpu_url = api + 'cpu'
+        self.mem_url = api + 'mem'
+        self.sensors_url = api + 'sensors'
+        self.disk_url = api + 'fs'
+        self.network_url = api + 'network'
+        self.system_url = api + 'system'
+        self.status_url = api + 'status'
+        # Zapytania o pojedyncze pola/elementy (/api/4/<plugin>/<item>[/<value>])
+        self.cpu_total_url = self.cpu_url + '/total'
+        self.mem_percent_url = self.mem_url + '/percent'
+        self.hostname_url = self.system_url + '/hostname'
+        self.temp_url = self.sensors_url + '/label/' + uhttp.quote(self.sensor)
+        self.iface_url = self.network_url + '/interface_name/' + uhttp.quote(self.iface)
+        self.mount_url = self.disk_url + '/mnt_point/'
+
+        # Ostatnio pobrane dane - strony rysują się z nich, zadanie pobierania je podmienia
+        self.stats = {}
+        self.disk_data = None
+        self.disks = []
+        self.net_data = None
+        self.hostname = "Server"
+        self.hostname_ok = False
+        # None = jeszcze nie sprawdzono, True/False = czy serwer obsługuje quicklook
+        self.batch_supported = None
+        # Czy serwer obsługuje /api/4/<plugin>/<item>[/<value>]; sprawdzane raz, razem z nazwą hosta
+        self.item_api = None
+        # Punkty montowania pobierane pojedynczo; puste = wykryte z pierwszej pełnej listy /fs
+        self.disk_mounts = list(self.disk_filter)
+        # Licznik błędów sieci (timeout, brak połączenia) - odpowiedź HTTP z błędem się nie liczy
+        self.errors = 0
+        # Ostatnie zapytanie pod każdy adres: [czas ms, bajty treści] (-1 = błąd) - dla strony diagnostyki
+        self.timings = {}
+        self.last_size = 0
+        # Rośnie przy każdej zmianie danych - ekran przelicza wtedy napisy swoich stron
+        self.version = 0
+        # Dane nieaktualne (z flasha po restarcie albo serwer przestał odpowiadać);
+        # good_at - kiedy przyszły ostatnie dobre statystyki (clock(), 0 = nie wiadomo)
+        self.stale = False
+        self.good_at = 0
+        # Własny bufor - serwery są parsowane równolegle
+        self.buf = bytearray(ujstream.CHUNK)
+        self.history = history.History()
+        self.alerts = alerts.Engine(rules)
+        # on_alert(server, msg, severity) ustawia interfejs
+        self.on_alert = None
+
+        # Nazwa hosta idzie pierwsza - to samo zapytanie sprawdza obsługę item_api
+        self.system_source = scheduler.Source("system", SYSTEM_RETRY)
+        self.stats_source = scheduler.Source("stats", refresh)
+        self.disk_source = scheduler.Source("fs", DISK_INTERVAL)
+        self.net_source = scheduler.Source("network", IDLE_INTERVAL)
+        self.sched = scheduler.Scheduler([self.system_source, self.stats_source, self.disk_source, self.net_source])
+        self.wake = asyncio.Event()
+
+        # Tryb proxy: jeden binarny zrzut zamiast kilku odpowiedzi JSON
+        self.snap = None
+        self.snap_buf = None
+        self.snap_net = None
+        self.proxy_retry_at = 0
+
+    def label(self):
+        return self.name or self.hostname
+
+    def host(self):
+        # IP/nazwa z adresu (np. http://192.168.50.4:61208)
+        return uhttp.split_url(self.url)[1]
+
+    def online(self):
+        return self.hostname_ok and not self.sched.offline
+
+    # --- harmonogram ---
+
+    def tune(self, refresh, stats, disks, net):
+        # Widoczne strony dostają interwał z ustawień, pozostałe odświeżają się w tle
+        self.stats_source.interval = refresh if stats else IDLE_INTERVAL
+        self.disk_source.interval = DISK_INTERVAL if disks else IDLE_DISK_INTERVAL
+        self.net_source.interval = refresh if net else IDLE_INTERVAL
+        self.system_source.enabled = not (self.hostname_ok and self.item_api is not None)
+
+    def poke(self, now, stats, disks, net):
+        if stats:
+            self.stats_source.poke(now)
+        if disks:
+            self.disk_source.poke(now)
+        if net:
+            self.net_source.poke(now)
+        self.wake.set()
+
+    # --- zapytania ---
+
+    async def fetch_fields(self, url, ex):
+        response = await uhttp.aget(url, owner=self)
+        try:
+            if response.status_code != 200:
+                raise OSError("HTTP %d" % response.status_code)
+            result = await ujstream.aparse(response, ex, self.buf)
+        except BaseException:
+            response.abort()
+            raise
+        self.last_size = response.received
+        await response.aclose()
+        return result
+
+    def timed(self, url, start, size):
+        entry = self.timings.get(url)
+        if entry is None:
+            entry = self.timings[url] = [0, 0]
+        entry[0] = time.ticks_diff(time.ticks_ms(), start)
+        entry[1] = size
+
+    async def fetch_url(self, url, ex):
+        # Limit czasu na całe zapytanie - martwy serwer nie trzyma zadania w nieskończoność
+        start = time.ticks_ms()
+        try:
+            result = await asyncio.wait_for(self.fetch_fields(url, ex), self.timeout)
+        except Exception as e:
+            self.timed(url, start, -1)
+            if not is_http_error(e):
+                self.errors += 1
+            raise
+        self.timed(url, start, self.last_size)
+        return result
+
+    async def fetch_item(self, url, ex):
+        # Zapytanie o element po wartości: 404 oznacza, że go nie ma (np. brak czujnika)
+        try:
+            return await self.fetch_url(url, ex)
+        except OSError as e:
+            if str(e) == "HTTP 404":
+                return None
+            raise
+
+    async def probe(self):
+        # Tani test dostępności - wystarczy, że serwer w ogóle odpowie
+        try:
+            response = await asyncio.wait_for(uhttp.aget(self.status_url, owner=self), self.timeout)
+            response.abort()
+            return True
+        except Exception as e:
+            print("Probe error:", e)
+            return False
+
+    async def fetch_server_name(self, force=False):
+        # Nazwa hosta nie zmienia się, pobieramy ją raz i trzymamy w pamięci.
+        # Pierwsze zapytanie o samo pole hostname sprawdza przy okazji, czy serwer
+        # obsługuje zapytania o pojedyncze pola - wynik zapamiętujemy w item_api
+        if self.hostname_ok and self.item_api is not None and not force:
+            return
+        try:
+            data = None
+            if self.item_api is not False:
+                try:
+                    data = await self.fetch_url(self.hostname_url, ujstream.Extractor(('hostname',)))
+                    self.item_api = bool(data and "hostname" in data)
+                except OSError as e:
+                    if not is_http_error(e):
+                        raise
+                    self.item_api = False
+            if not self.item_api:
+                data = await self.fetch_url(self.system_url, ujstream.Extractor(('hostname',)))
+            if data and "hostname" in data:
+                self.hostname = str(data["hostname"])
+                self.hostname_ok = True
+            else:
+                self.hostname = "Serwer"
+        except Exception as e:
+            print("Nie mogę pobrać nazwy serwera:", e)
+            if not self.stale:
+                self.hostname = "Server"
+
+    async def fetch_quicklook(self, data):
+        # Jedno zapytanie zamiast osobnych /cpu i /mem
+        try:
+            ql = await self.fetch_url(self.quicklook_url, ujstream.Extractor(('cpu', 'mem')))
+        except OSError as e:
+            if is_http_error(e):
+                self.batch_supported = False
+            print(f"Quicklook error: {e}")
+            return False
+        except Exception as e:
+            print(f"Quicklook error: {e}")
+            return False
+        if not ql or 'cpu' not in ql or 'mem' not in ql:
+            self.batch_supported = False
+            return False
+        self.batch_supported = True
+        data['cpu'] = ql['cpu']
+        data['mem'] = ql['mem']
+        return True
+
+    def is_temp_sensor(self, sensor):
+        return sensor.get('label') == self.sensor
+
+    async def fetch_data(self):
+        # CPU i RAM jednym zapytaniem quicklook; z item_api osobne pola
+        # total/percent tylko bez quicklook, a czujnik zawsze jako jeden element
+        data = {}
+        errors = self.errors
+        item_api = self.item_api
+        if self.batch_supported is False or not await self.fetch_quicklook(data):
+            if self.errors != errors:
+                # Serwer nie odpowiada - kolejne zapytania czekałyby tylko na timeout
+                data['cpu'] = data['mem'] = data['temp'] = 'N/A'
+                return data
+            try:
+                cpu_data = await self.fetch_url(self.cpu_total_url if item_api else self.cpu_url, ujstream.Extractor(('total',)))
+                data['cpu'] = cpu_data.get('total', 'N/A')
+            except Exception as e:
+                print(f"CPU error: {e}")
+                data['cpu'] = 'N/A'
+            try:
+                mem_data = await self.fetch_url(self.mem_percent_url if item_api else self.mem_url, ujstream.Extractor(('percent',)))
+                data['mem'] = mem_data.get('percent', 'N/A')
+            except Exception as e:
+                print(f"MEM error: {e}")
+                data['mem'] = 'N/A'
+        try:
+            if item_api:
+                sensor = await self.fetch_item(self.temp_url, ujstream.Extractor(('value',), wrapped=True, first=True))
+            else:
+                sensor = await self.fetch_url(self.sensors_url, ujstream.Extractor(('label', 'value'), accept=self.is_temp_sensor, first=True))
+            data['temp'] = sensor.get('value', 'N/A') if sensor else 'N/A'
+        except Exception as e:
+            print(f"TEMP error: {e}")
+            data['temp'] = 'N/A'
+        gc.collect()
+        return data
+
+    def disk_visible(self, disk):
+        # Lista disks z konfiguracji serwera zastępuje automatyczny filtr
+        if self.disk_filter:
+            return disk.get('mnt_point') in self.disk_filter
+        return snapshot.disk_visible(disk.get('mnt_point', ''), disk.get('device', disk.get('device_name', '')))
+
+    async def fetch_mounts(self):
+        # Każdy punkt montowania osobno - odpowiedź nie rośnie z liczbą montowań na serwerze
+        data = []
+        for mnt in self.disk_mounts:
+            disk = await self.fetch_item(self.mount_url + uhttp.quote(mnt), ujstream.Extractor(DISK_FIELDS, wrapped=True, first=True))
+            if disk:
+                data.append(disk)
+        return data
+
+    async def fetch_disk_data(self):
+        # Filtr dysków działa już w trakcie parsowania - odrzucone wpisy nie trafiają do pamięci
+        try:
+            if self.item_api and self.disk_mounts:
+                data = await self.fetch_mounts()
+            else:
+                data = await self.fetch_url(self.disk_url, ujstream.Extractor(DISK_FIELDS, accept=self.disk_visible))
+                if self.item_api and data:
+                    # Zestaw dysków zapamiętujemy, kolejne odświeżenia pytają tylko o nie
+                    self.disk_mounts = [d.get('mnt_point') for d in data]
+            gc.collect()
+            return data
+        except Exception as e:
+            print('Disk data error:', e)
+            return None
+
+    def is_net_iface(self, iface):
+        return iface.get('interface_name') == self.iface
+
+    async def fetch_net_data(self):
+        try:
+            if self.item_api:
+                iface = await self.fetch_item(self.iface_url, ujstream.Extractor(NET_FIELDS, wrapped=True, first=True))
+            else:
+                iface = await self.fetch_url(self.network_url, ujstream.Extractor(NET_FIELDS, accept=self.is_net_iface, first=True))
+            gc.collect()
+            return [iface] if iface else []
+        except Exception as e:
+            print('Net data error:', e)
+            return None
+
+    def update_disks(self, data):
+        self.disks = []
+        if data:
+            for disk in data:
+                if self.disk_visible(disk):
+                    self.disks.append(disk)
+
+    # --- proxy / push ---
+
+    def snapshot(self):
+        if self.snap is None:
+            self.snap = snapshot.Snapshot()
+            self.snap_buf = bytearray(snapshot.SIZE)
+            self.snap_net = [self.snap.iface]
+        return self.snap
+
+    async def fetch_snapshot(self):
+        snap = self.snapshot()
+        response = await uhttp.aget(self.proxy_url, owner=self)
+        try:
+            if response.status_code != 200:
+                raise OSError("HTTP %d" % response.status_code)
+            mv = memoryview(self.snap_buf)
+            n = 0
+            while n < snapshot.SIZE:
+                got = await response.readinto(mv[n:])
+                if not got:
+                    raise OSError("Short snapshot")
+                n += got
+            snap.decode(self.snap_buf)
+            self.last_size = response.received
+        except BaseException:
+            response.abort()
+            raise
+        await response.aclose()
+
+    def restore(self, snap, good_at):
+        # Ostatni stan z flasha (cache.py) - bez historii i alertów, do pierwszych świeżych danych
+        self.stats = snap.stats
+        if snap.hostname:
+            self.hostname = snap.hostname
+        self.update_disks(snap.disks[:snap.disk_count])
+        self.net_data = [snap.iface] if snap.iface['interface_name'] else []
+        self.stale = True
+        self.good_at = good_at
+        self.version += 1
+
+    def mark_stale(self):
+        # Ostatnie dobre dane zostają na ekranie, oznaczone jako nieaktualne
+        if self.stats and not self.stale:
+            self.stale = True
+            self.version += 1
+
+    def mark_live(self):
+        self.stale = False
+        self.good_at = clock()
+
+    def apply_snapshot(self, snap=None):
+        # Zrzut (z proxy HTTP, z UDP push albo z rdzenia 1 - worker.py) zawiera dane wszystkich stron naraz
+        if snap is None:
+            snap = self.snap
+        self.stats = snap.stats
+        self.mark_live()
+        if snap.hostname and not self.hostname_ok:
+            self.hostname = snap.hostname
+            self.hostname_ok = True
+        self.update_disks(snap.disks[:snap.disk_count])
+        if not snap.iface['interface_name']:
+            self.net_data = []
+        else:
+            self.net_data = self.snap_net if snap is self.snap else [snap.iface]
+        now = time.ticks_ms()
+        self.history.record_stats(self.stats)
+        self.history.record_disks(self.disks)
+        self.check_alerts(now)
+        self.check_disk_alerts(now)
+        if self.net_data and self.history.record_net(snap.iface, now, time.ticks_diff):
+            self.check_net_alerts(now)
+        self.version += 1
+
+    async def refresh_from_proxy(self):
+        # Przy błędzie wracamy do JSON na PROXY_RETRY
+        start = time.ticks_ms()
+        try:
+            await asyncio.wait_for(self.fetch_snapshot(), self.timeout)
+        except Exception as e:
+            self.timed(self.proxy_url, start, -1)
+            print("Proxy error:", e)
+            self.proxy_retry_at = time.ticks_add(time.ticks_ms(), PROXY_RETRY)
+            return False
+        self.timed(self.proxy_url, start, self.last_size)
+        self.apply_snapshot()
+        return True
+
+    def report_offline(self, offline):
+        # Tryb dwurdzeniowy: o dostępności decyduje rdzeń 1 (worker.py), harmonogram stoi
+        if offline == self.sched.offline:
+            return
+        self.sched.offline = offline
+        self.version += 1
+        if offline:
+            self.mark_stale()
+            self.alert("Serwer offline!", alerts.WARNING)
+
+    # --- alerty ---
+
+    def alert(self, msg, severity):
+        if self.on_alert is not None:
+            self.on_alert(self, msg, severity)
+
+    def show_fired_alert(self):
+        rule = self.alerts.pop()
+        if rule is not None:
+            self.alert(rule.text, rule.severity)
+
+    def check_alerts(self, now):
+        # Nowa próbka statystyk; gdy CPU/RAM/TEMP jest ponad progiem, odświeżamy częściej,
+        # żeby szybciej potwierdzić (albo odwołać) alert z warunkiem "for"
+        for key in STATS_METRICS:
+            self.alerts.update(key, alerts.number(self.stats.get(key)), now)
+        if self.alerts.hot(STATS_METRICS):
+            self.stats_source.boost(now, ALERT_INTERVAL, ALERT_BOOST)
+        self.show_fired_alert()
+
+    def check_disk_alerts(self, now):
+        top = None
+        for disk in self.disks:
+            v = alerts.number(disk.get('percent'))
+            if v is None:
+                continue
+            if top is None or v > top:
+                top = v
+            metric = 'disk:' + str(disk.get('mnt_point', ''))
+            if self.alerts.wants(metric):
+                self.alerts.update(metric, v, now)
+        self.alerts.update('disk', top, now)
+        self.show_fired_alert()
+
+    def check_net_alerts(self, now):
+        self.alerts.update('rx', self.history.net_rx.last(), now)
+        self.alerts.update('tx', self.history.net_tx.last(), now)
+        self.show_fired_alert()
+
+    # --- odświeżanie ---
+
+    async def run_source(self, src):
+        # Zwraca False, gdy serwer nie odpowiedział (HTTP z błędem nie oznacza awarii)
+        errors = self.errors
+        if src is self.stats_source:
+            stats = await self.fetch_data()
+            if self.errors != errors:
+                # Serwer nie odpowiada - zamiast zer zostają ostatnie dobre statystyki,
+                # a bez nich (brak odpowiedzi od startu i stanu z flasha) ekran startowy
+                self.mark_stale()
+                return False
+            self.stats = stats
+            self.mark_live()
+            self.history.record_stats(self.stats)
+            self.check_alerts(time.ticks_ms())
+        elif src is self.disk_source:
+            data = await self.fetch_disk_data()
+            if data is not None:
+                self.disk_data = data
+                self.update_disks(data)
+                self.history.record_disks(self.disks)
+                self.check_disk_alerts(time.ticks_ms())
+        elif src is self.net_source:
+            data = await self.fetch_net_data()
+            if data is not None:
+                self.net_data = data
+                if data and self.history.record_net(data[0], time.ticks_ms(), time.ticks_diff):
+                    self.check_net_alerts(time.ticks_ms())
+        elif src is self.system_source:
+            await self.fetch_server_name()
+        self.version += 1
+        return self.errors == errors
+
+    async def refresh_due(self, now):
+        # Jeden zrzut z proxy zastępuje wszystkie źródła naraz
+        if self.proxy_url and time.ticks_diff(now, self.proxy_retry_at) >= 0:
+            if await self.refresh_from_proxy():
+                self.sched.all_done(time.ticks_ms())
+                return
+        sched = self.sched
+        src = sched.next_due(now)
+        while src is not None:
+            ok = await self.run_source(src)
+            if sched.report(src, time.ticks_ms(), ok):
+                self.version += 1
+                self.mark_stale()
+                self.alert("Serwer offline!", alerts.WARNING)
+                return
+            self.system_source.enabled = not (self.hostname_ok and self.item_api is not None)
+            src = sched.next_due(time.ticks_ms())
+
+    async def step(self, limit):
+        # Jeden krok pętli pobierania; zwraca, ile ms można spać
+        now = time.ticks_ms()
+        sched = self.sched
+        if sched.offline:
+            if sched.probe_is_due(now):
+                sched.probe_done(time.ticks_ms(), await self.probe())
+                self.version += 1
+        elif sched.next_due(now) is not None:
+            await self.refresh_due(now)
+        return max(sched.wait_ms(time.ticks_ms(), limit), 20)
@@ -0,0 +1,126 @@
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+# Binarny zrzut stanu serwera o stałym układzie.
+# Wspólny dla Pico (dekodowanie) i server/glances_proxy.py (kodowanie).
+#
+#   nagłówek  2s  magic b"SH"
+#             B   wersja układu
+#             B   liczba dysków (0..MAX_DISKS)
+#             I   numer kolejny zrzutu
+#   statystyki h  cpu  x10   (MISSING = brak danych)
+#             h   mem  x10
+#             h   temp x10
+#   nazwa     16s hostname (UTF-8, dopełniony zerami)
+#   sieć      12s nazwa interfejsu
+#             Q   bytes_sent_gauge (suma od startu Glances)
+#             Q   bytes_recv_gauge
+#             I   speed (B/s)
+#   dyski     MAX_DISKS x (16s mnt_point, Q used, Q size, h percent x10)
+
+MAGIC = b"SH"
+VERSION = 2
+MAX_DISKS = 4
+NAME_LEN = 16
+IFACE_LEN = 12
+MISSING = -32768
+
+HEAD_FMT = "<2sBBIhhh16s12sQQI"
+DISK_FMT = "<16sQQh"
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+DISK_SIZE = struct.calcsize(DISK_FMT)
+SIZE = HEAD_SIZE + MAX_DISKS * DISK_SIZE
+# Dane za magic/wersją/liczbą dysków/numerem kolejnym
+PAYLOAD_OFFSET = 8
+
+
+def disk_visible(mnt, dev):
+    # Pomijamy urządzenia loop, snapy i podobne montowania
+    if dev.startswith('/dev/loop') or '/snap/' in mnt or '/core' in mnt or '/ngrok' in mnt or '/micro' in mnt:
+        return False
+    return bool(mnt)
+
+
+def _x10(value):
+    try:
+        v = int(round(float(value) * 10))
+    except (TypeError, ValueError):
+        return MISSING
+    return max(-32767, min(32767, v))
+
+
+def _fixed(text, size):
+    # Przycięcie nie może rozciąć znaku UTF-8
+    return str(text).encode()[:size].decode("utf-8", "ignore").encode()
+
+
+def encode(seq, cpu, mem, temp, hostname, iface, disks):
+    # iface: słownik Glances (interface_name, bytes_sent_gauge, bytes_recv_gauge, speed) lub None
+    # disks: lista słowników Glances (mnt_point, used, size, percent)
+    iface = iface or {}
+    disks = disks[:MAX_DISKS]
+    out = bytearray(SIZE)
+    struct.pack_into(HEAD_FMT, out, 0, MAGIC, VERSION, len(disks), seq & 0xFFFFFFFF,
+                     _x10(cpu), _x10(mem), _x10(temp), _fixed(hostname, NAME_LEN),
+                     _fixed(iface.get('interface_name', ''), IFACE_LEN),
+                     int(iface.get('bytes_sent_gauge') or 0), int(iface.get('bytes_recv_gauge') or 0),
+                     int(iface.get('speed') or 0) & 0xFFFFFFFF)
+    for i, d in enumerate(disks):
+        struct.pack_into(DISK_FMT, out, HEAD_SIZE + i * DISK_SIZE,
+                         _fixed(d.get('mnt_point', ''), NAME_LEN),
+                         int(d.get('used') or 0), int(d.get('size') or 0), _x10(d.get('percent')))
+    return bytes(out)
+
+
+def _text(raw):
+    end = raw.find(b"\0")
+    return (raw if end < 0 else raw[:end]).decode()
+
+
+def _value(v):
+    return 'N/A' if v == MISSING else v / 10
+
+
+class Snapshot:
+    # Pola są tworzone raz; decode() tylko je nadpisuje
+    def __init__(self):
+        self.seq = -1
+        self.stats = {'cpu': 'N/A', 'mem': 'N/A', 'temp': 'N/A'}
+        self.hostname = ""
+        self.iface = {'interface_name': '', 'bytes_sent_gauge': 0, 'bytes_recv_gauge': 0, 'speed': 0}
+        self.disks = [{'mnt_point': '', 'used': 0, 'size': 0, 'percent': 0} for _ in range(MAX_DISKS)]
+        self.disk_count = 0
+        self._raw_host = b""
+        self._raw_iface = b""
+
+    def decode(self, buf):
+        h = struct.unpack_from(HEAD_FMT, buf, 0)
+        if h[0] != MAGIC or h[1] != VERSION:
+            raise ValueError("Bad snapshot")
+        self.disk_count = min(h[2], MAX_DISKS)
+        self.seq = h[3]
+        stats = self.stats
+        stats['cpu'] = _value(h[4])
+        stats['mem'] = _value(h[5])
+        stats['temp'] = _value(h[6])
+        # Napisy dekodujemy tylko, gdy się zmieniły
+        if h[7] != self._raw_host:
+            self._raw_host = h[7]
+            self.hostname = _text(h[7])
+        iface = self.iface
+        if h[8] != self._raw_iface:
+            self._raw_iface = h[8]
+            iface['interface_name'] = _text(h[8])
+        iface['bytes_sent_gauge'] = h[9]
+        iface['bytes_recv_gauge'] = h[10]
+        iface['speed'] = h[11]
+        for i in range(self.disk_count):
+            d = struct.unpack_from(DISK_FMT, buf, HEAD_SIZE + i * DISK_SIZE)
+            disk = self.disks[i]
+            disk['mnt_point'] = _text(d[0])
+            disk['used'] = d[1]
+            disk['size'] = d[2]
+            disk['percent'] = _value(d[3])
+        return self
@@ -0,0 +1,86 @@
+import framebuf
+import math
+
+# Ikony rysowane raz przy starcie do małych FrameBufferów.
+# W każdej klatce wystarczy oled.blit() zamiast obliczeń i dziesiątek pixel().
+
+
+def _sprite(w, h, draw):
+    buf = bytearray(w * ((h + 7) // 8))
+    fb = framebuf.FrameBuffer(buf, w, h, framebuf.MONO_VLSB)
+    draw(fb)
+    return fb
+
+
+def _wifi_arcs(fb, arcs):
+    for r, h, y in arcs:
+        for dx in range(-r, r + 1):
+            dy = int((1 - (abs(dx)/r))**0.5 * h)
+            if dy > 0:
+                fb.pixel(8+dx, y+h-dy, 1)
+
+
+def _draw_wifi(fb):
+    _wifi_arcs(fb, ((8, 6, 1), (6, 4, 5), (4, 2, 9)))
+    fb.fill_rect(6, 13, 5, 3, 1)
+
+
+def _draw_wifi_off(fb):
+    # Tylko najmniejszy łuk i przekreślenie - brak połączenia
+    _wifi_arcs(fb, ((4, 2, 9),))
+    fb.fill_rect(6, 13, 5, 3, 1)
+    fb.line(10, 1, 16, 7, 1)
+    fb.line(16, 1, 10, 7, 1)
+
+
+def _draw_net(fb):
+    fb.line(4, 8, 4, 2, 1)
+    fb.pixel(4, 1, 1)
+    fb.pixel(2, 4, 1)
+    fb.pixel(6, 4, 1)
+    fb.pixel(1, 6, 1)
+    fb.pixel(7, 6, 1)
+    fb.pixel(0, 8, 1)
+    fb.pixel(8, 8, 1)
+
+
+def _draw_upload(fb):
+    fb.vline(4, 2, 8, 1)
+    fb.hline(2, 2, 5, 1)
+    fb.pixel(4, 0, 1)
+    fb.pixel(3, 1, 1)
+    fb.pixel(5, 1, 1)
+
+
+def _draw_download(fb):
+    fb.vline(4, 0, 8, 1)
+    fb.hline(2, 6, 5, 1)
+    fb.pixel(4, 8, 1)
+    fb.pixel(3, 7, 1)
+    fb.pixel(5, 7, 1)
+
+
+def _draw_speed(fb):
+    for i in range(8):
+        angle = i * (3.1415/4)
+        dx = int(5 * math.cos(angle))
+        dy = int(5 * math.sin(angle))
+        fb.pixel(4+dx, 4+dy, 1)
+    fb.ellipse(4, 4, 3, 3, 1)
+
+
+def _draw_ip(fb):
+    # Prosta ikonka IP (monitor z kropką)
+    fb.rect(0, 0, 16, 10, 1)
+    fb.hline(3, 8, 10, 1)
+    fb.fill_rect(7, 11, 2, 2, 1)
+    fb.pixel(14, 12, 1)
+
+
+WIFI = _sprite(17, 16, _draw_wifi)
+WIFI_OFF = _sprite(17, 16, _draw_wifi_off)
+NET = _sprite(9, 9, _draw_net)
+UPLOAD = _sprite(7, 10, _draw_upload)
+DOWNLOAD = _sprite(7, 9, _draw_download)
+SPEED = _sprite(10, 10, _draw_speed)
+IP = _sprite(16, 13, _draw_ip)
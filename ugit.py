@@ -1,20 +1,249 @@
-import urequests
-import machine
+import os
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+import ujson
+import uhttp
 
-GITHUB_RAW_URL = "https://raw.githubusercontent.com/Blankeuuu/Server-Helper/refs/heads/main/main.py"
+# Aktualizacja OTA.
+# Najpierw jedno małe zapytanie o manifest.json (host/manifest.py):
+#   {"version": "1.2.9", "files": {"main.py": {"size": 41234, "sha256": "..."}, ...}}
+# z If-None-Match i ETagiem ostatniego manifestu - 304 znaczy "bez zmian".
+# Pobierane są tylko pliki, których rozmiar lub SHA-256 różni się od
+# lokalnych. Każdy idzie strumieniowo, po CHUNK bajtów, do <nazwa>.new i
+# dopiero zgodny z manifestem zastępuje bieżący (rename); poprzednia
+# wersja zostaje jako <nazwa>.bak. Przed podmianą powstaje ota.pending z
+# listą plików - boot.py przywraca kopie .bak, jeżeli nowa wersja nie
+# potwierdzi startu (confirm()) przed kolejnym restartem.
 
-def update_main():
+BASE_URL = "https://raw.githubusercontent.com/Blankeuuu/Server-Helper/refs/heads/main/"
+MANIFEST = "manifest.json"
+CHUNK = 1024
+PENDING = "ota.pending"
+BOOTED = "ota.booted"
+ETAG_FILE = "ota.etag"
+# boot.py cofa aktualizacje, więc sam nie może być przez nią podmieniany
+PROTECTED = ("boot.py",)
+
+
+def exists(name):
+    try:
+        os.stat(name)
+        return True
+    except OSError:
+        return False
+
+
+def remove(name):
+    try:
+        os.remove(name)
+    except OSError:
+        pass
+
+
+def hexdigest(h):
+    return binascii.hexlify(h.digest()).decode()
+
+
+def parse_version(text):
+    # "1.2.10" -> (1, 2, 10); porównanie krotek, nie tekstu
+    out = []
+    for part in str(text).strip().split("."):
+        try:
+            out.append(int(part))
+        except ValueError:
+            out.append(0)
+    return tuple(out)
+
+
+def newer(version, current):
+    return parse_version(version) > parse_version(current)
+
+
+def read_etag():
+    try:
+        with open(ETAG_FILE) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def write_etag(etag):
+    if not etag:
+        remove(ETAG_FILE)
+        return
+    with open(ETAG_FILE, "w") as f:
+        f.write(etag)
+
+
+def check(base_url=None, current=None):
+    # Jedno zapytanie. None - bez zmian od ostatniego sprawdzenia (304) albo
+    # wersja nie jest nowsza od current; inaczej manifest (z polem "etag")
+    headers = None
+    etag = read_etag()
+    if etag:
+        headers = {"If-None-Match": etag}
+    r = uhttp.get((base_url or BASE_URL) + MANIFEST, headers)
+    try:
+        if r.status_code == 304:
+            return None
+        if r.status_code != 200:
+            raise OSError("HTTP %d" % r.status_code)
+        manifest = r.json()
+        manifest["etag"] = r.headers.get("etag", "")
+    finally:
+        r.close()
+    if not isinstance(manifest.get("files"), dict):
+        raise ValueError("Bad manifest")
+    if current is not None and not newer(manifest.get("version", ""), current):
+        # Ten manifest już mamy - następne sprawdzenie skończy się na 304
+        write_etag(manifest["etag"])
+        return None
+    return manifest
+
+
+def file_hash(name, buf):
+    h = hashlib.sha256()
+    mv = memoryview(buf)
+    with open(name, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+    return hexdigest(h)
+
+
+def changed(manifest, buf):
+    # Nazwy plików, których lokalna kopia różni się od manifestu
+    names = []
+    files = manifest["files"]
+    for name in files:
+        if "/" in name or name in PROTECTED:
+            print("OTA: pomijam", name)
+            continue
+        entry = files[name]
+        try:
+            if os.stat(name)[6] == entry["size"] and file_hash(name, buf) == entry["sha256"].lower():
+                continue
+        except OSError:
+            pass
+        names.append(name)
+    return names
+
+
+def download(url, name, digest, size, buf, progress=None):
+    # Zapisuje treść do name + ".new"; w RAM jest tylko bufor buf.
+    # progress(n) dostaje liczbę bajtów tego pliku pobranych do tej pory
+    tmp = name + ".new"
+    r = uhttp.get(url)
+    try:
+        if r.status_code != 200:
+            raise OSError("HTTP %d" % r.status_code)
+        h = hashlib.sha256()
+        mv = memoryview(buf)
+        got = 0
+        with open(tmp, "wb") as f:
+            while True:
+                n = r.readinto(buf)
+                if not n:
+                    break
+                h.update(mv[:n])
+                f.write(mv[:n])
+                got += n
+                if got > size:
+                    raise ValueError("Too long")
+                if progress is not None:
+                    progress(got)
+        if got != size:
+            raise OSError("Short download %d/%d" % (got, size))
+        if hexdigest(h) != digest.lower():
+            raise ValueError("Hash mismatch")
+    except BaseException:
+        # Reszty odpowiedzi nie dopijamy - gniazdo i tak idzie do zamknięcia
+        r.keep = False
+        r.close()
+        remove(tmp)
+        raise
+    r.close()
+    return got
+
+
+def swap(names):
+    # Po zapisaniu ota.pending każdy .new zastępuje swój plik; stary zostaje jako .bak
+    with open(PENDING, "w") as f:
+        f.write("\n".join(names))
+    remove(BOOTED)
+    for name in names:
+        bak = name + ".bak"
+        if exists(name):
+            remove(bak)
+            os.rename(name, bak)
+        os.rename(name + ".new", name)
+
+
+def confirm():
+    # Nowa wersja działa - boot.py nie będzie już jej cofał
+    if exists(PENDING):
+        remove(PENDING)
+        remove(BOOTED)
+        print("OTA: aktualizacja potwierdzona")
+
+
+def apply(manifest, base_url=None, progress=None):
+    # Pobiera zmienione pliki i podmienia je razem; zwraca ich listę.
+    # progress(procent) liczy się po bajtach wszystkich pobieranych plików
+    base_url = base_url or BASE_URL
+    buf = bytearray(CHUNK)
+    names = changed(manifest, buf)
+    files = manifest["files"]
+    total = 0
+    for name in names:
+        total += files[name]["size"]
+    done = 0
+    state = [-1]
+
+    def report(got):
+        pct = (done + got) * 100 // total if total else 100
+        if pct != state[0]:
+            state[0] = pct
+            progress(pct)
+
+    try:
+        for name in names:
+            entry = files[name]
+            print("OTA: pobieram", name)
+            done += download(base_url + name, name, entry["sha256"], entry["size"], buf,
+                             report if progress is not None else None)
+    except BaseException:
+        for name in names:
+            remove(name + ".new")
+        raise
+    if names:
+        swap(names)
+    write_etag(manifest.get("etag", ""))
+    return names
+
+
+def update_main(base_url=None, progress=None, current=None):
+    # None - brak nowszej wersji; True, gdy nowe pliki są na miejscu
+    # (trzeba zrestartować płytkę); False po błędzie
     try:
-        print("Pobieram nowy main.py z GitHub...")
-        r = urequests.get(GITHUB_RAW_URL)
-        if r.status_code == 200:
-            with open("main.py", "w") as f:
-                f.write(r.text)
-            print("main.py zaktualizowany, restartuje...")
-            r.close()
-            machine.reset()
-        else:
-            print("Błąd pobierania:", r.status_code)
-            r.close()
+        manifest = check(base_url, current)
+        if manifest is None:
+            print("OTA: brak nowszej wersji")
+            return None
+        names = apply(manifest, base_url, progress)
+        if not names:
+            print("OTA: pliki zgodne z manifestem")
+            return None
+        print("OTA: wersja %s, zaktualizowano: %s" % (manifest.get("version", "?"), ", ".join(names) or "-"))
+        return True
     except Exception as e:
         print("Błąd OTA:", e)
+        return False
@@ -0,0 +1,502 @@
+import socket
+import ujson
+try:
+    import ssl
+except ImportError:
+    import ussl as ssl
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Minimalny klient HTTP/1.1 z keep-alive: jedno gniazdo na serwer,
+# zapamiętany wynik getaddrinfo i ponowne połączenie, gdy serwer zamknie socket.
+
+TIMEOUT = 5
+CHUNK = 512
+
+_addr_cache = {}
+_pool = {}
+
+
+def split_url(url):
+    proto, _, rest = url.partition("://")
+    if "/" in rest:
+        hostport, path = rest.split("/", 1)
+        path = "/" + path
+    else:
+        hostport, path = rest, "/"
+    if ":" in hostport:
+        host, port = hostport.split(":", 1)
+        port = int(port)
+    else:
+        host = hostport
+        port = 443 if proto == "https" else 80
+    return proto, host, port, path
+
+
+_SAFE = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+
+
+def quote(text):
+    # Kodowanie procentowe segmentu ścieżki (np. punkt montowania "/" -> "%2F")
+    out = []
+    for b in str(text).encode():
+        out.append(chr(b) if b in _SAFE else "%%%02X" % b)
+    return "".join(out)
+
+
+def resolve(host, port):
+    key = (host, port)
+    addr = _addr_cache.get(key)
+    if addr is None:
+        addr = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][-1]
+        _addr_cache[key] = addr
+    return addr
+
+
+def forget(host, port):
+    _addr_cache.pop((host, port), None)
+
+
+def parse_status(line):
+    # b"HTTP/1.1 200 OK\r\n" -> 200
+    parts = line.split(None, 2)
+    if len(parts) < 2:
+        raise OSError("Bad status line")
+    return int(parts[1])
+
+
+def parse_header(line, headers):
+    k, _, v = line.partition(b":")
+    headers[k.strip().lower().decode()] = v.strip().decode()
+
+
+class Connection:
+    def __init__(self, proto, host, port):
+        self.proto = proto
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.f = None
+        self.busy = False
+        self.requests = 0
+
+    def open(self):
+        addr = resolve(self.host, self.port)
+        s = socket.socket()
+        s.settimeout(TIMEOUT)
+        try:
+            s.connect(addr)
+        except OSError:
+            s.close()
+            forget(self.host, self.port)
+            raise
+        if self.proto == "https":
+            s = ssl.wrap_socket(s, server_hostname=self.host)
+        self.sock = s
+        self.f = s.makefile("rwb", 0) if hasattr(s, "makefile") else s
+        self.requests = 0
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.f = None
+        self.busy = False
+
+    def send(self, method, path, body, headers):
+        # Cały nagłówek jednym write - kilka małych segmentów czekałoby na
+        # opóźnione ACK serwera (Nagle), ok. 40 ms na zapytanie
+        head = bytearray(b"%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n" % (method.encode(), path.encode(), self.host.encode()))
+        if headers:
+            for k in headers:
+                head.extend(b"%s: %s\r\n" % (k.encode(), str(headers[k]).encode()))
+        if body:
+            head.extend(b"Content-Length: %d\r\n\r\n" % len(body))
+            head.extend(body)
+        else:
+            head.extend(b"\r\n")
+        self.f.write(head)
+
+    def read_head(self):
+        status_line = self.f.readline()
+        if not status_line:
+            raise OSError("Connection closed")
+        status = parse_status(status_line)
+        headers = {}
+        while True:
+            line = self.f.readline()
+            if not line or line == b"\r\n":
+                break
+            parse_header(line, headers)
+        if status_line.startswith(b"HTTP/1.0") and "connection" not in headers:
+            headers["connection"] = "close"
+        return status, headers
+
+
+class Response:
+    def __init__(self, conn, status, headers, method):
+        self.conn = conn
+        self.status_code = status
+        self.headers = headers
+        self.chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+        self.keep = headers.get("connection", "").lower() != "close"
+        self.chunk_left = 0
+        self.done = False
+        # Bajty treści odebrane do tej pory (diagnostyka)
+        self.received = 0
+        if method == "HEAD" or status in (204, 304):
+            self.remaining = 0
+        elif "content-length" in headers:
+            self.remaining = int(headers["content-length"])
+        elif self.chunked:
+            self.remaining = -1
+        else:
+            # Bez długości treść kończy się zamknięciem gniazda
+            self.remaining = -1
+            self.keep = False
+        if self.remaining == 0:
+            self.done = True
+
+    def _next_chunk(self):
+        f = self.conn.f
+        line = f.readline()
+        if line == b"\r\n":
+            line = f.readline()
+        size = int(line.split(b";")[0].strip(), 16)
+        if size == 0:
+            while True:
+                line = f.readline()
+                if not line or line == b"\r\n":
+                    break
+            self.done = True
+        self.chunk_left = size
+
+    def readinto(self, buf):
+        if self.done:
+            return 0
+        f = self.conn.f
+        n = len(buf)
+        if self.chunked:
+            if self.chunk_left == 0:
+                self._next_chunk()
+                if self.done:
+                    return 0
+            if n > self.chunk_left:
+                buf = memoryview(buf)[:self.chunk_left]
+            got = f.readinto(buf)
+            if not got:
+                self.done = True
+                self.keep = False
+                return 0
+            self.chunk_left -= got
+            self.received += got
+            return got
+        if self.remaining >= 0 and n > self.remaining:
+            buf = memoryview(buf)[:self.remaining]
+        got = f.readinto(buf)
+        if not got:
+            self.done = True
+            if self.remaining > 0:
+                self.keep = False
+            return 0
+        self.received += got
+        if self.remaining > 0:
+            self.remaining -= got
+            if self.remaining == 0:
+                self.done = True
+        return got
+
+    def read(self, size=-1):
+        if size >= 0:
+            buf = bytearray(size)
+            n = self.readinto(buf)
+            return bytes(buf[:n])
+        out = bytearray()
+        buf = bytearray(CHUNK)
+        while True:
+            n = self.readinto(buf)
+            if not n:
+                break
+            out.extend(memoryview(buf)[:n])
+        return bytes(out)
+
+    @property
+    def content(self):
+        return self.read()
+
+    @property
+    def text(self):
+        return self.read().decode()
+
+    def json(self):
+        return ujson.loads(self.read())
+
+    def close(self):
+        # Dopijamy resztę treści, żeby gniazdo nadawało się do kolejnego zapytania
+        conn = self.conn
+        if conn is None:
+            return
+        if self.keep and not self.done:
+            try:
+                buf = bytearray(CHUNK)
+                while self.readinto(buf):
+                    pass
+            except OSError:
+                self.keep = False
+        self.conn = None
+        conn.busy = False
+        if not self.keep:
+            conn.close()
+
+
+def _connection(proto, host, port):
+    key = (proto, host, port)
+    conn = _pool.get(key)
+    if conn is None:
+        conn = Connection(proto, host, port)
+        _pool[key] = conn
+    elif conn.busy:
+        # Poprzednia odpowiedź nie została zamknięta
+        conn.close()
+    return conn
+
+
+def request(method, url, body=None, headers=None):
+    proto, host, port, path = split_url(url)
+    if isinstance(body, str):
+        body = body.encode()
+    conn = _connection(proto, host, port)
+    for attempt in (0, 1):
+        reused = conn.sock is not None
+        try:
+            if not reused:
+                conn.open()
+            conn.send(method, path, body, headers)
+            status, resp_headers = conn.read_head()
+            break
+        except OSError:
+            conn.close()
+            # Serwer mógł zamknąć bezczynne połączenie - próbujemy raz na świeżym
+            if not reused or attempt:
+                raise
+    conn.busy = True
+    conn.requests += 1
+    return Response(conn, status, resp_headers, method)
+
+
+def get(url, headers=None):
+    return request("GET", url, headers=headers)
+
+
+def close_all():
+    for key in _pool:
+        _pool[key].close()
+    _pool.clear()
+    aclose_all()
+
+
+# --- Wersja asynchroniczna (uasyncio) -------------------------------------
+# Ta sama pula keep-alive, ale odczyt nie blokuje pętli zdarzeń.
+# Zadania działają współbieżnie, więc połączenie należy do właściciela
+# (owner, np. obiekt Server): dwa serwery pod tym samym host:port nie
+# zamykają sobie nawzajem gniazda w trakcie zapytania.
+
+_apool = {}
+
+
+def resolve_ip(host, port):
+    addr = resolve(host, port)
+    return addr[0] if isinstance(addr, tuple) else host
+
+
+async def _readinto(reader, buf):
+    if hasattr(reader, "readinto"):
+        return await reader.readinto(buf)
+    data = await reader.read(len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+
+class AsyncConnection:
+    def __init__(self, proto, host, port):
+        self.proto = proto
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.busy = False
+        self.requests = 0
+
+    async def open(self):
+        ip = resolve_ip(self.host, self.port)
+        try:
+            if self.proto == "https":
+                # Adres IP z pamięci DNS, a nazwa hosta dla SNI
+                self.reader, self.writer = await asyncio.open_connection(ip, self.port, ssl=True, server_hostname=self.host)
+            else:
+                self.reader, self.writer = await asyncio.open_connection(ip, self.port)
+        except OSError:
+            forget(self.host, self.port)
+            raise
+        self.requests = 0
+
+    def close(self):
+        if self.writer:
+            try:
+                self.writer.close()
+            except OSError:
+                pass
+        self.reader = None
+        self.writer = None
+        self.busy = False
+
+    async def send(self, method, path, headers):
+        w = self.writer
+        w.write(b"%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n" % (method.encode(), path.encode(), self.host.encode()))
+        if headers:
+            for k in headers:
+                w.write(b"%s: %s\r\n" % (k.encode(), str(headers[k]).encode()))
+        w.write(b"\r\n")
+        await w.drain()
+
+    async def read_head(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise OSError("Connection closed")
+        status = parse_status(status_line)
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if not line or line == b"\r\n":
+                break
+            parse_header(line, headers)
+        if status_line.startswith(b"HTTP/1.0") and "connection" not in headers:
+            headers["connection"] = "close"
+        return status, headers
+
+
+class AsyncResponse(Response):
+    # Dziedziczymy interpretację nagłówków, odczyt treści jest asynchroniczny
+
+    async def _next_chunk(self):
+        r = self.conn.reader
+        line = await r.readline()
+        if line == b"\r\n":
+            line = await r.readline()
+        size = int(line.split(b";")[0].strip(), 16)
+        if size == 0:
+            while True:
+                line = await r.readline()
+                if not line or line == b"\r\n":
+                    break
+            self.done = True
+        self.chunk_left = size
+
+    async def readinto(self, buf):
+        if self.done:
+            return 0
+        r = self.conn.reader
+        n = len(buf)
+        if self.chunked:
+            if self.chunk_left == 0:
+                await self._next_chunk()
+                if self.done:
+                    return 0
+            if n > self.chunk_left:
+                buf = memoryview(buf)[:self.chunk_left]
+            got = await _readinto(r, buf)
+            if not got:
+                self.done = True
+                self.keep = False
+                return 0
+            self.chunk_left -= got
+            self.received += got
+            return got
+        if self.remaining >= 0 and n > self.remaining:
+            buf = memoryview(buf)[:self.remaining]
+        got = await _readinto(r, buf)
+        if not got:
+            self.done = True
+            if self.remaining > 0:
+                self.keep = False
+            return 0
+        self.received += got
+        if self.remaining > 0:
+            self.remaining -= got
+            if self.remaining == 0:
+                self.done = True
+        return got
+
+    async def read(self, size=-1):
+        out = bytearray()
+        buf = bytearray(CHUNK)
+        while size < 0 or len(out) < size:
+            n = await self.readinto(buf)
+            if not n:
+                break
+            out.extend(memoryview(buf)[:n])
+        return bytes(out if size < 0 else out[:size])
+
+    async def json(self):
+        return ujson.loads(await self.read())
+
+    def abort(self):
+        # Po przerwaniu (np. timeout) stan gniazda jest nieznany - zamykamy je
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    async def aclose(self):
+        conn = self.conn
+        if conn is None:
+            return
+        if self.keep and not self.done:
+            try:
+                buf = bytearray(CHUNK)
+                while await self.readinto(buf):
+                    pass
+            except OSError:
+                self.keep = False
+        self.conn = None
+        conn.busy = False
+        if not self.keep:
+            conn.close()
+
+
+async def aget(url, headers=None, owner=None):
+    proto, host, port, path = split_url(url)
+    key = (owner, proto, host, port)
+    conn = _apool.get(key)
+    if conn is None:
+        conn = AsyncConnection(proto, host, port)
+        _apool[key] = conn
+    elif conn.busy:
+        conn.close()
+    for attempt in (0, 1):
+        reused = conn.writer is not None
+        try:
+            if not reused:
+                await conn.open()
+            # Zajęte już przed wysłaniem: anulowane zapytanie (timeout) zostawi
+            # gniazdo z nieodebraną odpowiedzią, więc następne je zamknie
+            conn.busy = True
+            await conn.send("GET", path, headers)
+            status, resp_headers = await conn.read_head()
+            break
+        except OSError:
+            conn.close()
+            if not reused or attempt:
+                raise
+    conn.requests += 1
+    return AsyncResponse(conn, status, resp_headers, "GET")
+
+
+def aclose_all():
+    for key in _apool:
+        _apool[key].close()
+    _apool.clear()
@@ -0,0 +1,256 @@
+# Strumieniowy ekstraktor pól JSON.
+# Zamiast budować całe drzewo (response.json()) czytamy treść kawałkami
+# i zapamiętujemy tylko wybrane klucze. Obsługuje trzy kształty odpowiedzi Glances:
+#   {"cpu": 1.0, ...}            -> słownik z wybranymi kluczami
+#   [{"label": ..., ...}, ...]   -> lista elementów z wybranymi kluczami,
+#                                   przefiltrowana funkcją accept
+#   {"CPUTIN": [{...}, ...]}     -> to samo dla wrapped=True (odpowiedź
+#                                   /api/4/<plugin>/<item>/<value>)
+# Zagnieżdżone wartości (np. percpu) są pomijane bez alokacji.
+
+CHUNK = 256
+MAX_STR = 48
+
+_Q = 34      # "
+_BS = 92     # \
+_WS = b" \t\r\n"
+_END = b",}] \t\r\n"
+
+
+def _cut(raw):
+    # Ciąg ucięty na MAX_STR może kończyć się w połowie znaku UTF-8 -
+    # odcinamy niepełną sekwencję razem z bajtem wiodącym
+    n = len(raw)
+    k = n - 1
+    while k >= 0 and raw[k] & 0xC0 == 0x80:
+        k -= 1
+    if k >= 0 and raw[k] >= 0xC0:
+        need = 2 if raw[k] < 0xE0 else 3 if raw[k] < 0xF0 else 4
+        if n - k < need:
+            return raw[:k]
+    return raw
+
+
+def _unescape(raw):
+    if 92 not in raw:
+        return raw.decode()
+    out = []
+    i = 0
+    n = len(raw)
+    while i < n:
+        c = raw[i]
+        if c == _BS:
+            # Sekwencja ucięta na MAX_STR (samotny \ albo niepełne \uXX) - pomijamy
+            if i + 1 >= n:
+                break
+            e = raw[i + 1]
+            if e == 117:  # \uXXXX
+                if i + 5 >= n:
+                    break
+                out.append(chr(int(raw[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            out.append({110: "\n", 116: "\t", 114: "\r"}.get(e, chr(e)))
+            i += 2
+            continue
+        # Bajty UTF-8 dekodujemy razem z resztą ciągu
+        j = raw.find(b"\\", i)
+        if j < 0:
+            j = n
+        out.append(raw[i:j].decode())
+        i = j
+    return "".join(out)
+
+
+def _scalar(raw):
+    if raw == b"true":
+        return True
+    if raw == b"false":
+        return False
+    if raw == b"null":
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+class Extractor:
+    def __init__(self, keys, accept=None, first=False, max_items=16, wrapped=False):
+        self.keys = keys
+        self.accept = accept
+        self.first = first
+        self.wrapped = wrapped
+        self.max_items = max_items
+        self.result = None
+        self.item = None
+        self.stack = bytearray()
+        self.cap = 0
+        self.is_key = False
+        self.key = None
+        self.in_str = False
+        self.in_scalar = False
+        self.esc = False
+        self.keep = False
+        self.tok = bytearray()
+        self.stopped = False
+
+    def _target(self):
+        return self.result if self.cap == 1 else self.item
+
+    def _value(self, v):
+        t = self._target()
+        if t is not None and self.key is not None:
+            t[self.key] = v
+        self.key = None
+
+    def _end_string(self):
+        depth = len(self.stack)
+        if self.keep:
+            tok = self.tok
+            s = _unescape(_cut(tok) if len(tok) >= MAX_STR else tok)
+            if self.is_key and depth == self.cap:
+                self.key = s if s in self.keys else None
+            else:
+                self._value(s)
+        elif depth == self.cap and not self.is_key:
+            self.key = None
+        self.tok = bytearray()
+        self.keep = False
+        self.in_str = False
+
+    def _end_scalar(self):
+        if self.keep:
+            self._value(_scalar(bytes(self.tok)))
+        self.tok = bytearray()
+        self.keep = False
+        self.in_scalar = False
+
+    def _end_item(self):
+        item = self.item
+        if self.accept is None or self.accept(item):
+            if self.first:
+                self.result = item
+                self.stopped = True
+            elif len(self.result) < self.max_items:
+                self.result.append(item)
+        self.item = None
+
+    def feed(self, buf, n=None):
+        if n is None:
+            n = len(buf)
+        i = 0
+        stack = self.stack
+        while i < n and not self.stopped:
+            if self.in_str:
+                if self.esc:
+                    if self.keep:
+                        self.tok.append(buf[i])
+                    self.esc = False
+                    i += 1
+                    continue
+                j = buf.find(b'"', i, n)
+                while j >= 0:
+                    k = j - 1
+                    while k >= i and buf[k] == _BS:
+                        k -= 1
+                    if (j - 1 - k) % 2 == 0:
+                        break
+                    j = buf.find(b'"', j + 1, n)
+                end = n if j < 0 else j
+                if self.keep and len(self.tok) < MAX_STR:
+                    self.tok.extend(buf[i:min(end, i + MAX_STR - len(self.tok))])
+                if j < 0:
+                    k = n - 1
+                    while k >= i and buf[k] == _BS:
+                        k -= 1
+                    self.esc = (n - 1 - k) % 2 == 1
+                    i = n
+                    continue
+                self._end_string()
+                i = j + 1
+                continue
+            c = buf[i]
+            if self.in_scalar:
+                if c in _END:
+                    self._end_scalar()
+                    continue
+                if self.keep and len(self.tok) < MAX_STR:
+                    self.tok.append(c)
+                i += 1
+                continue
+            i += 1
+            if c in _WS:
+                continue
+            depth = len(stack)
+            if c == 123 or c == 91:  # { [
+                if depth == 0:
+                    # cap - głębokość, na której leżą wybierane klucze
+                    if self.wrapped:
+                        self.cap = 3
+                    else:
+                        self.cap = 1 if c == 123 else 2
+                    self.result = {} if self.cap == 1 else ([] if not self.first else None)
+                elif depth == self.cap - 1 and self.cap > 1 and c == 123:
+                    self.item = {}
+                elif depth == self.cap:
+                    self.key = None
+                stack.append(c)
+                self.is_key = c == 123
+            elif c == 125 or c == 93:  # } ]
+                if stack:
+                    stack.pop()
+                depth = len(stack)
+                if depth == self.cap - 1 and self.cap > 1 and c == 125 and self.item is not None:
+                    self._end_item()
+                self.is_key = False
+            elif c == 58:  # :
+                self.is_key = False
+            elif c == 44:  # ,
+                self.is_key = stack and stack[-1] == 123
+            elif c == _Q:
+                self.in_str = True
+                self.esc = False
+                self.tok = bytearray()
+                if depth == self.cap:
+                    self.keep = self.is_key or self.key is not None
+                else:
+                    self.keep = False
+            else:
+                self.in_scalar = True
+                self.tok = bytearray()
+                self.keep = depth == self.cap and self.key is not None
+                if self.keep:
+                    self.tok.append(c)
+        return not self.stopped
+
+    def close(self):
+        if self.in_scalar:
+            self._end_scalar()
+        return self.result
+
+
+def parse(stream, ex, buf=None):
+    # Czyta strumień (np. uhttp.Response) kawałkami do wspólnego bufora
+    if buf is None:
+        buf = bytearray(CHUNK)
+    while True:
+        n = stream.readinto(buf)
+        if not n:
+            break
+        if not ex.feed(buf, n):
+            break
+    return ex.close()
+
+
+async def aparse(stream, ex, buf=None):
+    # To samo co parse(), dla uhttp.AsyncResponse
+    if buf is None:
+        buf = bytearray(CHUNK)
+    while True:
+        n = await stream.readinto(buf)
+        if not n:
+            break
+        if not ex.feed(buf, n):
+            break
+    return ex.close()
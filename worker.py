@@ -0,0 +1,338 @@
+import time
+import _thread
+import uhttp
+import ujstream
+import snapshot
+import scheduler
+import servers
+
+# Tryb dwurdzeniowy (DUAL_CORE): rdzeń 1 pobiera i parsuje dane z Glances
+# synchronicznie (uhttp.get + ujstream.parse) i koduje je do zrzutu w
+# układzie snapshot.py. Rdzeń 0 (uasyncio: ekran, przyciski) tylko odbiera
+# gotowe zrzuty i stosuje je przez Server.apply_snapshot(), jak przy proxy.
+#
+# Własność stanu:
+#   rdzeń 0 - obiekty Server (dane, historia, alerty, version) oraz pola Job
+#             interval/disk_interval/net_interval/enabled/poked
+#   rdzeń 1 - reszta pól Job, bufor parsera i pula gniazd uhttp.get
+#             (rdzeń 0 woła uhttp tylko po stop(), np. przy OTA)
+#   Exchange - trzy zrzuty wymieniane wyłącznie pod blokadą
+# Job kopiuje adresy z Server przy tworzeniu, więc rdzeń 1 nie dotyka Server.
+
+IDLE_MS = 20
+DISK_FIELDS = servers.DISK_FIELDS
+NET_FIELDS = servers.NET_FIELDS
+
+
+class Exchange:
+    # Rdzeń 1 pisze do back, rdzeń 0 czyta front, ready krąży między nimi.
+    # Dwa bufory nie wystarczą: ekran trzyma referencje do słowników frontu
+    # (Server.stats, Server.disks) aż do następnego take(). Pod blokadą jest
+    # tylko podmiana referencji, więc żaden rdzeń nie czeka na parsowanie.
+    def __init__(self):
+        self.lock = _thread.allocate_lock()
+        self.back = snapshot.Snapshot()
+        self.ready = snapshot.Snapshot()
+        self.front = snapshot.Snapshot()
+        self.fresh = False
+        self.published = 0
+
+    def publish(self):
+        # Rdzeń 1: back jest gotowy
+        with self.lock:
+            self.back, self.ready = self.ready, self.back
+            self.fresh = True
+            self.published += 1
+
+    def take(self):
+        # Rdzeń 0: nowy zrzut albo None; zajętej blokady nie czekamy - weźmiemy w kolejnym kroku
+        if not self.lock.acquire(0):
+            return None
+        try:
+            if not self.fresh:
+                return None
+            self.front, self.ready = self.ready, self.front
+            self.fresh = False
+            return self.front
+        finally:
+            self.lock.release()
+
+
+class Job:
+    def __init__(self, srv):
+        self.exchange = Exchange()
+        self.hostname_url = srv.hostname_url
+        self.system_url = srv.system_url
+        self.quicklook_url = srv.quicklook_url
+        self.cpu_url = srv.cpu_url
+        self.cpu_total_url = srv.cpu_total_url
+        self.mem_url = srv.mem_url
+        self.mem_percent_url = srv.mem_percent_url
+        self.sensors_url = srv.sensors_url
+        self.temp_url = srv.temp_url
+        self.network_url = srv.network_url
+        self.iface_url = srv.iface_url
+        self.disk_url = srv.disk_url
+        self.mount_url = srv.mount_url
+        self.proxy_url = srv.proxy_url
+        self.iface_name = srv.iface
+        self.sensor = srv.sensor
+        self.disk_filter = list(srv.disk_filter)
+        # Ustawia rdzeń 0
+        self.interval = srv.stats_source.interval
+        self.disk_interval = srv.disk_source.interval
+        self.net_interval = srv.net_source.interval
+        self.enabled = False
+        self.poked = False
+        # Stan rdzenia 1
+        self.buf = bytearray(ujstream.CHUNK)
+        self.proxy_buf = bytearray(snapshot.SIZE) if self.proxy_url else None
+        self.item_api = None
+        self.batch_supported = None
+        self.hostname = ""
+        self.system_at = None
+        self.mounts = list(srv.disk_filter)
+        self.stats = {}
+        self.iface = None
+        self.disks = []
+        self.due = time.ticks_ms()
+        self.disk_due = self.due
+        self.net_due = self.due
+        self.proxy_retry_at = self.due
+        self.seq = 0
+        self.errors = 0
+        self.failures = 0
+        self.offline = False
+        self.fetch_ms = 0
+
+    # --- zapytania (rdzeń 1) ---
+
+    def fetch(self, url, ex, item=False):
+        # Błąd sieci liczy się w errors; 404 przy zapytaniu o element = brak elementu
+        try:
+            r = uhttp.get(url)
+        except OSError:
+            self.errors += 1
+            raise
+        try:
+            if item and r.status_code == 404:
+                r.close()
+                return None
+            if r.status_code != 200:
+                raise OSError("HTTP %d" % r.status_code)
+            result = ujstream.parse(r, ex, self.buf)
+        except BaseException as e:
+            r.keep = False
+            r.close()
+            if not servers.is_http_error(e):
+                self.errors += 1
+            raise
+        r.close()
+        return result
+
+    def visible(self, disk):
+        if self.disk_filter:
+            return disk.get('mnt_point') in self.disk_filter
+        return snapshot.disk_visible(disk.get('mnt_point', ''), disk.get('device', disk.get('device_name', '')))
+
+    def is_temp_sensor(self, sensor):
+        return sensor.get('label') == self.sensor
+
+    def is_net_iface(self, iface):
+        return iface.get('interface_name') == self.iface_name
+
+    def fetch_hostname(self, now):
+        self.system_at = now
+        data = None
+        if self.item_api is not False:
+            try:
+                data = self.fetch(self.hostname_url, ujstream.Extractor(('hostname',)))
+                self.item_api = bool(data and "hostname" in data)
+            except OSError as e:
+                if not servers.is_http_error(e):
+                    raise
+                self.item_api = False
+        if not self.item_api:
+            data = self.fetch(self.system_url, ujstream.Extractor(('hostname',)))
+        if data and "hostname" in data:
+            self.hostname = str(data["hostname"])
+
+    def fetch_quicklook(self):
+        # CPU i RAM jednym zapytaniem; None, gdy serwer go nie obsługuje
+        if self.batch_supported is False:
+            return None
+        try:
+            ql = self.fetch(self.quicklook_url, ujstream.Extractor(('cpu', 'mem')))
+        except OSError as e:
+            if not servers.is_http_error(e):
+                raise
+            ql = None
+        self.batch_supported = bool(ql and 'cpu' in ql and 'mem' in ql)
+        return ql if self.batch_supported else None
+
+    def fetch_stats(self):
+        item_api = self.item_api
+        ql = self.fetch_quicklook()
+        if ql is not None:
+            cpu = {'total': ql['cpu']}
+            mem = {'percent': ql['mem']}
+        else:
+            cpu = self.fetch(self.cpu_total_url if item_api else self.cpu_url, ujstream.Extractor(('total',)))
+            mem = self.fetch(self.mem_percent_url if item_api else self.mem_url, ujstream.Extractor(('percent',)))
+        if item_api:
+            sensor = self.fetch(self.temp_url, ujstream.Extractor(('value',), wrapped=True, first=True), True)
+        else:
+            sensor = self.fetch(self.sensors_url, ujstream.Extractor(('label', 'value'), accept=self.is_temp_sensor, first=True))
+        stats = self.stats
+        stats['cpu'] = cpu.get('total', 'N/A') if cpu else 'N/A'
+        stats['mem'] = mem.get('percent', 'N/A') if mem else 'N/A'
+        stats['temp'] = sensor.get('value', 'N/A') if sensor else 'N/A'
+
+    def fetch_net(self):
+        if self.item_api:
+            self.iface = self.fetch(self.iface_url, ujstream.Extractor(NET_FIELDS, wrapped=True, first=True), True)
+        else:
+            self.iface = self.fetch(self.network_url, ujstream.Extractor(NET_FIELDS, accept=self.is_net_iface, first=True))
+
+    def fetch_disks(self):
+        if self.item_api and self.mounts:
+            data = []
+            for mnt in self.mounts:
+                disk = self.fetch(self.mount_url + uhttp.quote(mnt), ujstream.Extractor(DISK_FIELDS, wrapped=True, first=True), True)
+                if disk:
+                    data.append(disk)
+        else:
+            data = self.fetch(self.disk_url, ujstream.Extractor(DISK_FIELDS, accept=self.visible)) or []
+            if self.item_api and data:
+                self.mounts = [d.get('mnt_point') for d in data]
+        self.disks = data
+
+    def fetch_proxy(self):
+        # Zrzut z glances_proxy.py czytany prosto do bufora back
+        r = uhttp.get(self.proxy_url)
+        try:
+            if r.status_code != 200:
+                raise OSError("HTTP %d" % r.status_code)
+            mv = memoryview(self.proxy_buf)
+            n = 0
+            while n < snapshot.SIZE:
+                got = r.readinto(mv[n:])
+                if not got:
+                    raise OSError("Short snapshot")
+                n += got
+            self.exchange.back.decode(self.proxy_buf)
+        except BaseException:
+            r.keep = False
+            r.close()
+            raise
+        r.close()
+
+    # --- cykl (rdzeń 1) ---
+
+    def is_due(self, now):
+        return self.poked or time.ticks_diff(now, self.due) >= 0
+
+    def refresh(self, now):
+        # True, gdy opublikowano nowy zrzut
+        poked = self.poked
+        self.poked = False
+        start = time.ticks_ms()
+        ok = False
+        if self.proxy_url and time.ticks_diff(now, self.proxy_retry_at) >= 0:
+            try:
+                self.fetch_proxy()
+                ok = True
+            except Exception as e:
+                print("Proxy error:", e)
+                self.proxy_retry_at = time.ticks_add(now, servers.PROXY_RETRY)
+        if not ok:
+            ok = self.refresh_json(now, poked)
+        self.fetch_ms = time.ticks_diff(time.ticks_ms(), start)
+        if not ok:
+            self.failures += 1
+            if self.failures >= scheduler.OFFLINE_AFTER:
+                self.offline = True
+            self.due = time.ticks_add(time.ticks_ms(), scheduler.backoff(self.interval, self.failures))
+            return False
+        self.failures = 0
+        self.offline = False
+        # Po pierwszym, samym zrzucie statystyk od razu dobieramy sieć i dyski
+        self.due = time.ticks_add(time.ticks_ms(), 0 if self.seq == 1 else self.interval)
+        self.exchange.publish()
+        return True
+
+    def refresh_json(self, now, poked):
+        errors = self.errors
+        try:
+            if not self.hostname or self.item_api is None:
+                if self.system_at is None or time.ticks_diff(now, self.system_at) >= servers.SYSTEM_RETRY:
+                    self.fetch_hostname(now)
+            self.fetch_stats()
+            # Pierwszy zrzut to same statystyki - ekran startowy nie czeka na sieć i dyski
+            first = self.seq == 0
+            if not first and (poked or time.ticks_diff(now, self.net_due) >= 0):
+                self.fetch_net()
+                self.net_due = time.ticks_add(now, self.net_interval)
+            if not first and (poked or time.ticks_diff(now, self.disk_due) >= 0):
+                self.fetch_disks()
+                self.disk_due = time.ticks_add(now, self.disk_interval)
+        except Exception as e:
+            print("Worker:", e)
+            if self.errors != errors:
+                return False
+        stats = self.stats
+        self.seq += 1
+        # Dyski i sieć z poprzednich odświeżeń trafiają do każdego zrzutu
+        data = snapshot.encode(self.seq, stats.get('cpu'), stats.get('mem'), stats.get('temp'),
+                               self.hostname, self.iface, self.disks)
+        self.exchange.back.decode(data)
+        return True
+
+
+class Worker:
+    def __init__(self, server_list):
+        self.jobs = [Job(srv) for srv in server_list]
+        self.running = False
+        self.stopped = True
+        self.connected = False
+
+    def start(self):
+        if not self.stopped:
+            return
+        self.running = True
+        self.stopped = False
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self):
+        # Rdzeń 0 czeka, aż rdzeń 1 skończy bieżące zapytanie i zamknie gniazda
+        self.running = False
+        while not self.stopped:
+            time.sleep_ms(IDLE_MS)
+
+    def run(self):
+        try:
+            while self.running:
+                now = time.ticks_ms()
+                active = False
+                for job in self.jobs:
+                    if not job.enabled:
+                        continue
+                    active = True
+                    if job.is_due(now):
+                        self.connected = True
+                        try:
+                            job.refresh(now)
+                        except Exception as e:
+                            # Wątek rdzenia 1 nie może zginąć od jednej złej odpowiedzi
+                            print("Worker error:", e)
+                            job.due = time.ticks_add(time.ticks_ms(), job.interval)
+                        now = time.ticks_ms()
+                if not active and self.connected:
+                    # Ekran zgaszony albo brak WiFi - gniazda nie są potrzebne
+                    uhttp.close_all()
+                    self.connected = False
+                time.sleep_ms(IDLE_MS)
+        finally:
+            uhttp.close_all()
+            self.connected = False
+            self.stopped = True